@@ -0,0 +1,31 @@
+"""
+Bump the sanctions list version, invalidating every cached screening result
+
+Usage:
+    python -m app.commands.bump_list_version [--warm] [--limit 10000] [--batch-size 100] [--interval 1.0]
+"""
+
+import asyncio
+import json
+from app.commands.warm_cache import get_parser, warm_cache
+from app.registry import ClientRegistry
+
+
+async def main() -> None:
+    parser = get_parser()
+    parser.description = __doc__.strip().splitlines()[0]
+    parser.add_argument('--warm', action='store_true', help='Warm the cache after the bump')
+    args = parser.parse_args()
+
+    clients = ClientRegistry()
+    try:
+        version = await clients.list_version.bump()
+        print(json.dumps({'version': version}))
+        if args.warm:
+            await warm_cache(clients, args)
+    finally:
+        await clients.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,29 @@
+"""
+Give every stored person the identity key of its canonical (name, dob, country) triple
+
+Usage:
+    python -m app.commands.migrate_cache_keys [--batch-size 1000]
+"""
+
+import argparse
+import asyncio
+import json
+from app.registry import ClientRegistry
+from app.services.key_migration_service import KeyMigrationService
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--batch-size', type=int, default=1000, help='People updated per bulk write')
+    args = parser.parse_args()
+
+    clients = ClientRegistry()
+    try:
+        key_migration_service = KeyMigrationService(clients, args.batch_size)
+        print(json.dumps(await key_migration_service.migrate()))
+    finally:
+        await clients.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,31 @@
+"""
+Screen the stored people affected by the changes between two sanctions list versions
+
+Usage:
+    python -m app.commands.rescreen_delta PREVIOUS_PATH CURRENT_PATH [--batch-size 500]
+"""
+
+import argparse
+import asyncio
+import json
+from app.registry import ClientRegistry
+from app.services.rescreening_service import DeltaRescreeningService
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('previous_path', help='List file or directory of the previous version')
+    parser.add_argument('current_path', help='List file or directory of the current version')
+    parser.add_argument('--batch-size', type=int, default=500, help='People screened together')
+    args = parser.parse_args()
+
+    clients = ClientRegistry()
+    try:
+        rescreening_service = DeltaRescreeningService(clients, args.batch_size)
+        print(json.dumps(await rescreening_service.rescreen(args.previous_path, args.current_path)))
+    finally:
+        await clients.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,38 @@
+"""
+Screen the most requested people again, after a sanctions list update
+
+Usage:
+    python -m app.commands.warm_cache [--limit 10000] [--batch-size 100] [--interval 1.0]
+"""
+
+import argparse
+import asyncio
+import json
+from app.registry import ClientRegistry
+from app.services.cache_warming_service import CacheWarmingService
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--limit', type=int, default=10000, help='Number of people to screen')
+    parser.add_argument('--batch-size', type=int, default=100, help='People screened together')
+    parser.add_argument('--interval', type=float, default=1.0, help='Seconds between batches')
+    return parser
+
+
+async def warm_cache(clients: ClientRegistry, args: argparse.Namespace) -> None:
+    cache_warming_service = CacheWarmingService(clients, args.batch_size, args.interval)
+    print(json.dumps(await cache_warming_service.warm(args.limit)))
+
+
+async def main() -> None:
+    args = get_parser().parse_args()
+    clients = ClientRegistry()
+    try:
+        await warm_cache(clients, args)
+    finally:
+        await clients.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
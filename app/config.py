@@ -0,0 +1,162 @@
+"""
+This module provides the service settings loaded from the environment
+"""
+
+import os
+from functools import lru_cache
+from dotenv import load_dotenv
+
+
+class Settings:
+    """
+    Environment-driven settings, read once per process
+    """
+    def __init__(self) -> None:
+        load_dotenv()
+
+        # MongoDB
+        self.mongo_host = os.getenv('MONGO_HOST')
+        self.mongo_port = os.getenv('MONGO_PORT')
+        self.mongo_user = os.getenv('MONGO_INITDB_ROOT_USERNAME')
+        self.mongo_password = os.getenv('MONGO_INITDB_ROOT_PASSWORD')
+        # Maximum number of operations sent in one bulk write
+        self.mongo_bulk_write_batch_size = int(os.getenv('MONGO_BULK_WRITE_BATCH_SIZE', '1000'))
+        # Store screening results from a background buffer instead of before responding,
+        # flushed every WRITE_BEHIND_FLUSH_SIZE results or WRITE_BEHIND_FLUSH_INTERVAL_MS
+        self.write_behind = os.getenv('WRITE_BEHIND', 'false').lower() == 'true'
+        self.write_behind_flush_size = int(os.getenv('WRITE_BEHIND_FLUSH_SIZE', '500'))
+        self.write_behind_flush_interval = float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL_MS', '200')) / 1000
+        self.write_behind_max_size = int(os.getenv('WRITE_BEHIND_MAX_SIZE', '10000'))
+
+        # Redis
+        self.redis_url = os.getenv('REDIS_URL')
+        # Lifetime of a cached screening result in seconds. Cache keys embed the sanctions
+        # list version, so results are invalidated by bumping the version rather than by expiry
+        self.cache_ttl = int(os.getenv('CACHE_TTL', '604800'))
+        # Seconds each process reuses the sanctions list version it last read
+        self.list_version_refresh_interval = float(os.getenv('LIST_VERSION_REFRESH_INTERVAL', '5'))
+        # Seconds between writes of the per-person request counts used to warm the cache
+        self.request_count_flush_interval = float(os.getenv('REQUEST_COUNT_FLUSH_INTERVAL', '10'))
+
+        # Results stored in MongoDB younger than this many seconds are reused when
+        # they are no longer in Redis, instead of screening the person again (0 disables)
+        self.db_cache_max_age = int(os.getenv('DB_CACHE_MAX_AGE', '604800'))
+
+        # In-process cache tier in front of Redis (a size of 0 disables it),
+        # its TTL is capped to the Redis one so it never serves results Redis would not
+        self.local_cache_size = int(os.getenv('LOCAL_CACHE_SIZE', '10000'))
+        self.local_cache_ttl = min(
+            float(os.getenv('LOCAL_CACHE_TTL', '60')),
+            self.cache_ttl
+        )
+
+        # Upstream HTTP connection pool
+        self.http_max_connections = int(os.getenv('HTTP_MAX_CONNECTIONS', '20'))
+        self.http_max_keepalive_connections = int(
+            os.getenv('HTTP_MAX_KEEPALIVE_CONNECTIONS', '10')
+        )
+
+        # OFAC API
+        self.ofac_api_url = os.getenv('OFAC_API_URL')
+        self.ofac_api_key = os.getenv('OFAC_API_KEY')
+        self.ofac_api_chunk_size = int(os.getenv('OFAC_API_CHUNK_SIZE', '100'))
+        self.ofac_api_max_concurrency = int(os.getenv('OFAC_API_MAX_CONCURRENCY', '4'))
+        # Parse responses incrementally while they are received (requires the ijson package)
+        self.ofac_api_stream_parse = os.getenv('OFAC_API_STREAM_PARSE', 'false').lower() == 'true'
+        # Upstream resilience: the timeout adapts to the observed latencies between
+        # OFAC_API_MIN_TIMEOUT and OFAC_API_TIMEOUT, failed chunks are retried up to
+        # OFAC_API_MAX_RETRIES times within a budget of OFAC_API_RETRY_BUDGET retries per call
+        self.ofac_api_timeout = float(os.getenv('OFAC_API_TIMEOUT', '10'))
+        self.ofac_api_min_timeout = float(os.getenv('OFAC_API_MIN_TIMEOUT', '1'))
+        self.ofac_api_max_retries = int(os.getenv('OFAC_API_MAX_RETRIES', '2'))
+        self.ofac_api_retry_budget = float(os.getenv('OFAC_API_RETRY_BUDGET', '0.1'))
+        # Send a second request for chunks slower than this latency percentile (0 to 1), empty disables
+        hedge_percentile = os.getenv('OFAC_API_HEDGE_PERCENTILE', '')
+        self.ofac_api_hedge_percentile = float(hedge_percentile) if hedge_percentile else None
+        # The circuit opens when this ratio of recent calls failed, and fails calls fast for
+        # OFAC_API_BREAKER_OPEN_SECONDS, screening with the fallback engine when one is set
+        self.ofac_api_breaker_failure_ratio = float(os.getenv('OFAC_API_BREAKER_FAILURE_RATIO', '0.5'))
+        self.ofac_api_breaker_open_seconds = float(os.getenv('OFAC_API_BREAKER_OPEN_SECONDS', '30'))
+        self.ofac_api_fallback_engine = os.getenv('OFAC_API_FALLBACK_ENGINE', '')
+
+        # Token bucket per client refilled with RATE_LIMIT_RATE tokens per second up to
+        # RATE_LIMIT_CAPACITY. A request costs RATE_LIMIT_REQUEST_COST, plus RATE_LIMIT_HIT_COST
+        # per distinct person, or RATE_LIMIT_MISS_COST for those who were not cached
+        self.rate_limit = os.getenv('RATE_LIMIT', 'true').lower() == 'true'
+        self.rate_limit_rate = float(os.getenv('RATE_LIMIT_RATE', '20'))
+        self.rate_limit_capacity = float(os.getenv('RATE_LIMIT_CAPACITY', '1000'))
+        self.rate_limit_request_cost = float(os.getenv('RATE_LIMIT_REQUEST_COST', '1'))
+        self.rate_limit_hit_cost = float(os.getenv('RATE_LIMIT_HIT_COST', '0.1'))
+        self.rate_limit_miss_cost = float(os.getenv('RATE_LIMIT_MISS_COST', '1'))
+        # Clients estimated to keep this ratio of their capacity are admitted without
+        # calling Redis, for at most RATE_LIMIT_SYNC_INTERVAL seconds
+        self.rate_limit_local_margin = float(os.getenv('RATE_LIMIT_LOCAL_MARGIN', '0.5'))
+        self.rate_limit_sync_interval = float(os.getenv('RATE_LIMIT_SYNC_INTERVAL', '1'))
+        # Request header identifying the client (e.g. X-Forwarded-For behind a trusted proxy),
+        # the client address when empty. Proxies append to the header, so the client is the entry
+        # RATE_LIMIT_TRUSTED_HOPS from the right, the ones before it being set by the client itself
+        self.rate_limit_client_header = os.getenv('RATE_LIMIT_CLIENT_HEADER', '')
+        self.rate_limit_trusted_hops = int(os.getenv('RATE_LIMIT_TRUSTED_HOPS', '1'))
+
+        # Admission control: at most ADMISSION_CONCURRENCY engine calls run at once per process.
+        # Calls screening at most ADMISSION_PRIORITY_MAX_PEOPLE people take the priority lane, larger
+        # ones the bulk lane, which cannot use the last ADMISSION_PRIORITY_RESERVED slots. Requests
+        # expected to wait longer than their lane's max wait (in seconds) get a 503 with Retry-After
+        self.admission_control = os.getenv('ADMISSION_CONTROL', 'true').lower() == 'true'
+        self.admission_concurrency = int(os.getenv('ADMISSION_CONCURRENCY', '16'))
+        self.admission_priority_reserved = int(os.getenv('ADMISSION_PRIORITY_RESERVED', '4'))
+        self.admission_priority_max_people = int(os.getenv('ADMISSION_PRIORITY_MAX_PEOPLE', '10'))
+        self.admission_priority_max_wait = float(os.getenv('ADMISSION_PRIORITY_MAX_WAIT', '2'))
+        self.admission_bulk_max_wait = float(os.getenv('ADMISSION_BULK_MAX_WAIT', '10'))
+
+        # Coalesce concurrent screenings of the same person across worker processes with a Redis lock
+        self.single_flight_redis_lock = os.getenv('SINGLE_FLIGHT_REDIS_LOCK', 'false').lower() == 'true'
+        self.single_flight_lock_timeout = float(os.getenv('SINGLE_FLIGHT_LOCK_TIMEOUT', '30'))
+
+        # Bulk screening jobs, queued in memory ('memory') or in a Redis Stream ('redis')
+        self.job_queue = os.getenv('JOB_QUEUE', 'memory')
+        self.job_chunk_size = int(os.getenv('JOB_CHUNK_SIZE', '1000'))
+        self.job_workers = int(os.getenv('JOB_WORKERS', '2'))
+        self.job_claim_idle = float(os.getenv('JOB_CLAIM_IDLE', '300'))
+
+        # Number of people screened together by the NDJSON streaming endpoint
+        self.stream_window_size = int(os.getenv('STREAM_WINDOW_SIZE', '500'))
+
+        # Screening engine, either 'ofac' (OFAC API) or 'local' (SDN list files on disk)
+        self.screening_engine = os.getenv('SCREENING_ENGINE', 'ofac')
+        self.sdn_list_path = os.getenv('SDN_LIST_PATH', 'data/sdn')
+        self.sdn_list_poll_interval = float(os.getenv('SDN_LIST_POLL_INTERVAL', '60'))
+        # Minimum TF-IDF cosine similarity (0 to 1) for a fuzzy name match
+        self.local_min_score = float(os.getenv('LOCAL_MIN_SCORE', '0.9'))
+        # Batches larger than the shard size are matched across this many processes (0 disables)
+        self.local_match_processes = int(os.getenv('LOCAL_MATCH_PROCESSES', '0'))
+        self.local_match_shard_size = int(os.getenv('LOCAL_MATCH_SHARD_SIZE', '5000'))
+        # Only score names against the list names sharing phonetic blocking keys with them,
+        # instead of against every list name
+        self.local_blocking = os.getenv('LOCAL_BLOCKING', 'true').lower() == 'true'
+
+        # Logging, with one JSON line per screening request giving the duration of each stage
+        self.log_level = os.getenv('LOG_LEVEL', 'INFO').upper()
+        self.log_request_timings = os.getenv('LOG_REQUEST_TIMINGS', 'false').lower() == 'true'
+
+        # The metrics and stats routes require an "Authorization: Bearer INTERNAL_TOKEN" header,
+        # and respond 404 without a token
+        self.internal_token = os.getenv('INTERNAL_TOKEN', '')
+
+        # Sampling profiler of the screening requests sending PROFILE_HEADER with the PROFILE_TOKEN
+        # value, or of a PROFILE_SAMPLE_RATE ratio (0 to 1) of them, writing their collapsed stacks
+        # to PROFILE_OUTPUT_DIR/<request id>.collapsed. Disabled without a token or a sample rate
+        self.profile_token = os.getenv('PROFILE_TOKEN', '')
+        self.profile_header = os.getenv('PROFILE_HEADER', 'X-Profile')
+        self.profile_sample_rate = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+        self.profile_output_dir = os.getenv('PROFILE_OUTPUT_DIR', 'profiles')
+        self.profile_interval = float(os.getenv('PROFILE_INTERVAL_MS', '5')) / 1000
+        self.profile_max_active = int(os.getenv('PROFILE_MAX_ACTIVE', '4'))
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """
+    Return the process-wide settings, loading the .env file on first use
+    """
+    return Settings()
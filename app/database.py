@@ -1,11 +1,16 @@
-import os
-from typing import List, Dict, Any
+import logging
+import time
+from typing import List, Dict, Any, Optional
 from datetime import datetime, timezone
-from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo import UpdateOne
 from pymongo.results import InsertOneResult, UpdateResult, BulkWriteResult
 from pymongo.cursor import Cursor
+from app.config import get_settings
+from app.utils.metrics import MONGO_BULK_WRITE_OPERATIONS, MONGO_BULK_WRITE_SECONDS
+
+
+logger = logging.getLogger(__name__)
 
 
 class MongoDB:
@@ -23,11 +28,11 @@ class MongoDB:
         self.client.close()
 
     def get_mongo_uri(self):
-        load_dotenv()
-        host = os.getenv("MONGO_HOST")
-        port = os.getenv("MONGO_PORT")
-        user = os.getenv("MONGO_INITDB_ROOT_USERNAME")
-        password = os.getenv("MONGO_INITDB_ROOT_PASSWORD")
+        settings = get_settings()
+        host = settings.mongo_host
+        port = settings.mongo_port
+        user = settings.mongo_user
+        password = settings.mongo_password
 
         return f'mongodb://{user}:{password}@{host}:{port}/'
 
@@ -43,12 +48,75 @@ class MongoDB:
         """
         return self.db[collection_name]
 
-    async def find_documents(self, collection_name: str, query: Dict[str, Any]) -> Cursor:
+    async def find_documents(self, collection_name: str, query: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         Find documents in a collection
+
+        Args:
+            collection_name: The name of the collection to search.
+            query: The filter query of the documents.
+
+        Returns:
+            List[Dict[str, Any]]: Every matching document.
+        """
+        collection = self.get_collection(collection_name)
+        return await collection.find(query).to_list(length=None)
+
+    def find_documents_cursor(
+        self,
+        collection_name: str,
+        query: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None
+    ) -> Cursor:
+        """
+        Return a cursor over the documents of a collection, to iterate them without loading them all
+
+        Args:
+            collection_name: The name of the collection to search.
+            query: The filter query of the documents.
+            projection: The fields to return.
+
+        Returns:
+            Cursor: An async cursor over the matching documents.
+        """
+        collection = self.get_collection(collection_name)
+        return collection.find(query, projection)
+
+    async def find_document(
+        self,
+        collection_name: str,
+        query: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Find a single document in a collection
+
+        Args:
+            collection_name: The name of the collection to search.
+            query: The filter query of the document.
+
+        Returns:
+            Optional[Dict[str, Any]]: The first matching document, if any.
+        """
+        collection = self.get_collection(collection_name)
+        return await collection.find_one(query)
+
+    async def aggregate_documents(
+        self,
+        collection_name: str,
+        pipeline: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Run an aggregation pipeline on a collection
+
+        Args:
+            collection_name: The name of the collection to aggregate.
+            pipeline: The aggregation stages.
+
+        Returns:
+            List[Dict[str, Any]]: The aggregated documents.
         """
         collection = self.get_collection(collection_name)
-        return await collection.find(query)
+        return await collection.aggregate(pipeline).to_list(length=None)
 
     async def insert_document(
         self,
@@ -101,33 +169,66 @@ class MongoDB:
     async def bulk_upsert_documents(
             self,
             collection_name: str,
-            operations: List[Dict[str, Dict[str, Any]]]
-        ) -> BulkWriteResult:
+            operations: List[Dict[str, Dict[str, Any]]],
+            batch_size: Optional[int] = None
+        ) -> List[BulkWriteResult]:
         """
         Perform bulk updates if documents exist, otherwise insert them.
 
+        The operations are written unordered, so the server applies them in parallel,
+        in sub-batches of at most batch_size operations. Make sure the filter queries
+        are backed by an index, or every operation scans the collection.
+
         Args:
             collection_name: The name of the collection to update.
-            operations: A list of operations, each containing a filter query and update values.
+            operations: A list of operations, each containing a filter query and update values,
+                and optionally increment values added to numeric fields and insert values only
+                set on insert. Operations without update values leave updated_at untouched.
+            batch_size: The maximum number of operations per bulk write, defaults to the
+                MONGO_BULK_WRITE_BATCH_SIZE setting.
 
         Returns:
-            BulkWriteResult: The result of the bulk write operation.
+            List[BulkWriteResult]: The result of each bulk write.
         """
-        current_time = datetime.now(timezone.utc)
+        batch_size = batch_size or get_settings().mongo_bulk_write_batch_size
         collection = self.get_collection(collection_name)
-
-        write_requests = []
-        for operation in operations:
-            update_values = {
-                **operation['update_values'],
-                'updated_at': current_time
-            }
-            config = {
-                '$set': update_values,
-                '$setOnInsert': { 'created_at': datetime.now(timezone.utc) }
-            }
-            request = UpdateOne(operation['filter_query'], config, upsert=True)
-            write_requests.append(request)
-
-        result = await collection.bulk_write(write_requests)
-        return result
+        write_seconds = MONGO_BULK_WRITE_SECONDS.labels(collection_name)
+        write_operations = MONGO_BULK_WRITE_OPERATIONS.labels(collection_name)
+
+        results = []
+        for i in range(0, len(operations), batch_size):
+            batch = operations[i:i + batch_size]
+
+            # every document of a batch shares the same timestamp
+            current_time = datetime.now(timezone.utc)
+            set_on_insert = { 'created_at': current_time }
+
+            write_requests = []
+            for operation in batch:
+                config = {
+                    '$setOnInsert': {**operation.get('insert_values', {}), **set_on_insert}
+                }
+                if 'update_values' in operation:
+                    config['$set'] = {
+                        **operation['update_values'],
+                        'updated_at': current_time
+                    }
+                if operation.get('increment_values'):
+                    config['$inc'] = operation['increment_values']
+                request = UpdateOne(operation['filter_query'], config, upsert=True)
+                write_requests.append(request)
+
+            start_time = time.perf_counter()
+            result = await collection.bulk_write(write_requests, ordered=False)
+            elapsed = time.perf_counter() - start_time
+            write_seconds.observe(elapsed)
+            write_operations.inc(len(write_requests))
+            logger.debug(
+                "MongoDB - Bulk upsert of %d documents into %s took %.1f ms",
+                len(write_requests),
+                collection_name,
+                elapsed * 1000
+            )
+            results.append(result)
+
+        return results
@@ -1,15 +1,45 @@
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi_redis_rate_limiter import RedisRateLimiterMiddleware, RedisClient
-from app.routes import screener
+from app.config import get_settings
+from app.registry import registry
+from app.routes import jobs, metrics, screener
+from app.services.engines import SCREENING_ENGINES
+from app.services.job_service import ScreeningJobService, ScreeningJobWorkers
+
+logging.basicConfig(
+    level=get_settings().log_level,
+    format='%(asctime)s %(levelname)s %(name)s - %(message)s'
+)
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Create the shared clients once per worker and close them on shutdown,
+    # even when starting or serving failed
+    settings = get_settings()
+    job_service = ScreeningJobService(registry, registry.job_queue, settings.job_chunk_size)
+    job_workers = ScreeningJobWorkers(job_service, settings.job_workers)
+    try:
+        await registry.start()
+        for screening_engine in SCREENING_ENGINES.values():
+            await screening_engine.create_indexes(registry.db_client)
 
-app.include_router(screener.router, prefix="/api/v1")
+        # Process the queued bulk screening chunks in the background
+        await job_workers.start()
+
+        yield
+    finally:
+        await job_workers.stop()
+        await registry.close()
 
-# Initialize the Redis client
-redis_client = RedisClient(host="localhost", port=6379, db=0)
+
+app = FastAPI(lifespan=lifespan)
+
+app.include_router(screener.router, prefix="/api/v1")
+app.include_router(jobs.router, prefix="/api/v1")
+app.include_router(metrics.router)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,14 +49,6 @@ app.add_middleware(
     allow_headers=["Authorization", "Content-Type"],
 )
 
-# Apply the rate limiter middleware to the app
-app.add_middleware(
-    RedisRateLimiterMiddleware,
-    redis_client=redis_client,
-    limit=40,
-    window=60
-)
-
 # Run the FastAPI application
 if __name__ == "__main__":
     import uvicorn
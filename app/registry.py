@@ -0,0 +1,266 @@
+"""
+This module provides the process-lifetime registry of shared clients
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import httpx
+from app.config import get_settings
+from app.database import MongoDB
+from app.sanctions.index_store import SdnIndexStore
+from app.utils.admission import AdmissionController
+from app.utils.http_utils import create_http_client
+from app.utils.job_queue import InMemoryJobQueue, JobQueue, RedisStreamJobQueue
+from app.utils.list_version import ListVersion
+from app.utils.local_cache import LocalCache
+from app.utils.profiler import RequestProfiler
+from app.utils.rate_limiter import RateLimiter
+from app.utils.redis_utils import RedisUtil
+from app.utils.resilience import CircuitBreaker, ResilientCaller
+from app.utils.single_flight import SingleFlight
+from app.utils.write_behind import WriteBehindBuffer
+
+
+class ClientRegistry:
+    """
+    Holds one MongoDB client, one Redis pool, one upstream HTTP client and
+    the local sanctions list index per worker.
+
+    Clients are created on startup (or lazily on first use outside of the
+    application lifespan) and shared by every request until shutdown.
+    """
+    def __init__(self) -> None:
+        self._db_client: Optional[MongoDB] = None
+        self._redis_util: Optional[RedisUtil] = None
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._sdn_index_store: Optional[SdnIndexStore] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._single_flight: Optional[SingleFlight] = None
+        self._local_cache: Optional[LocalCache] = None
+        self._job_queue: Optional[JobQueue] = None
+        self._write_behind: Optional[WriteBehindBuffer] = None
+        self._request_counter: Optional[WriteBehindBuffer] = None
+        self._list_version: Optional[ListVersion] = None
+        self._ofac_caller: Optional[ResilientCaller] = None
+        self._rate_limiter: Optional[RateLimiter] = None
+        self._profiler: Optional[RequestProfiler] = None
+        self._admission_controller: Optional[AdmissionController] = None
+
+    @property
+    def db_client(self) -> MongoDB:
+        if self._db_client is None:
+            self._db_client = MongoDB()
+        return self._db_client
+
+    @property
+    def redis_util(self) -> RedisUtil:
+        if self._redis_util is None:
+            self._redis_util = RedisUtil()
+        return self._redis_util
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = create_http_client()
+        return self._http_client
+
+    @property
+    def sdn_index_store(self) -> SdnIndexStore:
+        if self._sdn_index_store is None:
+            self._sdn_index_store = self.__create_sdn_index_store()
+            self._sdn_index_store.load()
+        return self._sdn_index_store
+
+    @property
+    def local_cache(self) -> LocalCache:
+        if self._local_cache is None:
+            settings = get_settings()
+            self._local_cache = LocalCache(settings.local_cache_size, settings.local_cache_ttl)
+        return self._local_cache
+
+    @property
+    def job_queue(self) -> JobQueue:
+        if self._job_queue is None:
+            settings = get_settings()
+            if settings.job_queue == 'redis':
+                self._job_queue = RedisStreamJobQueue(
+                    self.redis_util,
+                    claim_idle=settings.job_claim_idle
+                )
+            else:
+                self._job_queue = InMemoryJobQueue()
+        return self._job_queue
+
+    @property
+    def write_behind(self) -> Optional[WriteBehindBuffer]:
+        settings = get_settings()
+        if self._write_behind is None and settings.write_behind:
+            self._write_behind = WriteBehindBuffer(
+                self.db_client,
+                settings.write_behind_flush_size,
+                settings.write_behind_flush_interval,
+                settings.write_behind_max_size
+            )
+        return self._write_behind
+
+    @property
+    def request_counter(self) -> WriteBehindBuffer:
+        if self._request_counter is None:
+            settings = get_settings()
+            # the counts only order the cache warm-up, requests never wait for them
+            self._request_counter = WriteBehindBuffer(
+                self.db_client,
+                flush_interval=settings.request_count_flush_interval,
+                drop_when_full=True
+            )
+        return self._request_counter
+
+    @property
+    def list_version(self) -> ListVersion:
+        if self._list_version is None:
+            settings = get_settings()
+            self._list_version = ListVersion(self.redis_util, settings.list_version_refresh_interval)
+        return self._list_version
+
+    @property
+    def ofac_caller(self) -> ResilientCaller:
+        if self._ofac_caller is None:
+            settings = get_settings()
+            self._ofac_caller = ResilientCaller(
+                max_timeout=settings.ofac_api_timeout,
+                min_timeout=settings.ofac_api_min_timeout,
+                max_retries=settings.ofac_api_max_retries,
+                retry_budget=settings.ofac_api_retry_budget,
+                hedge_percentile=settings.ofac_api_hedge_percentile,
+                circuit_breaker=CircuitBreaker(
+                    failure_ratio=settings.ofac_api_breaker_failure_ratio,
+                    open_duration=settings.ofac_api_breaker_open_seconds
+                )
+            )
+        return self._ofac_caller
+
+    @property
+    def rate_limiter(self) -> Optional[RateLimiter]:
+        settings = get_settings()
+        if self._rate_limiter is None and settings.rate_limit:
+            self._rate_limiter = RateLimiter(
+                self.redis_util,
+                settings.rate_limit_rate,
+                settings.rate_limit_capacity,
+                settings.rate_limit_local_margin,
+                settings.rate_limit_sync_interval
+            )
+        return self._rate_limiter
+
+    @property
+    def admission_controller(self) -> Optional[AdmissionController]:
+        settings = get_settings()
+        if self._admission_controller is None and settings.admission_control:
+            self._admission_controller = AdmissionController(
+                settings.admission_concurrency,
+                settings.admission_priority_reserved,
+                settings.admission_priority_max_people,
+                settings.admission_priority_max_wait,
+                settings.admission_bulk_max_wait
+            )
+        return self._admission_controller
+
+    @property
+    def profiler(self) -> Optional[RequestProfiler]:
+        settings = get_settings()
+        enabled = bool(settings.profile_token) or settings.profile_sample_rate > 0
+        if self._profiler is None and enabled:
+            self._profiler = RequestProfiler(
+                settings.profile_output_dir,
+                settings.profile_interval,
+                settings.profile_max_active
+            )
+        return self._profiler
+
+    @property
+    def single_flight(self) -> SingleFlight:
+        if self._single_flight is None:
+            settings = get_settings()
+            redis_util = self.redis_util if settings.single_flight_redis_lock else None
+            self._single_flight = SingleFlight(redis_util, settings.single_flight_lock_timeout)
+        return self._single_flight
+
+    @property
+    def process_pool(self) -> Optional[ProcessPoolExecutor]:
+        processes = get_settings().local_match_processes
+        if self._process_pool is None and processes > 0:
+            self._process_pool = ProcessPoolExecutor(max_workers=processes)
+        return self._process_pool
+
+    # Private methods
+    def __create_sdn_index_store(self) -> SdnIndexStore:
+        settings = get_settings()
+        return SdnIndexStore(
+            settings.sdn_list_path,
+            settings.sdn_list_poll_interval,
+            settings.local_min_score
+        )
+
+    # Public methods
+
+    async def start(self) -> None:
+        """
+        Eagerly create every client so the first request does not pay for it
+        """
+        _ = self.db_client, self.redis_util, self.http_client
+
+        # only the local engine needs the sanctions list in memory
+        settings = get_settings()
+        uses_local_engine = 'local' in (settings.screening_engine, settings.ofac_api_fallback_engine)
+        if uses_local_engine and self._sdn_index_store is None:
+            self._sdn_index_store = self.__create_sdn_index_store()
+            await self._sdn_index_store.start()
+
+    async def close(self) -> None:
+        """
+        Close every client and release the pooled connections
+        """
+        if self._sdn_index_store is not None:
+            await self._sdn_index_store.close()
+            self._sdn_index_store = None
+
+        if self._process_pool is not None:
+            self._process_pool.shutdown(cancel_futures=True)
+            self._process_pool = None
+
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+        # drain the buffered writes while MongoDB is still open
+        if self._write_behind is not None:
+            await self._write_behind.close()
+            self._write_behind = None
+        if self._request_counter is not None:
+            await self._request_counter.close()
+            self._request_counter = None
+
+        self._list_version = None
+        self._rate_limiter = None
+        self._profiler = None
+        self._admission_controller = None
+
+        self._single_flight = None
+        self._job_queue = None
+        if self._redis_util is not None:
+            await self._redis_util.close()
+            self._redis_util = None
+
+        if self._db_client is not None:
+            self._db_client.close()
+            self._db_client = None
+
+
+registry = ClientRegistry()
+
+
+def get_registry() -> ClientRegistry:
+    """
+    FastAPI dependency returning the process-wide client registry
+    """
+    return registry
@@ -0,0 +1,25 @@
+"""
+This module provides the access control of the internal routes, the metrics and stats
+"""
+
+import hmac
+from fastapi import HTTPException, Request
+from app.config import get_settings
+
+
+def require_internal_token(request: Request) -> None:
+    """
+    Let through the requests sending the INTERNAL_TOKEN as a bearer token,
+    responding 404 as if the route did not exist when no token is set
+    """
+    token = get_settings().internal_token
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(credentials.encode(), token.encode()):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid internal token",
+            headers={'WWW-Authenticate': 'Bearer'}
+        )
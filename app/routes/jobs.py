@@ -0,0 +1,35 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.config import get_settings
+from app.registry import ClientRegistry, get_registry
+from app.routes.rate_limit import admit, get_rate_limit_service
+from app.schemas import Person, ScreeningJob, ScreeningJobStatus
+from app.services.job_service import ScreeningJobService
+from app.services.rate_limit_service import RateLimitService
+
+
+router = APIRouter()
+
+def get_job_service(clients: ClientRegistry = Depends(get_registry)) -> ScreeningJobService:
+    return ScreeningJobService(clients, clients.job_queue, get_settings().job_chunk_size)
+
+@router.post('/screen/jobs', response_model=ScreeningJob, status_code=202)
+async def create_screening_job(
+    people: List[Person],
+    job_service: ScreeningJobService = Depends(get_job_service),
+    rate_limit_service: RateLimitService = Depends(get_rate_limit_service)
+) -> ScreeningJob:
+    # every person is charged as a cache hit up front, the workers charge those they screen
+    await admit(rate_limit_service, len(people))
+    return await job_service.create_job(people, rate_limit_service.client_id)
+
+@router.get('/screen/jobs/{job_id}', response_model=ScreeningJobStatus)
+async def screening_job(
+    job_id: str,
+    page: int = Query(0, ge=0),
+    job_service: ScreeningJobService = Depends(get_job_service)
+) -> ScreeningJobStatus:
+    job_status = await job_service.get_job(job_id, page)
+    if job_status is None:
+        raise HTTPException(status_code=404, detail="Screening job not found")
+    return job_status
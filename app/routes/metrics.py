@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends
+from starlette.responses import PlainTextResponse
+from app.registry import ClientRegistry, get_registry
+from app.routes.internal import require_internal_token
+from app.utils.metrics import (
+    ADMISSION_SLOTS_IN_USE,
+    ADMISSION_WAITING,
+    LOCAL_CACHE_ENTRIES,
+    OFAC_CIRCUIT_OPEN,
+    WRITE_BEHIND_DEPTH,
+    metrics
+)
+from app.utils.resilience import CircuitBreaker
+
+
+router = APIRouter(dependencies=[Depends(require_internal_token)])
+
+PROMETHEUS_MEDIA_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@router.get('/metrics', response_class=PlainTextResponse)
+async def get_metrics(clients: ClientRegistry = Depends(get_registry)) -> PlainTextResponse:
+    # the state of the shared clients is read when scraped rather than tracked on the hot path
+    LOCAL_CACHE_ENTRIES.set(len(clients.local_cache))
+    write_behind = clients.write_behind
+    WRITE_BEHIND_DEPTH.set(len(write_behind) if write_behind is not None else 0)
+    circuit_breaker = clients.ofac_caller.circuit_breaker
+    OFAC_CIRCUIT_OPEN.set(1 if circuit_breaker.state == CircuitBreaker.OPEN else 0)
+    admission_controller = clients.admission_controller
+    if admission_controller is not None:
+        ADMISSION_SLOTS_IN_USE.set(admission_controller.in_use)
+        for lane, waiters in admission_controller.waiters.items():
+            ADMISSION_WAITING.labels(lane).set(len(waiters))
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_MEDIA_TYPE)
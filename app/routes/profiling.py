@@ -0,0 +1,24 @@
+"""
+This module provides the opt-in profiling of the screening routes
+"""
+
+import hmac
+import random
+import uuid
+from typing import Optional
+from fastapi import Request
+from app.config import get_settings
+
+
+def get_profile_id(request: Request) -> Optional[str]:
+    """
+    Return the id a request is profiled under, its X-Request-ID header when set,
+    None when it is not profiled
+    """
+    settings = get_settings()
+    token = settings.profile_token
+    if token and hmac.compare_digest(request.headers.get(settings.profile_header, '').encode(), token.encode()):
+        return request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    if settings.profile_sample_rate > 0 and random.random() < settings.profile_sample_rate:
+        return request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    return None
@@ -0,0 +1,40 @@
+"""
+This module provides the rate limiting of the screening routes
+"""
+
+from fastapi import Depends, HTTPException, Request
+from app.config import get_settings
+from app.registry import ClientRegistry, get_registry
+from app.services.rate_limit_service import RateLimitService
+from app.utils.rate_limiter import RateLimitExceededError
+
+
+def get_client_id(request: Request) -> str:
+    settings = get_settings()
+    header = settings.rate_limit_client_header
+    if header and request.headers.get(header):
+        # proxies append the address they were reached from, only the entries of trusted proxies
+        # can be relied on, the leftmost ones are whatever the client sent
+        addresses = [address.strip() for address in request.headers[header].split(',') if address.strip()]
+        if 0 < settings.rate_limit_trusted_hops <= len(addresses):
+            return addresses[-settings.rate_limit_trusted_hops]
+    return request.client.host if request.client else 'unknown'
+
+def get_rate_limit_service(
+    request: Request,
+    clients: ClientRegistry = Depends(get_registry)
+) -> RateLimitService:
+    return RateLimitService.for_client(clients.rate_limiter, get_client_id(request))
+
+async def admit(rate_limit_service: RateLimitService, identities: int) -> None:
+    """
+    Charge a request to its client, responding 429 with Retry-After when over the limit
+    """
+    try:
+        await rate_limit_service.admit(identities)
+    except RateLimitExceededError as err:
+        raise HTTPException(
+            status_code=429,
+            detail=err.message,
+            headers={'Retry-After': str(err.retry_after)}
+        ) from err
@@ -1,12 +1,196 @@
-from typing import List
-from fastapi import APIRouter
+import inspect
+import json
+import logging
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from starlette.responses import Response, StreamingResponse
+from starlette.types import Receive, Scope, Send
+from app.config import get_settings
+from app.registry import ClientRegistry, get_registry
+from app.routes.internal import require_internal_token
+from app.routes.profiling import get_profile_id
+from app.routes.rate_limit import admit, get_rate_limit_service
 from app.schemas import Person, PersonScreeningResult
-from app.services.ofac_screening_service import OfacScreeningService
+from app.services.engines import get_screening_engine
+from app.services.rate_limit_service import RateLimitService
+from app.services.screening_service import ScreeningService
+from app.services.stream_screening_service import StreamScreeningService
+from app.utils.admission import AdmissionRejectedError
+from app.utils.columnar import (
+    ARROW_MEDIA_TYPE,
+    CSV_MEDIA_TYPE,
+    ColumnarFormatError,
+    is_arrow_available,
+    read_arrow_people,
+    read_csv_people,
+    write_arrow_results,
+    write_csv_results
+)
+from app.utils.resilience import CircuitOpenError
 
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
+
+class NdjsonStreamingResponse(StreamingResponse):
+    """
+    Streams NDJSON while the request body is still being read.
+
+    The default StreamingResponse listens for disconnects on receive(),
+    which would swallow the request body messages the stream depends on.
+    """
+    media_type = 'application/x-ndjson'
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def report_timings(screening_service: ScreeningService, identities: int, response: Response) -> None:
+    """
+    Give the duration of each stage of a screening request in a Server-Timing header,
+    and log them as a JSON line when LOG_REQUEST_TIMINGS is set
+    """
+    timings = screening_service.timings
+    response.headers['Server-Timing'] = timings.as_server_timing()
+    if get_settings().log_request_timings:
+        logger.info(json.dumps({
+            'event': 'screening_request',
+            'people': len(screening_service.people),
+            'identities': identities,
+            'screened': screening_service.screened,
+            'degraded': screening_service.degraded,
+            'timings_ms': timings.as_dict()
+        }))
+
+async def run_screening(
+    people: List[Person],
+    clients: ClientRegistry,
+    rate_limit_service: RateLimitService,
+    response: Response
+) -> List[PersonScreeningResult]:
+    screening_service = get_screening_engine()(people, clients)
+    screening_service.admission_controller = clients.admission_controller
+    identities = {person.identity for person in screening_service.people}
+    await admit(rate_limit_service, len(identities))
+    try:
+        return await screening_service.get_screening_results()
+    except AdmissionRejectedError as err:
+        raise HTTPException(
+            status_code=503,
+            detail=err.message,
+            headers={'Retry-After': str(err.retry_after)}
+        ) from err
+    except CircuitOpenError as err:
+        retry_after = int(clients.ofac_caller.circuit_breaker.open_duration)
+        raise HTTPException(
+            status_code=503,
+            detail=err.message,
+            headers={'Retry-After': str(retry_after)}
+        ) from err
+    finally:
+        # people who were not cached cost more, charged with the client's next request
+        rate_limit_service.charge(0, screening_service.screened)
+        report_timings(screening_service, len(identities), response)
+
+async def screen(
+    people: List[Person],
+    clients: ClientRegistry,
+    rate_limit_service: RateLimitService,
+    response: Response,
+    profile_id: Optional[str] = None
+) -> List[PersonScreeningResult]:
+    profiler = clients.profiler if profile_id is not None else None
+    if profiler is None:
+        return await run_screening(people, clients, rate_limit_service, response)
+
+    # samples going through this coroutine's frame belong to the request
+    with profiler.profile(profile_id, inspect.currentframe()) as profile_path:
+        if profile_path is not None:
+            response.headers['X-Profile-Id'] = profile_id
+        return await run_screening(people, clients, rate_limit_service, response)
+
 @router.post('/screen/', response_model=List[PersonScreeningResult])
-async def screening_results(people: List[Person]) -> List[PersonScreeningResult]:
-    ofac_screening_service = OfacScreeningService(people)
-    return await ofac_screening_service.get_screening_results()
+async def screening_results(
+    people: List[Person],
+    response: Response,
+    clients: ClientRegistry = Depends(get_registry),
+    rate_limit_service: RateLimitService = Depends(get_rate_limit_service),
+    profile_id: Optional[str] = Depends(get_profile_id)
+) -> List[PersonScreeningResult]:
+    return await screen(people, clients, rate_limit_service, response, profile_id)
+
+@router.post('/screen/bulk')
+async def bulk_screening_results(
+    request: Request,
+    response: Response,
+    clients: ClientRegistry = Depends(get_registry),
+    rate_limit_service: RateLimitService = Depends(get_rate_limit_service),
+    profile_id: Optional[str] = Depends(get_profile_id)
+) -> Response:
+    media_type = request.headers.get('content-type', '').split(';')[0].strip().lower()
+    if media_type == ARROW_MEDIA_TYPE and not is_arrow_available():
+        raise HTTPException(status_code=415, detail="Arrow uploads require the pyarrow package")
+    if media_type not in (CSV_MEDIA_TYPE, ARROW_MEDIA_TYPE):
+        raise HTTPException(
+            status_code=415,
+            detail=f"Expected a {CSV_MEDIA_TYPE} or {ARROW_MEDIA_TYPE} body"
+        )
+
+    # columns are validated as a whole instead of building a Person model per row
+    body = await request.body()
+    try:
+        people = read_csv_people(body) if media_type == CSV_MEDIA_TYPE else read_arrow_people(body)
+    except ColumnarFormatError as err:
+        raise HTTPException(
+            status_code=422,
+            detail={'message': err.message, 'errors': err.errors}
+        ) from err
+
+    results = await screen(people, clients, rate_limit_service, response, profile_id)
+    # headers set on the injected response are not merged into a returned one
+    headers = dict(response.headers)
+    if media_type == CSV_MEDIA_TYPE:
+        return Response(write_csv_results(results), media_type=CSV_MEDIA_TYPE, headers=headers)
+    return Response(write_arrow_results(results), media_type=ARROW_MEDIA_TYPE, headers=headers)
+
+@router.post('/screen/stream', response_class=NdjsonStreamingResponse)
+async def streaming_screening_results(
+    request: Request,
+    clients: ClientRegistry = Depends(get_registry),
+    rate_limit_service: RateLimitService = Depends(get_rate_limit_service)
+) -> NdjsonStreamingResponse:
+    # the people are only known while streaming, each window is charged as it is read
+    await admit(rate_limit_service, 0)
+    stream_screening_service = StreamScreeningService(
+        clients,
+        get_settings().stream_window_size,
+        rate_limit_service=rate_limit_service
+    )
+    return NdjsonStreamingResponse(stream_screening_service.screen(request.stream()))
+
+@router.get('/screen/cache-stats', dependencies=[Depends(require_internal_token)])
+async def cache_stats(clients: ClientRegistry = Depends(get_registry)) -> Dict[str, Any]:
+    return clients.local_cache.stats()
+
+@router.get('/screen/write-behind-stats', dependencies=[Depends(require_internal_token)])
+async def write_behind_stats(clients: ClientRegistry = Depends(get_registry)) -> Dict[str, Any]:
+    write_behind = clients.write_behind
+    return write_behind.stats() if write_behind is not None else {'enabled': False}
+
+@router.get('/screen/rate-limit-stats', dependencies=[Depends(require_internal_token)])
+async def rate_limit_stats(clients: ClientRegistry = Depends(get_registry)) -> Dict[str, Any]:
+    rate_limiter = clients.rate_limiter
+    return rate_limiter.stats() if rate_limiter is not None else {'enabled': False}
+
+@router.get('/screen/admission-stats', dependencies=[Depends(require_internal_token)])
+async def admission_stats(clients: ClientRegistry = Depends(get_registry)) -> Dict[str, Any]:
+    admission_controller = clients.admission_controller
+    return admission_controller.stats() if admission_controller is not None else {'enabled': False}
+
+@router.get('/screen/upstream-stats', dependencies=[Depends(require_internal_token)])
+async def upstream_stats(clients: ClientRegistry = Depends(get_registry)) -> Dict[str, Any]:
+    return clients.ofac_caller.stats()
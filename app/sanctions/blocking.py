@@ -0,0 +1,111 @@
+"""
+This module provides the blocking index of a sanctions list, narrowing the
+names a screened name has to be compared with to a small candidate set
+"""
+
+from itertools import combinations
+from typing import Dict, List, Sequence, Set, Tuple
+from app.sanctions.sdn_list import SanctionEntry
+from app.utils.text_utils import name_tokens, phonetic_code, transliterate_token
+
+
+def get_blocking_keys(name: str) -> Tuple[List[str], List[str]]:
+    """
+    Return the blocking keys of a name
+
+    Args:
+        name: The name to key
+
+    Returns:
+        The distinct phonetic codes of its tokens, and its whole-name keys: the
+        sorted phonetic codes, insensitive to token order, and the phonetic code
+        of its transliterated tokens run together, insensitive to how the name is
+        split into tokens ("Abd al-Rahman", "Abdulrahman")
+    """
+    tokens = name_tokens(name)
+    if not tokens:
+        return [], []
+    codes = [phonetic_code(token) for token in tokens]
+    name_keys = [
+        's:' + ' '.join(sorted(codes)),
+        'c:' + phonetic_code(''.join(transliterate_token(token) for token in tokens))
+    ]
+    return list(dict.fromkeys(code for code in codes if code)), name_keys
+
+
+class BlockingIndex:
+    """
+    Blocking keys over every name and alias of a list of SanctionEntries.
+
+    Names are addressed by their position in the names list, in the order of
+    the entries and of their names, and owners gives the entry of each name.
+
+    The candidates of a name are the names sharing one of its whole-name keys,
+    or the phonetic codes of at least min_shared_tokens of its tokens (all of
+    them for shorter names), so romanizations such as "Mohammed", "Muhammad"
+    and "Mohamad" land in the same block while unrelated names sharing a
+    common token ("Muhammad") do not. Candidates are looked up from the
+    smallest token blocks, so common tokens cost little. Sharing a block is
+    not a match: candidates still have to be scored.
+
+    Args:
+        entries: The entries of the sanctions list
+        min_shared_tokens: The number of token codes a candidate shares with the name
+    """
+    def __init__(self, entries: Sequence[SanctionEntry], min_shared_tokens: int = 2) -> None:
+        self.entries = entries
+        self.min_shared_tokens = min_shared_tokens
+        self.names: List[str] = []
+        self.owners: List[int] = []
+        self.token_blocks: Dict[str, Set[int]] = {}
+        self.name_blocks: Dict[str, Set[int]] = {}
+
+        for position, entry in enumerate(entries):
+            for name in entry.names:
+                name_id = len(self.names)
+                self.names.append(name)
+                self.owners.append(position)
+                codes, name_keys = get_blocking_keys(name)
+                for code in codes:
+                    self.token_blocks.setdefault(code, set()).add(name_id)
+                for key in name_keys:
+                    self.name_blocks.setdefault(key, set()).add(name_id)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    # Private methods
+    def _get_shared_token_names(self, codes: List[str]) -> Set[int]:
+        """
+        Find the names sharing enough token codes, as the union of the intersections
+        of every combination of that many token blocks. Set intersections only
+        walk their smallest set, so common tokens cost little
+        """
+        blocks = [self.token_blocks[code] for code in codes if code in self.token_blocks]
+        required = min(self.min_shared_tokens, len(codes))
+        if required > len(blocks) or not blocks:
+            return set()
+        if required <= 1:
+            return set().union(*blocks)
+
+        candidates: Set[int] = set()
+        for combination in combinations(blocks, required):
+            candidates |= set.intersection(*combination)
+        return candidates
+
+    # Public methods
+    def get_candidate_names(self, name: str) -> Set[int]:
+        """
+        Find the names a name has to be compared with
+
+        Args:
+            name: The screened name
+
+        Returns:
+            The positions of the candidate names in the names list
+        """
+        codes, name_keys = get_blocking_keys(name)
+        candidates = self._get_shared_token_names(codes)
+        for key in name_keys:
+            candidates.update(self.name_blocks.get(key, ()))
+        return candidates
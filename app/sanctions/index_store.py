@@ -0,0 +1,109 @@
+"""
+This module provides a hot-swappable holder of the sanctions list index
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+from typing import Optional, Tuple
+from app.sanctions.sdn_index import SdnIndex
+from app.sanctions.sdn_list import get_list_files, load_sanctions_list
+
+
+logger = logging.getLogger(__name__)
+
+
+class SdnIndexStore:
+    """
+    Holds the current SdnIndex and rebuilds it when the list files change.
+
+    A new index is built off the event loop and published with a single
+    attribute assignment, so readers that grabbed the previous index keep
+    using it unchanged while new readers see the new one.
+    Drop new list files in by writing them elsewhere and renaming them into
+    place, so a half-written file is never loaded.
+    """
+    def __init__(self, path: str, poll_interval: float, min_score: float = 0.9) -> None:
+        self.path = path
+        self.poll_interval = poll_interval
+        self.min_score = min_score
+        self.index = SdnIndex([])
+        self._signature: Optional[Tuple] = None
+        self._watch_task: Optional[asyncio.Task] = None
+
+    # Private methods
+    def _get_signature(self) -> Tuple:
+        """
+        Return a fingerprint of the list files that changes whenever one of them does
+        """
+        signature = []
+        for list_file in get_list_files(self.path):
+            stat = os.stat(list_file)
+            signature.append((list_file, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _build_index(self, signature: Tuple) -> SdnIndex:
+        version = hashlib.sha1(repr(signature).encode('utf-8')).hexdigest()[:12]
+        return SdnIndex(load_sanctions_list(self.path), version, self.min_score)
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.reload()
+            except Exception as err:  # pylint: disable=broad-exception-caught
+                # keep serving the current index when a new list cannot be loaded
+                logger.error("SDN list - Error reloading %s: %s", self.path, err)
+
+    # Public methods
+    def load(self) -> bool:
+        """
+        Synchronously load the list files if they changed since the last load
+
+        Returns:
+            Whether a new index was published
+        """
+        signature = self._get_signature()
+        if signature == self._signature:
+            return False
+
+        self.index = self._build_index(signature)
+        self._signature = signature
+        return True
+
+    async def reload(self) -> bool:
+        """
+        Rebuild the index in a worker thread if the list files changed
+
+        Returns:
+            Whether a new index was published
+        """
+        signature = await asyncio.to_thread(self._get_signature)
+        if signature == self._signature:
+            return False
+
+        index = await asyncio.to_thread(self._build_index, signature)
+        self.index = index
+        self._signature = signature
+        return True
+
+    async def start(self) -> None:
+        """
+        Load the current list and start polling for new list files
+        """
+        await self.reload()
+        if self.poll_interval > 0 and self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def close(self) -> None:
+        """
+        Stop polling for new list files
+        """
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
@@ -0,0 +1,88 @@
+"""
+This module provides the difference between two versions of a sanctions list
+"""
+
+from typing import List, Sequence, Set
+from app.sanctions.sdn_index import SdnIndex
+from app.sanctions.sdn_list import SanctionEntry
+
+
+def diff_sanctions_lists(
+    previous: List[SanctionEntry],
+    current: List[SanctionEntry]
+) -> List[SanctionEntry]:
+    """
+    Return the entries that were added, changed or removed between two list versions
+
+    Both versions of a changed entry are returned, so people matching a name
+    it no longer carries are screened again too.
+
+    Args:
+        previous: The entries of the previous list
+        current: The entries of the current list
+
+    Returns:
+        The entries differing between the two lists
+    """
+    previous_by_uid = {entry.uid: entry for entry in previous}
+    current_by_uid = {entry.uid: entry for entry in current}
+
+    delta = []
+    for uid, entry in current_by_uid.items():
+        previous_entry = previous_by_uid.get(uid)
+        if previous_entry != entry:
+            delta.append(entry)
+            if previous_entry is not None:
+                delta.append(previous_entry)
+    delta.extend(entry for uid, entry in previous_by_uid.items() if uid not in current_by_uid)
+    return delta
+
+
+class DeltaIndex:
+    """
+    Matches names against the entries that changed between two list versions.
+
+    Names are scored by an SdnIndex over the whole current list and the previous
+    versions of the changed and removed entries, so with the same n-gram weights
+    as normal screening, then only the matches of changed entries are kept.
+    Scoring against the changed entries alone would skew the weights of a tiny
+    list, and miss spelling variants normal screening matches.
+
+    Args:
+        previous: The entries of the previous list
+        current: The entries of the current list
+        min_score: The minimum n-gram score of a name match
+    """
+    def __init__(
+        self,
+        previous: List[SanctionEntry],
+        current: List[SanctionEntry],
+        min_score: float = 0.9
+    ) -> None:
+        self.delta = diff_sanctions_lists(previous, current)
+        current_entries = set(current)
+        self.index = SdnIndex(
+            list(current) + [entry for entry in self.delta if entry not in current_entries],
+            min_score=min_score
+        )
+        delta_entries = set(self.delta)
+        self.positions = {
+            position for position, entry in enumerate(self.index.entries) if entry in delta_entries
+        }
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def match_names(self, names: Sequence[str]) -> List[Set[int]]:
+        """
+        Find the changed entries matching each name of a batch
+
+        Args:
+            names: The names to look up
+
+        Returns:
+            For each name, the positions of the matching changed entries
+        """
+        if not self.positions:
+            return [set() for _ in names]
+        return [matches & self.positions for matches in self.index.match_names(names)]
@@ -0,0 +1,199 @@
+"""
+This module provides batch fuzzy name matching with TF-IDF character n-grams
+
+Every name is encoded as a sparse, L2-normalized TF-IDF vector of its character
+n-grams, so the cosine similarity of every (query, sanction name) pair of a
+batch is a single sparse matrix product.
+"""
+
+from concurrent.futures import Executor
+from typing import Collection, Dict, List, Sequence, Set
+import numpy as np
+from scipy import sparse
+from app.utils.text_utils import get_name_key
+
+
+def get_ngrams(name: str, ngram_size: int) -> List[str]:
+    """
+    Return the character n-grams of a name
+
+    The name is normalized and its tokens sorted first, so token order
+    does not change the n-grams beyond the token boundaries.
+
+    Args:
+        name: The name to split
+        ngram_size: The number of characters per n-gram
+
+    Returns:
+        A list of n-grams, with repeats
+    """
+    padded = f' {get_name_key(name)} '
+    return [padded[i:i + ngram_size] for i in range(len(padded) - ngram_size + 1)]
+
+
+class NgramMatcher:
+    """
+    Scores batches of names against a fixed list of sanction names.
+
+    Args:
+        names: The sanction names (primary names and aliases)
+        owners: For each name, the position of the entry it belongs to
+        ngram_size: The number of characters per n-gram
+        min_score: The minimum cosine similarity for a name match, between 0 and 1
+        top_k: The maximum number of matched names kept per query
+    """
+    def __init__(
+        self,
+        names: Sequence[str],
+        owners: Sequence[int],
+        ngram_size: int = 3,
+        min_score: float = 0.9,
+        top_k: int = 10
+    ) -> None:
+        self.ngram_size = ngram_size
+        self.min_score = min_score
+        self.top_k = top_k
+        self.owners = np.asarray(owners, dtype=np.int64)
+
+        # assign a column to every n-gram seen in the sanction names
+        self.vocabulary: Dict[str, int] = {}
+        name_ngrams = [get_ngrams(name, ngram_size) for name in names]
+        for ngrams in name_ngrams:
+            for ngram in ngrams:
+                self.vocabulary.setdefault(ngram, len(self.vocabulary))
+
+        # smoothed inverse document frequency of every n-gram
+        document_count = len(names)
+        document_frequency = np.zeros(len(self.vocabulary), dtype=np.float64)
+        for ngrams in name_ngrams:
+            for ngram in set(ngrams):
+                document_frequency[self.vocabulary[ngram]] += 1
+        self.idf = np.log((1 + document_count) / (1 + document_frequency)) + 1
+        # n-grams never seen in the list are as rare as it gets
+        self.unknown_idf = float(np.log(1 + document_count) + 1)
+
+        # transposed once so every batch is a plain (queries x ngrams) @ (ngrams x names) product,
+        # and kept by name for scoring candidate pairs only
+        self.name_rows = self.__vectorize(name_ngrams)
+        self.name_matrix = self.name_rows.T.tocsr()
+
+    # Private methods
+    def __vectorize(self, batch_ngrams: List[List[str]]) -> sparse.csr_matrix:
+        """
+        Encode the n-grams of a batch of names as L2-normalized TF-IDF rows
+
+        N-grams outside the vocabulary cannot match anything, but still count
+        towards the norm of their row so unusual names are not over-scored.
+        """
+        rows, columns, values = [], [], []
+        norms = np.zeros(len(batch_ngrams), dtype=np.float64)
+        for row, ngrams in enumerate(batch_ngrams):
+            counts: Dict[str, int] = {}
+            for ngram in ngrams:
+                counts[ngram] = counts.get(ngram, 0) + 1
+
+            squared_norm = 0.0
+            for ngram, count in counts.items():
+                column = self.vocabulary.get(ngram)
+                weight = count * (self.idf[column] if column is not None else self.unknown_idf)
+                squared_norm += weight * weight
+                if column is not None:
+                    rows.append(row)
+                    columns.append(column)
+                    values.append(weight)
+            norms[row] = np.sqrt(squared_norm) or 1.0
+
+        values = np.asarray(values, dtype=np.float64) / norms[np.asarray(rows, dtype=np.int64)]
+        return sparse.csr_matrix(
+            (values, (rows, columns)),
+            shape=(len(batch_ngrams), len(self.vocabulary))
+        )
+
+    # Public methods
+    def match(self, names: Sequence[str]) -> List[Set[int]]:
+        """
+        Find the entries whose names are similar enough to each query name
+
+        Args:
+            names: The query names
+
+        Returns:
+            For each query name, the positions of the matched entries
+        """
+        if not names or not self.vocabulary:
+            return [set() for _ in names]
+
+        query_matrix = self.__vectorize([get_ngrams(name, self.ngram_size) for name in names])
+        scores = (query_matrix @ self.name_matrix).tocsr()
+
+        # drop every pair under the threshold before looking at rows
+        scores.data[scores.data < self.min_score] = 0
+        scores.eliminate_zeros()
+
+        matches = []
+        for row in range(scores.shape[0]):
+            start, end = scores.indptr[row], scores.indptr[row + 1]
+            row_scores = scores.data[start:end]
+            row_names = scores.indices[start:end]
+            if len(row_scores) > self.top_k:
+                top = np.argpartition(-row_scores, self.top_k)[:self.top_k]
+                row_names = row_names[top]
+            matches.append(set(self.owners[row_names].tolist()))
+        return matches
+
+    def match_candidates(self, names: Sequence[str], candidates: Sequence[Collection[int]]) -> List[Set[int]]:
+        """
+        Same as match, only scoring each query name against its candidate names,
+        e.g. those of a BlockingIndex, instead of every name
+
+        Args:
+            names: The query names
+            candidates: For each query name, the positions of its candidate names
+
+        Returns:
+            For each query name, the positions of the matched entries
+        """
+        rows, columns = [], []
+        for row, name_candidates in enumerate(candidates):
+            rows.extend([row] * len(name_candidates))
+            columns.extend(name_candidates)
+        if not columns:
+            return [set() for _ in names]
+
+        # one row-wise dot product per (query, candidate) pair
+        query_matrix = self.__vectorize([get_ngrams(name, self.ngram_size) for name in names])
+        scores = np.asarray(
+            query_matrix[rows].multiply(self.name_rows[columns]).sum(axis=1)
+        ).ravel()
+
+        matches = [set() for _ in names]
+        owners = self.owners[columns]
+        for index in np.flatnonzero(scores >= self.min_score).tolist():
+            matches[rows[index]].add(int(owners[index]))
+        return matches
+
+    def match_sharded(
+        self,
+        names: Sequence[str],
+        executor: Executor,
+        shard_size: int
+    ) -> List[Set[int]]:
+        """
+        Split a large batch into shards and score them on an executor
+
+        With a ProcessPoolExecutor the matcher is pickled once per shard,
+        so shards should be large enough to amortize the transfer.
+
+        Args:
+            names: The query names
+            executor: The executor running the shards
+            shard_size: The number of names per shard
+
+        Returns:
+            For each query name, the positions of the matched entries
+        """
+        shards = [names[i:i + shard_size] for i in range(0, len(names), shard_size)]
+        matches = []
+        for shard_matches in executor.map(self.match, shards):
+            matches.extend(shard_matches)
+        return matches
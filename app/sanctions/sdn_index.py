@@ -0,0 +1,126 @@
+"""
+This module provides the in-memory index of a sanctions list
+"""
+
+from concurrent.futures import Executor
+from typing import Dict, Iterable, List, Sequence, Set
+from app.sanctions.blocking import BlockingIndex
+from app.sanctions.ngram_matcher import NgramMatcher
+from app.sanctions.sdn_list import SanctionEntry
+from app.schemas import Person, PersonScreeningResult
+from app.utils.countries import normalize_country
+from app.utils.text_utils import get_name_key, name_tokens
+
+
+class SdnIndex:
+    """
+    Immutable lookup structure over a list of SanctionEntries
+
+    Entries are addressed by their position in the entries list, and indexed
+    on their normalized name tokens, full dates of birth and countries.
+    Fuzzy name matches come from an NgramMatcher over every name and alias,
+    scored against every name or only against the candidates of a BlockingIndex.
+    """
+    def __init__(
+        self,
+        entries: List[SanctionEntry],
+        version: str = '',
+        min_score: float = 0.9
+    ) -> None:
+        self.entries = entries
+        self.version = version
+        self.name_index: Dict[str, Set[int]] = {}
+        self.token_index: Dict[str, Set[int]] = {}
+        self.dob_index: Dict[str, Set[int]] = {}
+        self.country_index: Dict[str, Set[int]] = {}
+
+        for position, entry in enumerate(entries):
+            for name in entry.names:
+                self.name_index.setdefault(get_name_key(name), set()).add(position)
+                for token in name_tokens(name):
+                    self.token_index.setdefault(token, set()).add(position)
+            for dob in entry.dobs:
+                self.dob_index.setdefault(dob, set()).add(position)
+            for country in entry.countries:
+                self.country_index.setdefault(country, set()).add(position)
+
+        self.blocking = BlockingIndex(entries)
+        self.matcher = NgramMatcher(self.blocking.names, self.blocking.owners, min_score=min_score)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def match_name(self, name: str) -> Set[int]:
+        """
+        Find the entries with a name or alias made of the same tokens
+
+        Args:
+            name: The name to look up
+
+        Returns:
+            The positions of the matching entries
+        """
+        return self.name_index.get(get_name_key(name), set())
+
+    def match_names(self, names: Sequence[str]) -> List[Set[int]]:
+        """
+        Find the entries matching each name of a batch, exactly or fuzzily
+
+        Args:
+            names: The names to look up
+
+        Returns:
+            For each name, the positions of the matching entries
+        """
+        fuzzy_matches = self.matcher.match(names)
+        return [self.match_name(name) | matches for name, matches in zip(names, fuzzy_matches)]
+
+    def match_names_blocked(self, names: Sequence[str]) -> List[Set[int]]:
+        """
+        Same as match_names, only scoring each name against its blocking candidates
+
+        Args:
+            names: The names to look up
+
+        Returns:
+            For each name, the positions of the matching entries
+        """
+        candidates = [self.blocking.get_candidate_names(name) for name in names]
+        fuzzy_matches = self.matcher.match_candidates(names, candidates)
+        return [self.match_name(name) | matches for name, matches in zip(names, fuzzy_matches)]
+
+    def match_names_sharded(
+        self,
+        names: Sequence[str],
+        executor: Executor,
+        shard_size: int
+    ) -> List[Set[int]]:
+        """
+        Same as match_names, with the fuzzy matching sharded across an executor
+        """
+        fuzzy_matches = self.matcher.match_sharded(names, executor, shard_size)
+        return [self.match_name(name) | matches for name, matches in zip(names, fuzzy_matches)]
+
+    def screen(self, person: Person, matches: Iterable[int]) -> PersonScreeningResult:
+        """
+        Build the screening result of a person from their name matches
+
+        The dob and country flags are only raised by entries that matched on name,
+        mirroring the OFAC API where both are reported per name match.
+
+        Args:
+            person: The screened person
+            matches: The positions of the entries matching the person's name
+
+        Returns:
+            The person's screening result
+        """
+        matches = set(matches)
+        dob = person.dob.date().isoformat()
+        country = normalize_country(person.country)
+        return {
+            'id': person.id,
+            'name_match': bool(matches),
+            'dob_match': not matches.isdisjoint(self.dob_index.get(dob, ())),
+            'country_match': not matches.isdisjoint(self.country_index.get(country, ()))
+        }
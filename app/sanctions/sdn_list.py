@@ -0,0 +1,262 @@
+"""
+This module provides loaders for the published OFAC sanctions list files
+
+Supported formats:
+    - XML (sdn.xml / consolidated.xml, any sdnList namespace)
+    - CSV (sdn.csv with the optional alt.csv and add.csv companion files,
+      or cons_prim.csv with cons_alt.csv and cons_add.csv)
+"""
+
+import csv
+import os
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import Dict, FrozenSet, Iterator, List, NamedTuple, Optional, Tuple
+from app.utils.countries import normalize_country
+
+
+# Only these entry types are screened, matching the OFAC API 'person' and 'organization' types
+SCREENED_TYPES = {'individual', 'entity'}
+
+# Date formats used by the dateOfBirth fields and CSV remarks, and whether they carry a full date
+_DOB_FORMATS = (
+    ('%d %b %Y', True),
+    ('%d %B %Y', True),
+    ('%Y-%m-%d', True),
+    ('%b %Y', False),
+    ('%B %Y', False),
+    ('%Y', False),
+)
+_DOB_REMARK = re.compile(r'DOB ([^;]+)')
+_COUNTRY_REMARKS = re.compile(r'(?:nationality|citizen(?:ship)?) ([^;.]+)', re.IGNORECASE)
+_CSV_NULL = '-0-'
+# Companion file names for each CSV export
+_CSV_COMPANIONS = {
+    'sdn.csv': ('alt.csv', 'add.csv'),
+    'cons_prim.csv': ('cons_alt.csv', 'cons_add.csv'),
+}
+
+
+class SanctionEntry(NamedTuple):
+    """
+    A single screened entry of a sanctions list
+    """
+    uid: str
+    names: Tuple[str, ...]
+    dobs: FrozenSet[str]
+    birth_years: FrozenSet[int]
+    countries: FrozenSet[str]
+
+
+def parse_dob(value: str) -> Tuple[Optional[str], Optional[int]]:
+    """
+    Parse a sanctions list date of birth
+
+    Args:
+        value: A date such as "10 Dec 1948", "Dec 1948", "1948" or "circa 1950"
+
+    Returns:
+        The ISO date when the full date is known, and the birth year when known
+    """
+    value = value.strip().replace('circa ', '').replace('Circa ', '')
+    # ranges such as "1960 to 1962" only carry the year of their lower bound
+    value = value.split(' to ')[0].strip()
+    for date_format, is_full_date in _DOB_FORMATS:
+        try:
+            parsed = datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+        return (parsed.date().isoformat() if is_full_date else None), parsed.year
+    return None, None
+
+
+def _build_entry(
+    uid: str,
+    names: List[str],
+    dob_values: List[str],
+    country_values: List[str]
+) -> SanctionEntry:
+    dobs = set()
+    birth_years = set()
+    for dob_value in dob_values:
+        full_date, year = parse_dob(dob_value)
+        if full_date:
+            dobs.add(full_date)
+        if year:
+            birth_years.add(year)
+
+    countries = {normalize_country(country) for country in country_values if country}
+    unique_names = tuple(dict.fromkeys(name.strip() for name in names if name and name.strip()))
+    return SanctionEntry(uid, unique_names, frozenset(dobs), frozenset(birth_years), frozenset(countries))
+
+
+# XML
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def _child_text(element: ET.Element, name: str) -> str:
+    for child in element:
+        if _local_name(child.tag) == name:
+            return (child.text or '').strip()
+    return ''
+
+
+def _descendants(element: ET.Element, name: str) -> Iterator[ET.Element]:
+    for descendant in element.iter():
+        if _local_name(descendant.tag) == name:
+            yield descendant
+
+
+def _full_name(element: ET.Element) -> str:
+    return ' '.join(
+        part for part in (_child_text(element, 'firstName'), _child_text(element, 'lastName')) if part
+    )
+
+
+def load_sdn_xml(path: str) -> List[SanctionEntry]:
+    """
+    Load the screened entries of an sdnList XML file
+
+    Args:
+        path: The path of the XML file
+
+    Returns:
+        A list of SanctionEntries
+    """
+    entries = []
+    for _, element in ET.iterparse(path, events=('end',)):
+        if _local_name(element.tag) != 'sdnEntry':
+            continue
+
+        if _child_text(element, 'sdnType').casefold() in SCREENED_TYPES:
+            names = [_full_name(element)]
+            names.extend(_full_name(aka) for aka in _descendants(element, 'aka'))
+
+            dob_values = [
+                _child_text(item, 'dateOfBirth') for item in _descendants(element, 'dateOfBirthItem')
+            ]
+
+            country_values = [
+                _child_text(address, 'country') for address in _descendants(element, 'address')
+            ]
+            for list_item in ('citizenship', 'nationality'):
+                country_values.extend(
+                    _child_text(item, 'country') for item in _descendants(element, list_item)
+                )
+
+            entries.append(_build_entry(_child_text(element, 'uid'), names, dob_values, country_values))
+
+        # release the parsed entry to keep memory flat on large files
+        element.clear()
+
+    return entries
+
+
+# CSV
+def _csv_value(value: str) -> str:
+    value = value.strip()
+    return '' if value == _CSV_NULL else value
+
+
+def _read_csv(path: str) -> Iterator[List[str]]:
+    with open(path, newline='', encoding='utf-8', errors='replace') as csv_file:
+        for row in csv.reader(csv_file):
+            if row and row[0].strip().isdigit():
+                yield [_csv_value(value) for value in row]
+
+
+def _csv_name(name: str) -> str:
+    # individuals are published as "LASTNAME, Firstname"
+    if ', ' in name:
+        last_name, first_name = name.split(', ', 1)
+        return f'{first_name} {last_name}'
+    return name
+
+
+def load_sdn_csv(path: str) -> List[SanctionEntry]:
+    """
+    Load the screened entries of an SDN-format CSV file and its companion files
+
+    Args:
+        path: The path of the primary CSV file (e.g. sdn.csv)
+
+    Returns:
+        A list of SanctionEntries
+    """
+    directory, file_name = os.path.split(path)
+    alt_file, add_file = _CSV_COMPANIONS.get(file_name.lower(), ('', ''))
+
+    aliases: Dict[str, List[str]] = {}
+    alt_path = os.path.join(directory, alt_file)
+    if alt_file and os.path.exists(alt_path):
+        for row in _read_csv(alt_path):
+            if len(row) > 3 and row[3]:
+                aliases.setdefault(row[0], []).append(_csv_name(row[3]))
+
+    countries: Dict[str, List[str]] = {}
+    add_path = os.path.join(directory, add_file)
+    if add_file and os.path.exists(add_path):
+        for row in _read_csv(add_path):
+            if len(row) > 4 and row[4]:
+                countries.setdefault(row[0], []).append(row[4])
+
+    entries = []
+    for row in _read_csv(path):
+        # entities are published without a type
+        sdn_type = row[2].casefold() if len(row) > 2 else ''
+        if (sdn_type or 'entity') not in SCREENED_TYPES:
+            continue
+
+        uid = row[0]
+        remarks = row[11] if len(row) > 11 else ''
+        names = [_csv_name(row[1]), *aliases.get(uid, [])]
+        dob_values = _DOB_REMARK.findall(remarks)
+        country_values = countries.get(uid, []) + _COUNTRY_REMARKS.findall(remarks)
+        entries.append(_build_entry(uid, names, dob_values, country_values))
+
+    return entries
+
+
+def get_list_files(path: str) -> List[str]:
+    """
+    Return the sanctions list files found at a path
+
+    Args:
+        path: A list file, or a directory containing list files
+
+    Returns:
+        A sorted list of loadable file paths
+    """
+    if os.path.isfile(path):
+        return [path]
+
+    if not os.path.isdir(path):
+        return []
+
+    list_files = []
+    for file_name in sorted(os.listdir(path)):
+        lower_name = file_name.lower()
+        if lower_name.endswith('.xml') or lower_name in _CSV_COMPANIONS:
+            list_files.append(os.path.join(path, file_name))
+    return list_files
+
+
+def load_sanctions_list(path: str) -> List[SanctionEntry]:
+    """
+    Load every screened entry found at a path
+
+    Args:
+        path: A list file, or a directory containing list files
+
+    Returns:
+        A list of SanctionEntries
+    """
+    entries = []
+    for list_file in get_list_files(path):
+        if list_file.lower().endswith('.xml'):
+            entries.extend(load_sdn_xml(list_file))
+        else:
+            entries.extend(load_sdn_csv(list_file))
+    return entries
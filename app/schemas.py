@@ -1,10 +1,12 @@
 """
-This module provides schemas for a person
+This module provides schemas for a person and for bulk screening jobs
 """
 
 from datetime import datetime
-from typing import Optional
+from functools import cached_property
+from typing import List, Optional
 from pydantic import BaseModel
+from app.utils.identity_utils import get_identity_key
 
 
 class Person(BaseModel):
@@ -16,6 +18,35 @@ class Person(BaseModel):
     dob: datetime
     country: str
 
+    @cached_property
+    def identity(self) -> str:
+        """
+        The hash of the person's canonical name-dob-country triple, computed once
+        """
+        return get_identity_key(self.name, self.dob, self.country)
+
+
+class PersonRow:
+    """
+    Compact person read from a columnar upload, without per-row validation.
+
+    Has the attributes of a Person, so it goes through the screening services unchanged.
+    """
+    __slots__ = ('id', 'name', 'dob', 'country', '_identity')
+
+    def __init__(self, id: Optional[int], name: str, dob: datetime, country: str) -> None:  # pylint: disable=redefined-builtin
+        self.id = id
+        self.name = name
+        self.dob = dob
+        self.country = country
+        self._identity: Optional[str] = None
+
+    @property
+    def identity(self) -> str:
+        if self._identity is None:
+            self._identity = get_identity_key(self.name, self.dob, self.country)
+        return self._identity
+
 
 class PersonScreeningResult(BaseModel):
     """
@@ -25,3 +56,28 @@ class PersonScreeningResult(BaseModel):
     name_match: bool
     dob_match: bool
     country_match: bool
+
+
+class ScreeningJob(BaseModel):
+    """
+    Schema of a newly created bulk screening job
+    """
+    job_id: str
+    total: int
+    chunk_count: int
+
+
+class ScreeningJobStatus(BaseModel):
+    """
+    Schema for the progress of a bulk screening job and one page of its results
+    """
+    job_id: str
+    status: str
+    total: int
+    processed: int
+    chunk_count: int
+    completed_chunks: int
+    failed_chunks: int
+    page: int
+    results: Optional[List[PersonScreeningResult]]
+    next_page: Optional[int]
@@ -0,0 +1,81 @@
+"""
+This module provides the warm-up of the screening results cache
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List
+from app.registry import ClientRegistry
+from app.schemas import Person
+from app.services.engines import get_screening_engine
+
+
+class CacheWarmingService:
+    """
+    Screens the most requested people again, so their results are cached
+    under the current sanctions list version before traffic asks for them.
+
+    Args:
+        clients: The shared clients
+        batch_size: The number of people screened together
+        interval: Seconds to wait between batches, to throttle upstream calls
+    """
+    def __init__(self, clients: ClientRegistry, batch_size: int = 100, interval: float = 1.0) -> None:
+        self.clients = clients
+        self.db_client = clients.db_client
+        self.batch_size = batch_size
+        self.interval = interval
+
+    # Private methods
+    async def __screen_batch(self, people: List[Person]) -> None:
+        screening_service = get_screening_engine()(people, self.clients)
+        # re-screening is not a request of these people
+        screening_service.count_requests = False
+        await screening_service.get_screening_results()
+
+    # Public methods
+    async def warm(self, limit: int) -> Dict[str, Any]:
+        """
+        Screen the most requested stored people, most requested first
+
+        Args:
+            limit: The maximum number of people to screen
+
+        Returns:
+            The number of people screened, the number of batches and the duration
+        """
+        start_time = time.perf_counter()
+        cursor = self.db_client.find_documents_cursor(
+            get_screening_engine().PERSON_COLLECTION,
+            {'request_count': {'$gt': 0}},
+            {'_id': 0, 'name': 1, 'dob': 1, 'country': 1}
+        ).sort('request_count', -1).limit(limit)
+
+        screened = 0
+        batches = 0
+        batch = []
+        async for document in cursor:
+            batch.append(Person(id=len(batch), **document))
+            if len(batch) < self.batch_size:
+                continue
+
+            if batches:
+                await asyncio.sleep(self.interval)
+            await self.__screen_batch(batch)
+            screened += len(batch)
+            batches += 1
+            batch = []
+
+        if batch:
+            if batches:
+                await asyncio.sleep(self.interval)
+            await self.__screen_batch(batch)
+            screened += len(batch)
+            batches += 1
+
+        return {
+            'version': await self.clients.list_version.get(),
+            'screened': screened,
+            'batches': batches,
+            'seconds': round(time.perf_counter() - start_time, 3)
+        }
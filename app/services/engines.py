@@ -0,0 +1,31 @@
+"""
+This module provides the selection of the configured screening engine
+"""
+
+from typing import Dict, Optional, Type
+from app.config import get_settings
+from app.services.local_screening_service import LocalScreeningService
+from app.services.ofac_screening_service import OfacScreeningService
+from app.services.screening_service import ScreeningService
+
+
+SCREENING_ENGINES: Dict[str, Type[ScreeningService]] = {
+    'ofac': OfacScreeningService,
+    'local': LocalScreeningService,
+}
+
+
+def get_screening_engine(name: Optional[str] = None) -> Type[ScreeningService]:
+    """
+    Return the screening service class of an engine
+
+    Args:
+        name: The engine name, defaults to the SCREENING_ENGINE setting
+
+    Returns:
+        The ScreeningService subclass implementing the engine
+    """
+    name = name or get_settings().screening_engine
+    if name not in SCREENING_ENGINES:
+        raise ValueError(f"Unknown screening engine: {name}")
+    return SCREENING_ENGINES[name]
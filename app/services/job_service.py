@@ -0,0 +1,259 @@
+"""
+This module provides methods for asynchronous bulk screening jobs
+"""
+
+import asyncio
+import logging
+import uuid
+from typing import Dict, List, Optional
+from app.registry import ClientRegistry
+from app.schemas import Person, ScreeningJob, ScreeningJobStatus
+from app.services.engines import get_screening_engine
+from app.services.rate_limit_service import RateLimitService
+from app.utils.job_queue import JobQueue
+
+
+logger = logging.getLogger(__name__)
+
+
+class ScreeningJobService:
+    """
+    Splits bulk screening requests into chunks processed by background workers.
+
+    Every chunk is stored with its input, so a restarted worker resumes the
+    pending chunks instead of starting the whole job over.
+
+    Jobs are admitted at the cache hit cost of their people, the workers charge
+    the client the miss cost of the people the engine screens as they go.
+    """
+    JOB_COLLECTION = 'screening_job'
+    CHUNK_COLLECTION = 'screening_job_chunk'
+    # A chunk failing this many times in a row is given up on
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, clients: ClientRegistry, queue: JobQueue, chunk_size: int):
+        self.clients = clients
+        self.db_client = clients.db_client
+        self.queue = queue
+        self.chunk_size = chunk_size
+
+    # Private methods
+    async def __enqueue_chunk(self, job_id: str, index: int, attempt: int = 1) -> None:
+        await self.queue.put({'job_id': job_id, 'index': str(index), 'attempt': str(attempt)})
+
+    async def __update_chunk(self, job_id: str, index: int, update_values: Dict) -> None:
+        """
+        Stores the state of a chunk through a single-operation bulk upsert
+        """
+        operation = {
+            'filter_query': {'job_id': job_id, 'index': index},
+            'update_values': update_values
+        }
+        await self.db_client.bulk_upsert_documents(self.CHUNK_COLLECTION, [operation])
+
+    # Public methods
+    async def create_indexes(self) -> None:
+        collection = self.db_client.get_collection(self.CHUNK_COLLECTION)
+        await collection.create_index([('job_id', 1), ('index', 1)], unique=True)
+        await collection.create_index([('status', 1)])
+
+    async def create_job(self, people: List[Person], client_id: Optional[str] = None) -> ScreeningJob:
+        """
+        Stores a bulk screening job and queues its chunks
+
+        Args:
+            people: A list of Person objects
+            client_id: The client charged for the people screened, None to charge no one
+
+        Returns:
+            The created job
+        """
+        job_id = uuid.uuid4().hex
+        chunks = [
+            people[i:i + self.chunk_size]
+            for i in range(0, len(people), self.chunk_size)
+        ]
+
+        await self.db_client.insert_document(self.JOB_COLLECTION, {
+            '_id': job_id,
+            'client_id': client_id,
+            'total': len(people),
+            'chunk_count': len(chunks)
+        })
+
+        operations = []
+        for index, chunk in enumerate(chunks):
+            operations.append({
+                'filter_query': {'job_id': job_id, 'index': index},
+                'update_values': {
+                    'job_id': job_id,
+                    'index': index,
+                    'client_id': client_id,
+                    'size': len(chunk),
+                    'people': [person.model_dump() for person in chunk],
+                    'status': 'pending',
+                    'results': None
+                }
+            })
+        if operations:
+            await self.db_client.bulk_upsert_documents(self.CHUNK_COLLECTION, operations)
+
+        for index in range(len(chunks)):
+            await self.__enqueue_chunk(job_id, index)
+
+        return ScreeningJob(job_id=job_id, total=len(people), chunk_count=len(chunks))
+
+    async def process_chunk(self, job_id: str, index: int, attempt: int = 1) -> None:
+        """
+        Screens a chunk and stores its results, unless it was already processed
+
+        Args:
+            job_id: The id of the job
+            index: The position of the chunk in the job
+            attempt: How many times the chunk was tried, including this one
+        """
+        chunk = await self.db_client.find_document(
+            self.CHUNK_COLLECTION,
+            {'job_id': job_id, 'index': index}
+        )
+        # chunks can be delivered more than once, only screen them once
+        if chunk is None or chunk['status'] != 'pending':
+            return
+
+        people = [Person(**person) for person in chunk['people']]
+        try:
+            screening_service = get_screening_engine()(people, self.clients)
+            # chunks are screened in the background, so they wait for a slot rather than failing
+            screening_service.admission_controller = self.clients.admission_controller
+            screening_service.admission_wait = True
+            results = await screening_service.get_screening_results()
+        except Exception as err:  # pylint: disable=broad-exception-caught
+            logger.error("Screening job %s - Error processing chunk %d: %s", job_id, index, err)
+            if attempt < self.MAX_ATTEMPTS:
+                await self.__enqueue_chunk(job_id, index, attempt + 1)
+            else:
+                await self.__update_chunk(job_id, index, {'status': 'failed', 'error': str(err)})
+            return
+
+        if chunk.get('client_id') is not None:
+            # people who were not cached cost more, charged with the client's next request
+            rate_limit_service = RateLimitService.for_client(self.clients.rate_limiter, chunk['client_id'])
+            rate_limit_service.charge(0, screening_service.screened)
+
+        await self.__update_chunk(job_id, index, {'status': 'completed', 'results': results})
+
+    async def resume(self) -> None:
+        """
+        Queues the pending chunks again after a restart
+
+        Durable queues redeliver unacknowledged chunks by themselves.
+        """
+        if self.queue.DURABLE:
+            return
+
+        cursor = self.db_client.find_documents_cursor(
+            self.CHUNK_COLLECTION,
+            {'status': 'pending'},
+            {'job_id': 1, 'index': 1}
+        )
+        async for chunk in cursor:
+            await self.__enqueue_chunk(chunk['job_id'], chunk['index'])
+
+    async def get_job(self, job_id: str, page: int = 0) -> Optional[ScreeningJobStatus]:
+        """
+        Reports the progress of a job and the results of one of its chunks
+
+        Args:
+            job_id: The id of the job
+            page: The position of the chunk whose results are returned
+
+        Returns:
+            The job status, or None when the job does not exist
+        """
+        job = await self.db_client.find_document(self.JOB_COLLECTION, {'_id': job_id})
+        if job is None:
+            return None
+
+        counts = await self.db_client.aggregate_documents(self.CHUNK_COLLECTION, [
+            {'$match': {'job_id': job_id}},
+            {'$group': {'_id': '$status', 'chunks': {'$sum': 1}, 'people': {'$sum': '$size'}}}
+        ])
+        chunks_by_status = {count['_id']: count['chunks'] for count in counts}
+        completed_chunks = chunks_by_status.get('completed', 0)
+        failed_chunks = chunks_by_status.get('failed', 0)
+        processed = sum(count['people'] for count in counts if count['_id'] != 'pending')
+
+        if completed_chunks + failed_chunks < job['chunk_count']:
+            status = 'running' if completed_chunks + failed_chunks else 'queued'
+        else:
+            status = 'failed' if failed_chunks else 'completed'
+
+        results = None
+        chunk = await self.db_client.find_document(
+            self.CHUNK_COLLECTION,
+            {'job_id': job_id, 'index': page}
+        )
+        if chunk is not None and chunk['status'] == 'completed':
+            results = chunk['results']
+
+        return ScreeningJobStatus(
+            job_id=job_id,
+            status=status,
+            total=job['total'],
+            processed=processed,
+            chunk_count=job['chunk_count'],
+            completed_chunks=completed_chunks,
+            failed_chunks=failed_chunks,
+            page=page,
+            results=results,
+            next_page=page + 1 if page + 1 < job['chunk_count'] else None
+        )
+
+
+class ScreeningJobWorkers:
+    """
+    Pool of background tasks processing the queued chunks
+
+    Args:
+        job_service: The service processing each chunk
+        worker_count: The number of chunks processed concurrently
+    """
+    # Seconds a worker waits for a chunk before checking for shutdown
+    POLL_TIMEOUT = 1.0
+
+    def __init__(self, job_service: ScreeningJobService, worker_count: int) -> None:
+        self.job_service = job_service
+        self.worker_count = worker_count
+        self._tasks: List[asyncio.Task] = []
+
+    async def _work(self) -> None:
+        queue = self.job_service.queue
+        while True:
+            message = await queue.get(self.POLL_TIMEOUT)
+            if message is None:
+                continue
+
+            message_id, fields = message
+            try:
+                await self.job_service.process_chunk(
+                    fields['job_id'],
+                    int(fields['index']),
+                    int(fields.get('attempt', 1))
+                )
+            except Exception as err:  # pylint: disable=broad-exception-caught
+                # leave the message unacknowledged so a durable queue redelivers it
+                logger.error("Screening job worker - Error processing %s: %s", fields, err)
+                continue
+            await queue.ack(message_id)
+
+    async def start(self) -> None:
+        await self.job_service.queue.start()
+        await self.job_service.create_indexes()
+        await self.job_service.resume()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.worker_count)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
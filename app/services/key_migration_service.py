@@ -0,0 +1,138 @@
+"""
+This module provides the migration of stored people to canonical identity keys
+"""
+
+import time
+from typing import Any, Dict, List
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import OperationFailure
+from app.registry import ClientRegistry
+from app.services.screening_service import ScreeningService
+from app.utils.identity_utils import get_identity_key
+
+
+class KeyMigrationService:
+    """
+    Gives every stored person the identity key of its canonical triple, and
+    merges the people that turn out to share one.
+
+    Cached results need no migration: entries under the previous key format are
+    never read again and expire, and the new keys are filled from the person
+    collection on the first cache miss. People stored before results were tagged
+    with a sanctions list version get the current one, or they would never be read.
+
+    Args:
+        clients: The shared clients
+        batch_size: The number of people updated per bulk write
+    """
+    def __init__(self, clients: ClientRegistry, batch_size: int = 1000) -> None:
+        self.clients = clients
+        self.db_client = clients.db_client
+        self.collection = self.db_client.get_collection(ScreeningService.PERSON_COLLECTION)
+        self.batch_size = batch_size
+
+    # Private methods
+    async def __drop_legacy_index(self) -> bool:
+        try:
+            await self.collection.drop_index(ScreeningService.LEGACY_INDEX)
+        except OperationFailure:
+            # already dropped, or never created
+            return False
+        return True
+
+    async def __set_identities(self, list_version: int) -> int:
+        """
+        Set the identity of every person stored without one, and the list version
+        of those stored without one either
+
+        Args:
+            list_version: The current sanctions list version
+
+        Returns:
+            The number of updated people
+        """
+        cursor = self.db_client.find_documents_cursor(
+            ScreeningService.PERSON_COLLECTION,
+            {'identity': {'$exists': False}},
+            {'name': 1, 'dob': 1, 'country': 1, 'list_version': 1}
+        ).batch_size(self.batch_size)
+
+        updated = 0
+        write_requests = []
+        async for document in cursor:
+            update_values = {
+                'identity': get_identity_key(document['name'], document['dob'], document['country'])
+            }
+            if 'list_version' not in document:
+                update_values['list_version'] = list_version
+            write_requests.append(UpdateOne({'_id': document['_id']}, {'$set': update_values}))
+            if len(write_requests) >= self.batch_size:
+                await self.collection.bulk_write(write_requests, ordered=False)
+                updated += len(write_requests)
+                write_requests = []
+
+        if write_requests:
+            await self.collection.bulk_write(write_requests, ordered=False)
+            updated += len(write_requests)
+        return updated
+
+    async def __merge_duplicates(self) -> int:
+        """
+        Keep the most recently updated person of each identity, adding up their request counts
+
+        Returns:
+            The number of deleted duplicates
+        """
+        duplicates: List[Dict[str, Any]] = await self.db_client.aggregate_documents(
+            ScreeningService.PERSON_COLLECTION,
+            [
+                {'$match': {'identity': {'$exists': True}}},
+                {'$sort': {'updated_at': -1}},
+                {'$group': {
+                    '_id': '$identity',
+                    'ids': {'$push': '$_id'},
+                    'request_count': {'$sum': {'$ifNull': ['$request_count', 0]}}
+                }},
+                {'$match': {'ids.1': {'$exists': True}}}
+            ]
+        )
+
+        deleted = 0
+        write_requests = []
+        for duplicate in duplicates:
+            kept_id, *duplicate_ids = duplicate['ids']
+            write_requests.append(
+                UpdateOne({'_id': kept_id}, {'$set': {'request_count': duplicate['request_count']}})
+            )
+            write_requests.extend(DeleteOne({'_id': duplicate_id}) for duplicate_id in duplicate_ids)
+            deleted += len(duplicate_ids)
+            if len(write_requests) >= self.batch_size:
+                await self.collection.bulk_write(write_requests, ordered=False)
+                write_requests = []
+
+        if write_requests:
+            await self.collection.bulk_write(write_requests, ordered=False)
+        return deleted
+
+    # Public methods
+    async def migrate(self) -> Dict[str, Any]:
+        """
+        Migrate the person collection to identity keys, can safely be run again
+
+        Returns:
+            The number of updated people and merged duplicates, and the duration
+        """
+        start_time = time.perf_counter()
+
+        # the raw triples of people merged into one identity would collide on the legacy index
+        legacy_index_dropped = await self.__drop_legacy_index()
+        updated = await self.__set_identities(await self.clients.list_version.get())
+        deleted = await self.__merge_duplicates()
+        await ScreeningService.create_indexes(self.db_client)
+
+        return {
+            'updated': updated,
+            'merged_duplicates': deleted,
+            'legacy_index_dropped': legacy_index_dropped,
+            'seconds': round(time.perf_counter() - start_time, 3)
+        }
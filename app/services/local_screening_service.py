@@ -0,0 +1,51 @@
+"""
+This module provides methods for the local SDN list screening service
+"""
+
+import asyncio
+from typing import List
+from app.config import get_settings
+from app.registry import ClientRegistry
+from app.schemas import Person, PersonScreeningResult
+from app.services.screening_service import ScreeningService
+
+
+class LocalScreeningService(ScreeningService):
+    PERSON_COLLECTION = 'local_person'
+    # Local lookups are cheaper than a round trip to the cache
+    USE_CACHE = False
+
+    def __init__(self, people: List[Person], clients: ClientRegistry):
+        self.sdn_index_store = clients.sdn_index_store
+        self.process_pool = clients.process_pool
+        self.shard_size = get_settings().local_match_shard_size
+        self.blocking = get_settings().local_blocking
+        super().__init__(people, clients)
+
+    # Protected methods
+    async def _screen_people(self, people: List[Person]) -> List[PersonScreeningResult]:
+        # hold on to one index for the whole batch, even if a new list is swapped in meanwhile
+        index = self.sdn_index_store.index
+
+        names = [person.name for person in people]
+        if self.blocking:
+            # a few candidates per name, large batches are still kept off the event loop
+            if len(names) > self.shard_size:
+                batch_matches = await asyncio.to_thread(index.match_names_blocked, names)
+            else:
+                batch_matches = index.match_names_blocked(names)
+        elif self.process_pool is not None and len(names) > self.shard_size:
+            # very large batches are sharded across processes, waited on off the event loop
+            batch_matches = await asyncio.to_thread(
+                index.match_names_sharded,
+                names,
+                self.process_pool,
+                self.shard_size
+            )
+        else:
+            batch_matches = index.match_names(names)
+
+        return [
+            index.screen(person, matches)
+            for person, matches in zip(people, batch_matches)
+        ]
@@ -0,0 +1,170 @@
+"""
+This module provides the processing of OFAC API screening responses
+"""
+
+from typing import Any, AsyncIterator, Dict, FrozenSet, Iterable, List
+from app.schemas import PersonScreeningResult
+from app.utils.countries import normalize_country
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - streaming parse is optional
+    ijson = None
+
+
+class OfacResponseError(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
+
+
+class OfacResponseProcessor:
+    """
+    Turns the results of OFAC API responses into PersonScreeningResults.
+
+    Countries are compared by ISO code after case and accent normalization.
+    The country set of each sanction is extracted once and reused by every
+    case matching it, and a case stops being processed as soon as all three
+    flags are raised.
+
+    Args:
+        countries: The country of each screened person, by person id
+    """
+    def __init__(self, countries: Dict[int, str]) -> None:
+        self.countries = {
+            person_id: normalize_country(country) for person_id, country in countries.items()
+        }
+        self._sanction_countries: Dict[Any, FrozenSet[str]] = {}
+
+    # Private methods
+    @staticmethod
+    def __extract_countries(sanction: Dict[str, Any]) -> FrozenSet[str]:
+        """
+        Collects the normalized countries of a sanction's addresses, citizenships and nationalities
+        """
+        countries = [address.get('country') for address in sanction.get('addresses') or []]
+        person_details = sanction.get('personDetails') or {}
+        countries.extend(person_details.get('citizenships') or [])
+        countries.extend(person_details.get('nationalities') or [])
+        return frozenset(normalize_country(country) for country in countries if country)
+
+    def __get_sanction_countries(self, sanction: Dict[str, Any]) -> FrozenSet[str]:
+        sanction_id = sanction.get('id')
+        if sanction_id is None:
+            return self.__extract_countries(sanction)
+
+        countries = self._sanction_countries.get(sanction_id)
+        if countries is None:
+            countries = self.__extract_countries(sanction)
+            self._sanction_countries[sanction_id] = countries
+        return countries
+
+    # Public methods
+    def process_result(self, result: Dict[str, Any]) -> PersonScreeningResult:
+        """
+        Builds the screening result of one case
+
+        Args:
+            result: One item of the response's results
+
+        Returns:
+            The PersonScreeningResult of the case
+        """
+        person_id = int(result['id'])
+        country = self.countries.get(person_id)
+        name_match = dob_match = country_match = False
+
+        for match in result.get('matches') or []:
+            if not (name_match and dob_match):
+                for match_field in (match.get('matchSummary') or {}).get('matchFields') or []:
+                    field_name = match_field.get('fieldName')
+                    if field_name == 'Name':
+                        name_match = True
+                    elif field_name == 'DOB':
+                        dob_match = True
+
+            if not country_match and country:
+                sanction = match.get('sanction') or {}
+                country_match = country in self.__get_sanction_countries(sanction)
+
+            # nothing left to find in the remaining matches
+            if name_match and dob_match and country_match:
+                break
+
+        return {
+            'id': person_id,
+            'name_match': name_match,
+            'dob_match': dob_match,
+            'country_match': country_match
+        }
+
+    def process_response(self, response: Dict[str, Any]) -> List[PersonScreeningResult]:
+        """
+        Builds the screening results of a fully parsed response
+
+        Args:
+            response: The JSON response of the OFAC API
+
+        Returns:
+            A list of PersonScreeningResults
+        """
+        if response.get('error'):
+            raise OfacResponseError(f"OFAC API error: {response.get('errorMessage')}")
+        return self.process_results(response.get('results') or [])
+
+    def process_results(self, results: Iterable[Dict[str, Any]]) -> List[PersonScreeningResult]:
+        return [self.process_result(result) for result in results]
+
+    async def process_stream(self, byte_stream: AsyncIterator[bytes]) -> List[PersonScreeningResult]:
+        """
+        Builds the screening results of a response while it is being parsed,
+        so the whole response document is never held in memory
+
+        Requires the optional ijson package.
+
+        Args:
+            byte_stream: The raw response body
+
+        Returns:
+            A list of PersonScreeningResults
+        """
+        # results are built by the C-level parser as they complete
+        results = ijson.sendable_list()
+        results_parser = ijson.items_coro(results, 'results.item')
+
+        # the top-level error fields are read by an event parser that is only fed
+        # until the first result starts, as error responses carry no results
+        events = ijson.sendable_list()
+        events_parser = ijson.parse_coro(events)
+        error = False
+        error_message = None
+
+        person_screening_results = []
+        async for chunk in byte_stream:
+            results_parser.send(chunk)
+
+            if events_parser is not None:
+                events_parser.send(chunk)
+                for prefix, event, value in events:
+                    if prefix == 'error' and event == 'boolean':
+                        error = value
+                    elif prefix == 'errorMessage' and event == 'string':
+                        error_message = value
+                    elif prefix == 'results.item' and event == 'start_map':
+                        events_parser = None
+                        break
+                del events[:]
+
+            person_screening_results.extend(self.process_result(result) for result in results)
+            del results[:]
+
+        results_parser.close()
+        person_screening_results.extend(self.process_result(result) for result in results)
+
+        if error:
+            raise OfacResponseError(f"OFAC API error: {error_message}")
+        return person_screening_results
+
+
+def is_stream_parsing_available() -> bool:
+    return ijson is not None
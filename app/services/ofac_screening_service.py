@@ -2,103 +2,89 @@
 This module provides methods for the OFAC screening service
 """
 
-import os
-from typing import Any, Dict, List, Optional
-import requests
-from dotenv import load_dotenv
+import asyncio
+import logging
+import time
+from typing import List
+import httpx
+from app.config import get_settings
+from app.registry import ClientRegistry
 from app.schemas import Person, PersonScreeningResult
+from app.services.ofac_response import (
+    OfacResponseError,
+    OfacResponseProcessor,
+    is_stream_parsing_available
+)
 from app.services.screening_service import ScreeningService
+from app.utils.metrics import OFAC_CASES_PER_REQUEST, OFAC_ERRORS, OFAC_REQUEST_SECONDS
+from app.utils.resilience import CircuitOpenError
 
 
-class OfacScreeningService(ScreeningService):
-    # Set default timeout to 10 seconds
-    OFAC_API_TIMEOUT = 10
+logger = logging.getLogger(__name__)
+
+OFAC_REQUEST_SUCCESS_SECONDS = OFAC_REQUEST_SECONDS.labels('success')
+OFAC_REQUEST_ERROR_SECONDS = OFAC_REQUEST_SECONDS.labels('error')
+
 
+class OfacScreeningService(ScreeningService):
     class OfacScreeningServiceError(Exception):
         def __init__(self, message):
             self.message = message
             super().__init__(self.message)
 
-    def __init__(self, people: List[Person]):
-        # load the OFAC-related environment variables
-        load_dotenv()
-        self.ofac_api_key = os.getenv('OFAC_API_KEY')
-        self.ofac_api_url = os.getenv('OFAC_API_URL')
-        super().__init__(people)
+    def __init__(self, people: List[Person], clients: ClientRegistry):
+        # OFAC-related settings
+        settings = get_settings()
+        self.ofac_api_key = settings.ofac_api_key
+        self.ofac_api_url = settings.ofac_api_url
+        self.chunk_size = settings.ofac_api_chunk_size
+        self.max_concurrency = settings.ofac_api_max_concurrency
+        self.stream_parse = settings.ofac_api_stream_parse and is_stream_parsing_available()
+        self.fallback_engine = settings.ofac_api_fallback_engine
+        self.http_client = clients.http_client
+        # timeouts, retries and the circuit breaker are shared by every request of the process
+        self.ofac_caller = clients.ofac_caller
+        super().__init__(people, clients)
 
     # Private methods
-    def __update_name_and_dob_match(
-        self,
-        person_screening_result: PersonScreeningResult,
-        match_fields: List[Optional[Dict[str, str]]]
-    ) -> None:
+    @staticmethod
+    def __get_error_reason(err: BaseException) -> str:
+        if isinstance(err, httpx.HTTPStatusError):
+            return f'status_{err.response.status_code}'
+        if isinstance(err, httpx.TimeoutException):
+            return 'timeout'
+        if isinstance(err, httpx.HTTPError):
+            return 'transport'
+        return 'error_response'
+
+    @staticmethod
+    def __is_retryable(err: BaseException) -> bool:
         """
-        Updates the name and dob match status in the person's screening result
-        
-        Args:
-            person_screening_result: An object representing the screening result of this person
-            match_fields: A list of dicts with the fieldName property
+        Connection failures, timeouts, throttling and server errors are worth retrying,
+        while client errors and error payloads would fail the same way again
         """
-        for match_field in match_fields:
-            # prematurely exit the loop when both name and dob matches are already found
-            if person_screening_result['name_match'] and person_screening_result['dob_match']:
-                break
-
-            field_name = match_field.get('fieldName')
-            if field_name == 'Name':
-                person_screening_result['name_match'] = True
-                continue
+        if isinstance(err, httpx.HTTPStatusError):
+            return err.response.status_code == 429 or err.response.status_code >= 500
+        return isinstance(err, httpx.TransportError)
 
-            if field_name == "DOB":
-                person_screening_result['dob_match'] = True
-
-    def __update_country_match(
+    async def __get_ofac_screening_response(
         self,
-        person_screening_result: PersonScreeningResult,
-        sanction: Dict[str, Any],
-        country: str
-    ) -> None:
-        """
-        Updates the country match status in the person's screening result
-        
-        Args:
-            person_screening_result: An object representing the screening result of this person
-            sanction: A dict that may contain the addresses and personDetails properties
-            country: The country that belongs to this person
-        """
-        # look for country match in addresses
-        addresses = sanction.get('addresses', [])
-        for address in addresses:
-            if address.get('country') == country:
-                person_screening_result['country_match'] = True
-                return
-
-        # look for country match in citizenships
-        person_details = sanction.get('personDetails', {})
-        citizenships = person_details.get('citizenships', [])
-        for citizenship in citizenships:
-            if citizenship == country:
-                person_screening_result['country_match'] = True
-                return
-
-        # look for country match in nationalities
-        nationalities = person_details.get('nationalities', {})
-        for nationality in nationalities:
-            if nationality == country:
-                person_screening_result['country_match'] = True
-                return
-
-    def __get_ofac_screening_response(self, people: List[Person]) -> Dict:
+        people: List[Person],
+        processor: OfacResponseProcessor,
+        timeout: float
+    ) -> List[PersonScreeningResult]:
         """
         Makes a POST request to the OFAC API endpoint
         to obtain screening results for each person
-        
+
         Args:
             people: A list of Person objects
-        
-        Returns:
-            A dictionary response directly from OFAC API:
+            processor: The processor of the response:
             https://docs.ofac-api.com/screening-api/response
+            timeout: Seconds before the request times out
+
+        Returns:
+            A list of PersonScreeningResults
         """
         # construct a case for each person
         cases = []
@@ -128,20 +114,84 @@ class OfacScreeningService(ScreeningService):
         }
 
         # send a post request to the OFAC API screening endpoint
+        OFAC_CASES_PER_REQUEST.observe(len(cases))
+        start_time = time.perf_counter()
         try:
-            response = requests.post(
+            if not self.stream_parse:
+                response = await self.http_client.post(
+                    self.ofac_api_url,
+                    json=body,
+                    headers=headers,
+                    timeout=timeout
+                )
+                response.raise_for_status()
+                response_data = response.json()
+                OFAC_REQUEST_SUCCESS_SECONDS.observe(time.perf_counter() - start_time)
+                self.timings.record('ofac_request', time.perf_counter() - start_time)
+                with self.timings.stage('ofac_response'):
+                    return processor.process_response(response_data)
+
+            # process the results while the response is being received
+            async with self.http_client.stream(
+                'POST',
                 self.ofac_api_url,
                 json=body,
                 headers=headers,
-                timeout=self.OFAC_API_TIMEOUT
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.HTTPError as err:
-            print(f"Failed to reach the OFAC API: {err}")
+                timeout=timeout
+            ) as response:
+                response.raise_for_status()
+                results = await processor.process_stream(response.aiter_bytes())
+            OFAC_REQUEST_SUCCESS_SECONDS.observe(time.perf_counter() - start_time)
+            self.timings.record('ofac_request', time.perf_counter() - start_time)
+            return results
+        except (httpx.HTTPError, OfacResponseError) as err:
+            OFAC_REQUEST_ERROR_SECONDS.observe(time.perf_counter() - start_time)
+            OFAC_ERRORS.labels(self.__get_error_reason(err)).inc()
+            if isinstance(err, OfacResponseError):
+                raise self.OfacScreeningServiceError(err.message) from err
+            logger.warning("Failed to reach the OFAC API: %s", err)
             raise err
 
-    def __transform_ofac_screening_response(
+    async def __get_chunked_ofac_screening_responses(
+        self,
+        people: List[Person],
+        processor: OfacResponseProcessor
+    ) -> List[List[PersonScreeningResult]]:
+        """
+        Splits the people into chunks and screens the chunks concurrently,
+        keeping at most max_concurrency requests in flight.
+        Screening a chunk is idempotent, so failed chunks are retried on their own,
+        and chunks are screened by the fallback engine while the circuit is open.
+
+        Args:
+            people: A list of Person objects
+            processor: The processor shared by every chunk's response
+
+        Returns:
+            A list of PersonScreeningResults per chunk
+        """
+        chunks = [
+            people[i:i + self.chunk_size]
+            for i in range(0, len(people), self.chunk_size)
+        ]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def screen_chunk(chunk: List[Person]) -> List[PersonScreeningResult]:
+            async with semaphore:
+                try:
+                    return await self.ofac_caller.call(
+                        lambda timeout: self.__get_ofac_screening_response(chunk, processor, timeout),
+                        self.__is_retryable
+                    )
+                except CircuitOpenError as err:
+                    OFAC_ERRORS.labels('circuit_open').inc()
+                    if not self.fallback_engine:
+                        raise err
+                    return await self.__screen_with_fallback_engine(chunk)
+
+        return await asyncio.gather(*(screen_chunk(chunk) for chunk in chunks))
+
+    async def __transform_ofac_screening_response(
         self,
         people: List[Person]
     ) -> List[PersonScreeningResult]:
@@ -154,52 +204,34 @@ class OfacScreeningService(ScreeningService):
         Returns:
             A list of PersonScreeningResults
         """
-        response = self.__get_ofac_screening_response(people)
-        if response['error']:
-            raise self.OfacScreeningServiceError(f"OFAC API error: {response['errorMessage']}")
+        if not people:
+            return []
 
-        person_screening_results = []
-        results = response.get('results', [])
-        for result in results:
-            # gather relevant data related to the target person
-            person_id = int(result['id'])
-            country = self.person_map[person_id]['country']
-            person_screening_result = {
-                'id': person_id,
-                'name_match': False,
-                'dob_match': False,
-                'country_match': False
-            }
-
-            # check all matches from OFAC
-            matches = result.get('matches', [])
-            for match in matches:
-                # look for name and dob matches in the summary
-                match_fields = match.get('matchSummary', {}).get('matchFields', [])
-                self.__update_name_and_dob_match(person_screening_result, match_fields)
+        # sanctions matched by several people are only processed once per batch
+        processor = OfacResponseProcessor({person.id: person.country for person in people})
 
-                # look for country matches in the sanction
-                sanction = match.get('sanction', {})
-                self.__update_country_match(person_screening_result, sanction, country)
-
-            person_screening_results.append(person_screening_result)
+        # merge the results of every chunk into a single list
+        person_screening_results = []
+        chunk_results = await self.__get_chunked_ofac_screening_responses(people, processor)
+        for results in chunk_results:
+            person_screening_results.extend(results)
 
         return person_screening_results
 
-    # Public methods
-    async def get_screening_results(self) -> List[PersonScreeningResult]:
-        # get the results from people who were recently screened
-        # and the people who were not recently screened
-        cache_misses, cache_person_screening_results = await self._get_recently_screened_people()
-
-        # only process the people who were not recently screened
-        person_screening_results = self.__transform_ofac_screening_response(cache_misses)
-
-        # update the redis cache with fresh screening results
-        await self._update_screening_results_cache(person_screening_results)
-
-        # store resuls in the database
-        await self._store_screening_results(person_screening_results)
-
-        # return the combined results
-        return cache_person_screening_results + person_screening_results
+    async def __screen_with_fallback_engine(self, people: List[Person]) -> List[PersonScreeningResult]:
+        # imported here as the engines module imports this one
+        from app.services.engines import get_screening_engine  # pylint: disable=import-outside-toplevel
+
+        # the fallback results are served, but not cached or stored in place of OFAC API results
+        logger.warning(
+            "OFAC API circuit open, screening %d people with the %s engine",
+            len(people),
+            self.fallback_engine
+        )
+        self.degraded = True
+        fallback_service = get_screening_engine(self.fallback_engine)(people, self.clients)
+        return await fallback_service._screen_people(people)  # pylint: disable=protected-access
+
+    # Protected methods
+    async def _screen_people(self, people: List[Person]) -> List[PersonScreeningResult]:
+        return await self.__transform_ofac_screening_response(people)
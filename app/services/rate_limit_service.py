@@ -0,0 +1,107 @@
+"""
+This module provides the charging of screening requests to their client's rate limit
+"""
+
+from typing import Optional
+from app.config import get_settings
+from app.utils.rate_limiter import RateLimiter, RateLimitExceededError
+
+
+class RateLimitService:
+    """
+    Charges a client for the identities it screens.
+
+    A request costs request_cost, plus hit_cost per distinct identity when it is
+    admitted, and miss_cost instead of hit_cost for each identity it actually had
+    to screen once that is known, so cached results are cheap and upstream calls are not.
+
+    Args:
+        rate_limiter: The shared rate limiter, None when rate limiting is disabled
+        client_id: The client being charged
+        request_cost: The cost of any request
+        hit_cost: The cost of an identity served from a cache
+        miss_cost: The cost of an identity screened by the engine
+    """
+    def __init__(
+        self,
+        rate_limiter: Optional[RateLimiter],
+        client_id: str,
+        request_cost: float = 1.0,
+        hit_cost: float = 0.1,
+        miss_cost: float = 1.0
+    ) -> None:
+        self.rate_limiter = rate_limiter
+        self.client_id = client_id
+        self.request_cost = request_cost
+        self.hit_cost = hit_cost
+        self.miss_cost = miss_cost
+
+    @classmethod
+    def for_client(cls, rate_limiter: Optional[RateLimiter], client_id: str) -> 'RateLimitService':
+        """
+        Return the service charging a client the costs of the settings
+        """
+        settings = get_settings()
+        return cls(
+            rate_limiter,
+            client_id,
+            settings.rate_limit_request_cost,
+            settings.rate_limit_hit_cost,
+            settings.rate_limit_miss_cost
+        )
+
+    # Private methods
+    async def _acquire(self, cost: float) -> None:
+        if self.rate_limiter is None:
+            return
+
+        decision = await self.rate_limiter.acquire(self.client_id, cost)
+        if not decision.allowed:
+            raise RateLimitExceededError(
+                f"Rate limit exceeded, retry in {decision.retry_after} seconds",
+                decision.retry_after
+            )
+
+    # Public methods
+    def get_cost(self, identities: int, screened: int = 0) -> float:
+        """
+        Return the cost of identities, screened of which were not served from a cache
+        """
+        return identities * self.hit_cost + screened * max(0.0, self.miss_cost - self.hit_cost)
+
+    async def admit(self, identities: int) -> None:
+        """
+        Charge a request before it is processed
+
+        Args:
+            identities: The number of distinct identities to screen
+
+        Raises:
+            RateLimitExceededError: When the client has to slow down
+        """
+        await self._acquire(self.request_cost + self.get_cost(identities))
+
+    async def take(self, identities: int) -> None:
+        """
+        Charge identities of an admitted request before they are processed,
+        for requests whose identities are only known as they are read
+
+        Args:
+            identities: The number of distinct identities to screen
+
+        Raises:
+            RateLimitExceededError: When the client has to slow down
+        """
+        await self._acquire(self.get_cost(identities))
+
+    def charge(self, identities: int, screened: int) -> None:
+        """
+        Charge identities processed after the request was admitted,
+        with the client's next request
+
+        Args:
+            identities: The number of identities not charged on admission
+            screened: The number of identities screened by the engine
+        """
+        if self.rate_limiter is not None:
+            self.rate_limiter.charge(self.client_id, self.get_cost(identities, screened))
@@ -0,0 +1,123 @@
+"""
+This module provides the re-screening of stored people after a sanctions list update
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List
+from app.config import get_settings
+from app.registry import ClientRegistry
+from app.sanctions.list_diff import DeltaIndex
+from app.sanctions.sdn_list import load_sanctions_list
+from app.schemas import Person
+from app.services.engines import get_screening_engine
+
+
+SCREENING_FLAGS = ('name_match', 'dob_match', 'country_match')
+
+
+class DeltaRescreeningService:
+    """
+    Screens the stored people again, but only those whose names match an entry
+    added, changed or removed between two sanctions list versions.
+
+    Names are matched with the n-gram matcher and minimum score of the local
+    engine, so spelling variants of a changed name are screened again too.
+    The person collection is streamed through a cursor, so memory use does not
+    grow with the number of stored people.
+
+    Args:
+        clients: The shared clients
+        batch_size: The number of stored people fetched and screened together
+    """
+    def __init__(self, clients: ClientRegistry, batch_size: int = 500) -> None:
+        self.clients = clients
+        self.db_client = clients.db_client
+        self.batch_size = batch_size
+
+    # Private methods
+    @staticmethod
+    async def __match_batch(delta_index: DeltaIndex, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Return the stored people of a batch whose names match a changed entry
+        """
+        names = [document['name'] for document in documents]
+        # scoring a batch is CPU bound, keep it off the event loop
+        batch_matches = await asyncio.to_thread(delta_index.match_names, names)
+        return [document for document, matches in zip(documents, batch_matches) if matches]
+
+    async def __rescreen_batch(self, documents: List[Dict[str, Any]]) -> int:
+        """
+        Screen a batch of stored people again, storing their new results
+
+        Returns:
+            The number of people whose flags changed
+        """
+        people = [
+            Person(id=person_id, name=document['name'], dob=document['dob'], country=document['country'])
+            for person_id, document in enumerate(documents)
+        ]
+        person_screening_results = await get_screening_engine()(people, self.clients).rescreen()
+
+        changed = 0
+        for person_screening_result in person_screening_results:
+            document = documents[person_screening_result['id']]
+            if any(document.get(flag) != person_screening_result[flag] for flag in SCREENING_FLAGS):
+                changed += 1
+        return changed
+
+    # Public methods
+    async def rescreen(self, previous_path: str, current_path: str) -> Dict[str, Any]:
+        """
+        Screen the stored people affected by the changes between two list versions
+
+        Args:
+            previous_path: The list file or directory of the previous version
+            current_path: The list file or directory of the current version
+
+        Returns:
+            The number of changed entries, scanned, re-screened and changed people, and the duration
+        """
+        start_time = time.perf_counter()
+        previous, current = await asyncio.gather(
+            asyncio.to_thread(load_sanctions_list, previous_path),
+            asyncio.to_thread(load_sanctions_list, current_path)
+        )
+        delta_index = await asyncio.to_thread(DeltaIndex, previous, current, get_settings().local_min_score)
+
+        scanned = 0
+        rescreened = 0
+        changed = 0
+        if delta_index:
+            # people only counted as requested were never screened, there is no result to update
+            cursor = self.db_client.find_documents_cursor(
+                get_screening_engine().PERSON_COLLECTION,
+                {'name_match': {'$exists': True}},
+                {'_id': 0, 'name': 1, 'dob': 1, 'country': 1, **{flag: 1 for flag in SCREENING_FLAGS}}
+            ).batch_size(self.batch_size)
+
+            batch = []
+            async for document in cursor:
+                scanned += 1
+                batch.append(document)
+                if len(batch) < self.batch_size:
+                    continue
+
+                hits = await self.__match_batch(delta_index, batch)
+                if hits:
+                    changed += await self.__rescreen_batch(hits)
+                    rescreened += len(hits)
+                batch = []
+
+            hits = await self.__match_batch(delta_index, batch) if batch else []
+            if hits:
+                changed += await self.__rescreen_batch(hits)
+                rescreened += len(hits)
+
+        return {
+            'delta_entries': len({entry.uid for entry in delta_index.delta}),
+            'scanned': scanned,
+            'rescreened': rescreened,
+            'changed': changed,
+            'seconds': round(time.perf_counter() - start_time, 3)
+        }
@@ -2,46 +2,216 @@
 This module provides methods for the screening service
 """
 
-from typing import Dict, List, Tuple
-from app.schemas import Person, PersonScreeningResult
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from pymongo.errors import OperationFailure
+from app.config import get_settings
 from app.database import MongoDB
-from app.utils.redis_utils import RedisUtil
+from app.schemas import Person, PersonScreeningResult
+from app.registry import ClientRegistry
+from app.utils.admission import AdmissionController, AdmissionRejectedError
+from app.utils.metrics import (
+    SCREENING_CACHE_LOOKUPS,
+    SCREENING_PEOPLE,
+    SCREENING_STAGE_SECONDS,
+    StageTimings
+)
+
+
+logger = logging.getLogger(__name__)
+
+# metric values updated on every request, bound once
+LOCAL_CACHE_HITS = SCREENING_CACHE_LOOKUPS.labels('local', 'hit')
+LOCAL_CACHE_MISSES = SCREENING_CACHE_LOOKUPS.labels('local', 'miss')
+REDIS_HITS = SCREENING_CACHE_LOOKUPS.labels('redis', 'hit')
+REDIS_MISSES = SCREENING_CACHE_LOOKUPS.labels('redis', 'miss')
+MONGO_HITS = SCREENING_CACHE_LOOKUPS.labels('mongo', 'hit')
+MONGO_MISSES = SCREENING_CACHE_LOOKUPS.labels('mongo', 'miss')
+PEOPLE_SCREENED = SCREENING_PEOPLE.labels('screened')
+PEOPLE_COALESCED = SCREENING_PEOPLE.labels('coalesced')
 
 
 class ScreeningService:
-    def __init__(self, people: List[Person]):
-        self.db_client = MongoDB()
+    # Collection of the people and of their screening results, one per engine
+    # so the results of an engine are never served for another one
+    PERSON_COLLECTION = 'person'
+    # Unique index on the raw (name, dob, country) triple that earlier versions created on startup,
+    # superseded by the identity index
+    LEGACY_INDEX = 'name_1_dob_1_country_1'
+    # Whether screening results are looked up in and written back to the cache
+    USE_CACHE = True
+
+    def __init__(self, people: List[Person], clients: ClientRegistry):
+        self.clients = clients
+        self.db_client = clients.db_client
         self.people = people
-        self.person_map = self.__get_person_map()
-        self.redis_util = RedisUtil()
+        self.redis_util = clients.redis_util
+        self.local_cache = clients.local_cache
+        self.cache_ttl = get_settings().cache_ttl
+        self.db_cache_max_age = get_settings().db_cache_max_age
+        self.write_behind = clients.write_behind
+        # sanctions list version of the cache keys, read once per screening
+        self.list_version = 0
+        # whether the people are counted as requested, for the cache warm-up
+        self.count_requests = True
+        # set by engines that had to screen with a fallback, whose results are neither cached nor stored
+        self.degraded = False
+        # number of distinct people screened by the engine rather than served from a cache
+        self.screened = 0
+        # duration of each stage of this screening
+        self.timings = StageTimings(SCREENING_STAGE_SECONDS)
+        # engine calls wait for a slot of the admission controller when the caller sets one,
+        # failing past their lane's max wait unless admission_wait is set
+        self.admission_controller: Optional[AdmissionController] = None
+        self.admission_wait = False
+        # concurrent screenings of the same key only matter when results are cached
+        self.single_flight = clients.single_flight if self.USE_CACHE else None
 
     # Private methods
-    def __get_person_map(self) -> Dict[int, Dict[str, str]]:
+    def __get_cache_key(self, identity: str) -> str:
+        return f'{self.list_version}:{identity}'
+
+    def __get_person_cache_key(self, person: Person) -> str:
+        return self.__get_cache_key(person.identity)
+
+    async def __screen_admitted(self, people: List[Person]) -> List[PersonScreeningResult]:
+        """
+        Screens people with the engine, once admitted by the admission controller if there is one
+
+        Raises:
+            AdmissionRejectedError: When the engine is too busy to screen them in time
         """
-        Transforms a list of People into a dictionary where id is the key
+        if self.admission_controller is None:
+            with self.timings.stage('engine'):
+                return await self._screen_people(people)
+
+        with self.timings.stage('admission'):
+            await self.admission_controller.acquire(len(people), self.admission_wait)
+        start_time = time.perf_counter()
+        try:
+            with self.timings.stage('engine'):
+                return await self._screen_people(people)
+        finally:
+            self.admission_controller.release(time.perf_counter() - start_time)
+
+    async def __screen_keys(
+        self,
+        keys: List[str],
+        people_by_key: Dict[str, List[Person]]
+    ) -> Dict[str, Dict[str, bool]]:
+        """
+        Screens one person per key, then caches and stores their results
 
         Args:
-            people: A list of Person objects
+            keys: The keys to screen
+            people_by_key: The people sharing each key
+
+        Returns:
+            The screening flags of each key
         """
-        person_map = {}
-        for person in self.people:
-            person_map[person.id] = {
-                'name': person.name,
-                'dob': person.dob,
-                'country': person.country
+        if not keys:
+            return {}
+
+        # caller ids need not be unique, the engine gets the position of each key as the id
+        representatives = [
+            people_by_key[key][0].model_copy(update={'id': index})
+            for index, key in enumerate(keys)
+        ]
+
+        person_screening_results = await self.__screen_admitted(representatives)
+        # only people the engine screened are charged as such, not those shed by admission control
+        self.screened += len(keys)
+        PEOPLE_SCREENED.inc(len(keys))
+        if not self.degraded:
+            if self.USE_CACHE:
+                with self.timings.stage('cache_write'):
+                    await self._update_screening_results_cache(representatives, person_screening_results)
+            with self.timings.stage('store'):
+                await self._store_screening_results(representatives, person_screening_results)
+
+        screening_flags = {}
+        for person_screening_result in person_screening_results:
+            key = keys[int(person_screening_result['id'])]
+            screening_flags[key] = {
+                field: value for field, value in person_screening_result.items() if field != 'id'
             }
-        return person_map
+        return screening_flags
+
+    async def __screen_owned_keys(
+        self,
+        keys: List[str],
+        people_by_key: Dict[str, List[Person]]
+    ) -> Dict[str, Dict[str, bool]]:
+        """
+        Screens the keys acquired from the single flight and hands
+        their results to every concurrent request waiting on them
+        """
+        try:
+            screening_flags = await self.__screen_keys(keys, people_by_key)
+        except (asyncio.CancelledError, AdmissionRejectedError):
+            # the failure belongs to this request, the waiters screen the keys themselves
+            await self.single_flight.abandon(keys)
+            raise
+        except BaseException as err:
+            await self.single_flight.fail(keys, err)
+            raise
+
+        await self.single_flight.release(screening_flags)
+        return screening_flags
+
+    async def __screen_cache_misses(self, cache_misses: List[Person]) -> List[PersonScreeningResult]:
+        """
+        Screens the people who were not recently screened, once per distinct
+        name-dob-country triple, across this batch and every concurrent one
+
+        Args:
+            cache_misses: A list of people who were not recently screened
+
+        Returns:
+            A list of screening results for each person
+        """
+        # group duplicate triples of the batch so each one is screened once
+        people_by_key: Dict[str, List[Person]] = {}
+        for person in cache_misses:
+            key = self.__get_person_cache_key(person)
+            people_by_key.setdefault(key, []).append(person)
+
+        if self.single_flight is None:
+            screening_flags = await self.__screen_keys(list(people_by_key), people_by_key)
+        else:
+            # screen the triples nobody else is screening, and wait for the others
+            owned, pending = await self.single_flight.acquire(list(people_by_key))
+            screening_flags = await self.__screen_owned_keys(owned, people_by_key)
+            waited_flags = await self.single_flight.wait(pending)
+
+            # screen the triples whose owner gave up on them
+            abandoned = [key for key, flags in waited_flags.items() if flags is None]
+            PEOPLE_COALESCED.inc(len(waited_flags) - len(abandoned))
+            screening_flags.update(
+                {key: flags for key, flags in waited_flags.items() if flags is not None}
+            )
+            screening_flags.update(await self.__screen_keys(abandoned, people_by_key))
+
+        return [
+            {**screening_flags[key], 'id': person.id}
+            for key, people in people_by_key.items()
+            for person in people
+        ]
 
     # Protected methods
     async def _store_screening_results(
         self,
+        people: List[Person],
         person_screening_results: List[PersonScreeningResult]
     ) -> None:
         """
         Stores a list of screening results into the database
 
         Args:
-            people: A list of Person objects
+            people: The screened people, whose positions are the ids of the results
             person_screening_results: A list of screening results for each person
         """
         # bulk upsert every person's data to the person collection
@@ -49,13 +219,22 @@ class ScreeningService:
         for person_screening_result in person_screening_results:
             person_id = person_screening_result['id']
 
-            # use the triple (name, dob, country) as the unique identifier
-            filter_query = self.person_map[person_id]
+            # use the hash of the canonical (name, dob, country) triple as the unique identifier
+            person = people[person_id]
+            filter_query = {'identity': person.identity}
 
             # combine the person's data with their screening results and store it
-            # remove the ID as it is only used within the context of an instance
-            update_values = {**filter_query, **person_screening_result}
-            del update_values['id']
+            # the ID is left out as it is only used within the context of an instance
+            update_values = {
+                'identity': person.identity,
+                'name': person.name,
+                'dob': person.dob,
+                'country': person.country,
+                'name_match': person_screening_result['name_match'],
+                'dob_match': person_screening_result['dob_match'],
+                'country_match': person_screening_result['country_match'],
+                'list_version': self.list_version
+            }
 
             operation = {
                 'filter_query': filter_query,
@@ -63,8 +242,91 @@ class ScreeningService:
             }
             operations.append(operation)
 
-        if operations:
-            await self.db_client.bulk_upsert_documents('person', operations)
+        if not operations:
+            return
+        if self.write_behind is not None:
+            # the caller only needs the flags, store them in the background
+            await self.write_behind.put(self.PERSON_COLLECTION, operations)
+        else:
+            await self.db_client.bulk_upsert_documents(self.PERSON_COLLECTION, operations)
+
+    async def _get_stored_screening_results(
+        self,
+        people_by_key: Dict[str, Person]
+    ) -> Dict[str, Dict[str, bool]]:
+        """
+        Find the results stored in the database within the freshness window,
+        in a single query, and write them back to the cache
+
+        Args:
+            people_by_key: One person per cache key missing from the cache
+
+        Returns:
+            The screening flags of each key with a fresh stored result
+        """
+        if self.db_cache_max_age <= 0 or not people_by_key:
+            return {}
+
+        now = datetime.now(timezone.utc)
+        query = {
+            'identity': {'$in': [person.identity for person in people_by_key.values()]},
+            'list_version': self.list_version,
+            'updated_at': {'$gte': now - timedelta(seconds=self.db_cache_max_age)}
+        }
+        projection = {
+            '_id': 0, 'identity': 1, 'updated_at': 1,
+            'name_match': 1, 'dob_match': 1, 'country_match': 1
+        }
+        cursor = self.db_client.find_documents_cursor(self.PERSON_COLLECTION, query, projection)
+
+        stored_values = {}
+        oldest_update = now
+        for document in await cursor.to_list(length=None):
+            key = self.__get_cache_key(document['identity'])
+            if key not in people_by_key:
+                continue
+            stored_values[key] = {
+                'name_match': document['name_match'],
+                'dob_match': document['dob_match'],
+                'country_match': document['country_match']
+            }
+            updated_at = document['updated_at']
+            if updated_at.tzinfo is None:
+                updated_at = updated_at.replace(tzinfo=timezone.utc)
+            oldest_update = min(oldest_update, updated_at)
+
+        if stored_values:
+            # never keep a result cached past the end of its freshness window
+            remaining_age = self.db_cache_max_age - (now - oldest_update).total_seconds()
+            ttl = max(1, int(min(self.cache_ttl, remaining_age)))
+            self.local_cache.set_many(stored_values, ttl)
+            await self.redis_util.set_results(stored_values, ttl)
+
+        return stored_values
+
+    async def _count_requests(self) -> None:
+        """
+        Count how many times each triple was requested, so the most requested
+        ones can be screened again ahead of traffic after a list update
+        """
+        request_counts: Dict[str, int] = {}
+        insert_values = {}
+        for person in self.people:
+            identity = person.identity
+            request_counts[identity] = request_counts.get(identity, 0) + 1
+            insert_values[identity] = {'name': person.name, 'dob': person.dob, 'country': person.country}
+
+        # people not stored yet are inserted with their triple, for the warm-up to screen them
+        operations = [
+            {
+                'filter_query': {'identity': identity},
+                'insert_values': insert_values[identity],
+                'increment_values': {'request_count': request_count}
+            }
+            for identity, request_count in request_counts.items()
+        ]
+        # the counts are buffered and written in the background
+        await self.clients.request_counter.put(self.PERSON_COLLECTION, operations)
 
     async def _get_recently_screened_people(
         self
@@ -80,12 +342,47 @@ class ScreeningService:
         cache_misses = []
         cache_person_screening_results = []
 
-        for person in self.people:
-            key = f'{person.name}-{person.dob}-{person.country}'
-            cached_data = await self.redis_util.get_dict(key)
+        # look in the in-process cache first, then fetch the rest from redis in one round trip
+        with self.timings.stage('local_cache'):
+            keys = [self.__get_person_cache_key(person) for person in self.people]
+            cached_values = dict(zip(keys, self.local_cache.get_many(keys)))
+            redis_keys = list({key for key, value in cached_values.items() if value is None})
+        LOCAL_CACHE_HITS.inc(len(cached_values) - len(redis_keys))
+        LOCAL_CACHE_MISSES.inc(len(redis_keys))
+
+        with self.timings.stage('redis_lookup'):
+            redis_values = {}
+            if self.local_cache.max_size > 0:
+                # results copied to the local cache must not outlive their redis copy
+                results = await self.redis_util.get_results_with_ttls(redis_keys)
+                for key, (value, ttl) in zip(redis_keys, results):
+                    if value is not None:
+                        redis_values[key] = value
+                        self.local_cache.set(key, value, ttl)
+            else:
+                results = await self.redis_util.get_results(redis_keys)
+                redis_values = {key: value for key, value in zip(redis_keys, results) if value is not None}
+            cached_values.update(redis_values)
+        REDIS_HITS.inc(len(redis_values))
+        REDIS_MISSES.inc(len(redis_keys) - len(redis_values))
+
+        # then look for results stored in the database before screening upstream
+        people_by_key = {}
+        for person, key in zip(self.people, keys):
+            if cached_values.get(key) is None:
+                people_by_key.setdefault(key, person)
+        with self.timings.stage('mongo_lookup'):
+            stored_values = await self._get_stored_screening_results(people_by_key)
+            cached_values.update(stored_values)
+        if self.db_cache_max_age > 0:
+            MONGO_HITS.inc(len(stored_values))
+            MONGO_MISSES.inc(len(people_by_key) - len(stored_values))
+
+        for person, key in zip(self.people, keys):
+            cached_data = cached_values.get(key)
             if cached_data:
-                cached_data['id'] = person.id
-                cache_person_screening_results.append(cached_data)
+                # cached values are shared, copy them before adding the id
+                cache_person_screening_results.append({**cached_data, 'id': person.id})
                 continue
             cache_misses.append(person)
 
@@ -93,28 +390,34 @@ class ScreeningService:
 
     async def _update_screening_results_cache(
         self,
+        people: List[Person],
         person_screening_results: List[PersonScreeningResult]
     ) -> None:
         """
         Update the cache with fresh screening results
 
         Args:
+            people: The screened people, whose positions are the ids of the results
             person_screening_results: A list of screening results for each person
         """
+        cache_entries = {}
         for screening_result in person_screening_results:
             person_id = int(screening_result['id'])
-            name = self.person_map[person_id]['name']
-            dob = self.person_map[person_id]['dob']
-            country = self.person_map[person_id]['country']
 
-            # construct the redis cache key and store the screening result
-            key = f'{name}-{dob}-{country}'
-            await self.redis_util.set_dict(key, screening_result)
+            # construct the redis cache key for the screening result,
+            # only the flags are cached as the id is specific to this request
+            key = self.__get_cache_key(people[person_id].identity)
+            cache_entries[key] = {
+                field: value for field, value in screening_result.items() if field != 'id'
+            }
+
+        # store every screening result in process and in redis in a single round trip
+        self.local_cache.set_many(cache_entries)
+        await self.redis_util.set_results(cache_entries, self.cache_ttl)
 
-    # Public methods
-    async def get_screening_results(self) -> List[PersonScreeningResult]:
+    async def _screen_people(self, people: List[Person]) -> List[PersonScreeningResult]:
         """
-        Obtain the screening results for each person
+        Screen people who have no usable cached result
 
         Args:
             people: A list of Person objects
@@ -123,3 +426,75 @@ class ScreeningService:
             A list of screening results for each person
         """
         raise NotImplementedError("Subclasses must implement this method")
+
+    # Public methods
+    @classmethod
+    async def create_indexes(cls, db_client: MongoDB) -> None:
+        """
+        Ensure the person collection is indexed on the identity used to upsert
+        screening results, and drop the legacy index on the raw triple
+
+        Args:
+            db_client: The MongoDB client
+        """
+        collection = db_client.get_collection(cls.PERSON_COLLECTION)
+        try:
+            # upserting the identity of a person stored without one inserts a second document
+            # with the same triple, which the legacy index rejects; the key migration merges them
+            await collection.drop_index(cls.LEGACY_INDEX)
+            logger.warning("Screening service - Dropped the legacy person index %s", cls.LEGACY_INDEX)
+        except OperationFailure:
+            # already dropped, or never created
+            pass
+
+        try:
+            # people stored before identities were introduced get one from the key migration
+            await collection.create_index(
+                [('identity', 1)],
+                unique=True,
+                partialFilterExpression={'identity': {'$exists': True}}
+            )
+        except OperationFailure as err:
+            logger.error("Screening service - Error creating the person index: %s", err)
+
+        # the cache warm-up screens the most requested triples first
+        await collection.create_index([('request_count', -1)])
+
+    async def rescreen(self) -> List[PersonScreeningResult]:
+        """
+        Screen each person again, ignoring their cached and stored results,
+        then cache and store the new results
+
+        Returns:
+            A list of screening results for each person
+        """
+        if self.USE_CACHE:
+            self.list_version = await self.clients.list_version.get()
+        return await self.__screen_cache_misses(self.people)
+
+    async def get_screening_results(self) -> List[PersonScreeningResult]:
+        """
+        Obtain the screening results for each person
+
+        Returns:
+            A list of screening results for each person
+        """
+        if not self.USE_CACHE:
+            return await self.__screen_cache_misses(self.people)
+
+        with self.timings.stage('list_version'):
+            self.list_version = await self.clients.list_version.get()
+        if self.count_requests:
+            with self.timings.stage('count_requests'):
+                await self._count_requests()
+
+        # get the results from people who were recently screened
+        # and the people who were not recently screened
+        cache_misses, cache_person_screening_results = await self._get_recently_screened_people()
+
+        # only process the people who were not recently screened,
+        # then update the redis cache and store the results in the database
+        person_screening_results = await self.__screen_cache_misses(cache_misses)
+
+        # return the combined results
+        return cache_person_screening_results + person_screening_results
@@ -0,0 +1,126 @@
+"""
+This module provides methods for screening newline-delimited JSON streams
+"""
+
+import json
+import logging
+from typing import AsyncIterator, List, Optional
+from pydantic import ValidationError
+from app.registry import ClientRegistry
+from app.schemas import Person
+from app.services.engines import get_screening_engine
+from app.services.rate_limit_service import RateLimitService
+from app.utils.rate_limiter import RateLimitExceededError
+
+
+logger = logging.getLogger(__name__)
+
+class StreamScreeningService:
+    """
+    Screens a stream of NDJSON people in bounded windows.
+
+    At most window_size people are held in memory at a time, and the results
+    of each window are written out as soon as the window is screened.
+    Lines that are not a valid person produce an error line instead, and a
+    failure ending the stream early produces a last error line marked fatal,
+    so clients can tell a failed stream from a complete one.
+
+    Each window is charged the cache hit cost of its people before it is screened,
+    ending the stream once the client is over its limit, and the miss cost of the
+    people the engine screened afterwards.
+
+    Args:
+        clients: The shared clients
+        window_size: The number of people screened together
+        max_line_length: The longest accepted line in bytes
+        rate_limit_service: Charges the client for each window
+    """
+    def __init__(
+        self,
+        clients: ClientRegistry,
+        window_size: int,
+        max_line_length: int = 65536,
+        rate_limit_service: Optional[RateLimitService] = None
+    ) -> None:
+        self.clients = clients
+        self.window_size = window_size
+        self.max_line_length = max_line_length
+        self.rate_limit_service = rate_limit_service
+
+    # Private methods
+    async def __iter_lines(self, byte_stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """
+        Splits a byte stream into lines without buffering more than one line
+        """
+        buffer = b''
+        async for chunk in byte_stream:
+            buffer += chunk
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                yield line
+            if len(buffer) > self.max_line_length:
+                raise ValueError(f"NDJSON line longer than {self.max_line_length} bytes")
+        if buffer:
+            yield buffer
+
+    async def __screen_window(self, people: List[Person]) -> bytes:
+        screening_service = get_screening_engine()(people, self.clients)
+        if self.rate_limit_service is not None:
+            identities = {person.identity for person in screening_service.people}
+            await self.rate_limit_service.take(len(identities))
+        # the stream is already being answered, so windows wait for a slot rather than failing
+        screening_service.admission_controller = self.clients.admission_controller
+        screening_service.admission_wait = True
+        results = await screening_service.get_screening_results()
+        if self.rate_limit_service is not None:
+            # people who were not cached cost more, charged with the next window
+            self.rate_limit_service.charge(0, screening_service.screened)
+        return b''.join(json.dumps(result).encode('utf-8') + b'\n' for result in results)
+
+    async def __screen_lines(self, byte_stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        window: List[Person] = []
+        line_number = 0
+        async for line in self.__iter_lines(byte_stream):
+            line_number += 1
+            if not line.strip():
+                continue
+
+            try:
+                window.append(Person.model_validate_json(line))
+            except ValidationError as err:
+                error = {'line': line_number, 'error': err.errors(include_url=False)}
+                yield json.dumps(error, default=str).encode('utf-8') + b'\n'
+                continue
+
+            if len(window) >= self.window_size:
+                yield await self.__screen_window(window)
+                window = []
+
+        if window:
+            yield await self.__screen_window(window)
+
+    # Public methods
+    async def screen(self, byte_stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """
+        Screens every person of an NDJSON byte stream
+
+        Args:
+            byte_stream: The request body, one JSON person per line
+
+        Returns:
+            The NDJSON results, one PersonScreeningResult or error per line
+        """
+        try:
+            async for results in self.__screen_lines(byte_stream):
+                yield results
+        except RateLimitExceededError as err:
+            # the response has started, the status code can no longer be a 429
+            error = {'error': f"Screening stopped: {err.message}", 'retry_after': err.retry_after, 'fatal': True}
+            yield json.dumps(error).encode('utf-8') + b'\n'
+        except Exception as err:  # pylint: disable=broad-exception-caught
+            # the response has started, the status code can no longer report the failure
+            logger.exception("Stream screening - Error screening the stream: %s", err)
+            # only report the errors meant for clients, like a line that is too long
+            message = getattr(err, 'message', None) or (str(err) if isinstance(err, ValueError) else 'internal error')
+            error = {'error': f"Screening stopped: {message}", 'fatal': True}
+            yield json.dumps(error).encode('utf-8') + b'\n'
@@ -0,0 +1,195 @@
+"""
+This module provides the admission control of the screening engine calls,
+with a priority lane for small calls and a bulk lane for large ones
+"""
+
+import asyncio
+import math
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+from app.utils.metrics import ADMISSIONS
+
+
+class AdmissionRejectedError(Exception):
+    def __init__(self, message, retry_after: int):
+        self.message = message
+        self.retry_after = retry_after
+        super().__init__(self.message)
+
+
+class AdmissionController:
+    """
+    Bounds the engine calls of the process running at once to concurrency slots.
+
+    Calls screening at most priority_max_people people take the priority lane
+    and may use any slot. Larger ones take the bulk lane, and only get a slot
+    while fewer than concurrency - priority_reserved are in use and no priority
+    call is waiting, so bulk calls never hold the slots small ones need.
+    Waiting calls are admitted first in first out per lane, priority first.
+
+    A call that would wait longer than its lane's max wait, estimated from the
+    calls queued ahead of it and the average time a slot is held, is rejected
+    before queueing, and one still waiting by then is rejected too, so clients
+    are told to come back early rather than timing out late.
+
+    Args:
+        concurrency: The number of engine calls running at once
+        priority_reserved: The slots bulk calls cannot use
+        priority_max_people: The largest call taking the priority lane
+        priority_max_wait: Seconds a priority call may wait for a slot
+        bulk_max_wait: Seconds a bulk call may wait for a slot
+        smoothing: Weight of the latest hold time in the average hold time
+    """
+    PRIORITY = 'priority'
+    BULK = 'bulk'
+
+    def __init__(
+        self,
+        concurrency: int = 16,
+        priority_reserved: int = 4,
+        priority_max_people: int = 10,
+        priority_max_wait: float = 2.0,
+        bulk_max_wait: float = 10.0,
+        smoothing: float = 0.2
+    ) -> None:
+        self.concurrency = max(1, concurrency)
+        self.priority_reserved = min(max(0, priority_reserved), self.concurrency - 1)
+        self.priority_max_people = priority_max_people
+        self.max_wait = {self.PRIORITY: priority_max_wait, self.BULK: bulk_max_wait}
+        self.smoothing = smoothing
+        self.in_use = 0
+        self.waiters: Dict[str, Deque[asyncio.Future]] = {self.PRIORITY: deque(), self.BULK: deque()}
+        # average seconds a slot is held, unknown until the first call completes
+        self.hold_time: Optional[float] = None
+        self.admitted = {self.PRIORITY: 0, self.BULK: 0}
+        self.rejected = {self.PRIORITY: 0, self.BULK: 0}
+
+    # Private methods
+    def _get_capacity(self, lane: str) -> int:
+        return self.concurrency if lane == self.PRIORITY else self.concurrency - self.priority_reserved
+
+    def _can_admit(self, lane: str) -> bool:
+        if self.in_use >= self._get_capacity(lane):
+            return False
+        return lane == self.PRIORITY or not self.waiters[self.PRIORITY]
+
+    def _admit(self, lane: str) -> None:
+        self.in_use += 1
+        self.admitted[lane] += 1
+        ADMISSIONS.labels(lane, 'admitted').inc()
+
+    def _reject(self, lane: str, reason: str, retry_after: float) -> AdmissionRejectedError:
+        self.rejected[lane] += 1
+        ADMISSIONS.labels(lane, reason).inc()
+        return AdmissionRejectedError(
+            f"The screening service is overloaded, retry in {math.ceil(retry_after)} seconds",
+            max(1, math.ceil(retry_after))
+        )
+
+    def _wake(self) -> None:
+        """
+        Hand the free slots to the waiting calls, priority ones first
+        """
+        for lane in (self.PRIORITY, self.BULK):
+            waiters = self.waiters[lane]
+            while waiters and self.in_use < self._get_capacity(lane):
+                future = waiters.popleft()
+                # cancelled while waiting
+                if future.done():
+                    continue
+                self._admit(lane)
+                future.set_result(None)
+
+    # Public methods
+    def get_lane(self, people: int) -> str:
+        return self.PRIORITY if people <= self.priority_max_people else self.BULK
+
+    def estimate_wait(self, lane: str) -> float:
+        """
+        Return the seconds a call queued now in lane would wait for a slot
+
+        Slots free up at capacity / hold_time per second while every one is in use,
+        so the call waits for the calls queued ahead of it and then its own turn.
+        Priority calls arriving later get ahead of bulk ones, so bulk waits can be longer.
+        """
+        if self.hold_time is None:
+            return 0.0
+        ahead = len(self.waiters[self.PRIORITY])
+        if lane == self.BULK:
+            ahead += len(self.waiters[self.BULK])
+        return (ahead + 1) * self.hold_time / self._get_capacity(lane)
+
+    async def acquire(self, people: int, wait: bool = False) -> None:
+        """
+        Wait for a slot to screen people
+
+        Args:
+            people: The number of people the engine call screens
+            wait: Whether to wait however long it takes, for callers who cannot
+                retry later like background jobs
+
+        Raises:
+            AdmissionRejectedError: When the call would wait longer than its lane allows
+        """
+        lane = self.get_lane(people)
+        if not self.waiters[lane] and self._can_admit(lane):
+            self._admit(lane)
+            return
+
+        max_wait = None if wait else self.max_wait[lane]
+        if max_wait is not None:
+            estimate = self.estimate_wait(lane)
+            if estimate > max_wait:
+                raise self._reject(lane, 'rejected', estimate)
+
+        future = asyncio.get_running_loop().create_future()
+        self.waiters[lane].append(future)
+        try:
+            await asyncio.wait_for(future, max_wait)
+        except asyncio.TimeoutError as err:
+            # the slot may have been handed over as the wait timed out
+            if not future.cancelled():
+                return
+            raise self._reject(lane, 'timeout', self.estimate_wait(lane)) from err
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            if future in self.waiters[lane]:
+                self.waiters[lane].remove(future)
+
+    def release(self, hold_time: Optional[float] = None) -> None:
+        """
+        Free a slot acquired with acquire()
+
+        Args:
+            hold_time: Seconds the slot was held, averaged to estimate the waits
+        """
+        if hold_time is not None:
+            if self.hold_time is None:
+                self.hold_time = hold_time
+            else:
+                self.hold_time += self.smoothing * (hold_time - self.hold_time)
+        self.in_use -= 1
+        self._wake()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the state and counters of the lanes
+        """
+        return {
+            'concurrency': self.concurrency,
+            'in_use': self.in_use,
+            'hold_time': self.hold_time,
+            'lanes': {
+                lane: {
+                    'capacity': self._get_capacity(lane),
+                    'waiting': len(self.waiters[lane]),
+                    'estimated_wait': self.estimate_wait(lane),
+                    'admitted': self.admitted[lane],
+                    'rejected': self.rejected[lane]
+                }
+                for lane in (self.PRIORITY, self.BULK)
+            }
+        }
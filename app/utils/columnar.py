@@ -0,0 +1,222 @@
+"""
+This module provides the reading of people and the writing of screening results
+in columnar formats (CSV and Arrow IPC streams)
+"""
+
+import csv
+import io
+from datetime import datetime
+from itertools import starmap
+from operator import itemgetter
+from typing import Any, Dict, List, Sequence
+from app.schemas import PersonRow, PersonScreeningResult
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - Arrow uploads are optional
+    pa = None
+
+
+CSV_MEDIA_TYPE = 'text/csv'
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+
+PERSON_COLUMNS = ('id', 'name', 'dob', 'country')
+RESULT_COLUMNS = ('id', 'name_match', 'dob_match', 'country_match')
+
+# Number of invalid rows reported back, validation stops looking after that
+MAX_REPORTED_ERRORS = 20
+
+
+class ColumnarFormatError(Exception):
+    def __init__(self, message, errors: List[Dict[str, Any]] = None):
+        self.message = message
+        self.errors = errors or []
+        super().__init__(self.message)
+
+
+# Private functions
+def _find_invalid_rows(column: str, values: Sequence[Any], is_valid) -> List[Dict[str, Any]]:
+    """
+    Locates the invalid rows of a column, only once it is known to have some
+    """
+    errors = []
+    for row, value in enumerate(values):
+        if not is_valid(value):
+            errors.append({'row': row, 'column': column, 'value': str(value)})
+            if len(errors) >= MAX_REPORTED_ERRORS:
+                break
+    return errors
+
+
+def _is_valid_id(value: Any) -> bool:
+    try:
+        int(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def _is_valid_dob(value: Any) -> bool:
+    try:
+        datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def _is_valid_text(value: Any) -> bool:
+    return isinstance(value, str) and bool(value.strip())
+
+
+def _validate_ids(ids: Sequence[Any]) -> List[int]:
+    try:
+        return list(map(int, ids))
+    except (TypeError, ValueError) as err:
+        errors = _find_invalid_rows('id', ids, _is_valid_id)
+        raise ColumnarFormatError("Invalid id column", errors) from err
+
+
+def _validate_dobs(dobs: Sequence[Any]) -> List[datetime]:
+    try:
+        return list(map(datetime.fromisoformat, dobs))
+    except (TypeError, ValueError) as err:
+        errors = _find_invalid_rows('dob', dobs, _is_valid_dob)
+        raise ColumnarFormatError("Invalid dob column", errors) from err
+
+
+def _validate_texts(column: str, values: Sequence[Any]) -> None:
+    try:
+        valid = all(map(str.strip, values))
+    except TypeError:
+        valid = False
+    if not valid:
+        errors = _find_invalid_rows(column, values, _is_valid_text)
+        raise ColumnarFormatError(f"Invalid {column} column", errors)
+
+
+def _build_rows(columns: Dict[str, Sequence[Any]]) -> List[PersonRow]:
+    """
+    Validates and converts each column in a single pass over it,
+    then builds one compact row per person
+
+    Args:
+        columns: The values of each person column, dob ones already being datetimes
+    """
+    _validate_texts('name', columns['name'])
+    _validate_texts('country', columns['country'])
+    ids = _validate_ids(columns['id'])
+    return list(starmap(PersonRow, zip(ids, columns['name'], columns['dob'], columns['country'])))
+
+
+# Public functions
+def is_arrow_available() -> bool:
+    return pa is not None
+
+
+def read_csv_people(data: bytes) -> List[PersonRow]:
+    """
+    Reads people from a CSV document with a header row naming at least
+    the id, name, dob and country columns
+
+    Args:
+        data: The UTF-8 CSV document
+
+    Returns:
+        A list of PersonRows, in the order of the document
+    """
+    try:
+        reader = csv.reader(io.StringIO(data.decode('utf-8-sig'), newline=''))
+        header = next(reader, None)
+        rows = [row for row in reader if row]
+    except (UnicodeDecodeError, csv.Error) as err:
+        raise ColumnarFormatError(f"Invalid CSV document: {err}") from err
+
+    if header is None:
+        return []
+    header = [column.strip().lower() for column in header]
+    missing = [column for column in PERSON_COLUMNS if column not in header]
+    if missing:
+        raise ColumnarFormatError(f"Missing columns: {', '.join(missing)}")
+
+    widths = set(map(len, rows))
+    if widths and widths != {len(header)}:
+        errors = _find_invalid_rows('*', rows, lambda row: len(row) == len(header))
+        raise ColumnarFormatError("Rows must have as many fields as the header", errors)
+
+    # transpose the rows into the needed columns, one C-level pass per column
+    columns = {
+        column: list(map(itemgetter(header.index(column)), rows)) for column in PERSON_COLUMNS
+    }
+    columns['dob'] = _validate_dobs(columns['dob'])
+    return _build_rows(columns)
+
+
+def read_arrow_people(data: bytes) -> List[PersonRow]:
+    """
+    Reads people from an Arrow IPC stream with at least the id, name, dob
+    and country columns, dob being either a date, a timestamp or an ISO string
+
+    Requires the optional pyarrow package.
+
+    Args:
+        data: The Arrow IPC stream
+
+    Returns:
+        A list of PersonRows, in the order of the stream
+    """
+    try:
+        table = pa.ipc.open_stream(data).read_all()
+    except pa.ArrowInvalid as err:
+        raise ColumnarFormatError(f"Invalid Arrow stream: {err}") from err
+
+    missing = [column for column in PERSON_COLUMNS if column not in table.column_names]
+    if missing:
+        raise ColumnarFormatError(f"Missing columns: {', '.join(missing)}")
+
+    columns = {column: table.column(column).to_pylist() for column in ('id', 'name', 'country')}
+    dob_column = table.column('dob')
+    if pa.types.is_date(dob_column.type) or pa.types.is_timestamp(dob_column.type):
+        if dob_column.null_count:
+            errors = _find_invalid_rows('dob', dob_column.to_pylist(), lambda dob: dob is not None)
+            raise ColumnarFormatError("Invalid dob column", errors)
+        columns['dob'] = dob_column.cast(pa.timestamp('us')).to_pylist()
+    else:
+        columns['dob'] = _validate_dobs(dob_column.to_pylist())
+    return _build_rows(columns)
+
+
+def write_csv_results(results: List[PersonScreeningResult]) -> bytes:
+    """
+    Writes screening results as a CSV document with a header row
+    """
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator='\n')
+    writer.writerow(RESULT_COLUMNS)
+    writer.writerows(
+        (
+            result['id'],
+            'true' if result['name_match'] else 'false',
+            'true' if result['dob_match'] else 'false',
+            'true' if result['country_match'] else 'false'
+        )
+        for result in results
+    )
+    return output.getvalue().encode('utf-8')
+
+
+def write_arrow_results(results: List[PersonScreeningResult]) -> bytes:
+    """
+    Writes screening results as an Arrow IPC stream
+
+    Requires the optional pyarrow package.
+    """
+    table = pa.table({
+        'id': pa.array([result['id'] for result in results], type=pa.int64()),
+        'name_match': pa.array([result['name_match'] for result in results], type=pa.bool_()),
+        'dob_match': pa.array([result['dob_match'] for result in results], type=pa.bool_()),
+        'country_match': pa.array([result['country_match'] for result in results], type=pa.bool_())
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,17 @@
+import httpx
+from app.config import get_settings
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Create an async HTTP client backed by a keep-alive connection pool.
+
+    Returns:
+        httpx.AsyncClient: A new client, which the caller is responsible for closing.
+    """
+    settings = get_settings()
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections
+    )
+    return httpx.AsyncClient(limits=limits)
@@ -0,0 +1,50 @@
+"""
+This module provides the canonical identity of a screened person
+"""
+
+import hashlib
+from datetime import date, datetime
+from typing import Any, Tuple
+from app.utils.countries import normalize_country
+from app.utils.text_utils import normalize_name
+
+
+def normalize_dob(dob: Any) -> str:
+    """
+    Return the ISO date of a date of birth, dropping any time of day
+
+    Args:
+        dob: A datetime, date or ISO formatted string
+
+    Returns:
+        The date as YYYY-MM-DD
+    """
+    if isinstance(dob, datetime):
+        return dob.date().isoformat()
+    if isinstance(dob, date):
+        return dob.isoformat()
+    return str(dob).strip()[:10]
+
+
+def get_identity(name: str, dob: Any, country: str) -> Tuple[str, str, str]:
+    """
+    Return the canonical (name, dob, country) triple of a person
+
+    Names are Unicode normalized, stripped of accents and punctuation, casefolded
+    and whitespace collapsed, countries are mapped to their alpha-2 code and
+    dates of birth lose their time of day, so "ABU  Abbas" born 1948-12-10 in
+    "Yemen" and "abu abbas" born 1948-12-10T00:00 in "YE" share an identity.
+    """
+    return normalize_name(name), normalize_dob(dob), normalize_country(country)
+
+
+def get_identity_key(name: str, dob: Any, country: str) -> str:
+    """
+    Return the fixed-length hash of the canonical identity of a person,
+    used as its cache key and as its key in the person collection
+
+    Returns:
+        A 32 character hexadecimal string
+    """
+    identity = '\x1f'.join(get_identity(name, dob, country))
+    return hashlib.blake2b(identity.encode('utf-8'), digest_size=16).hexdigest()
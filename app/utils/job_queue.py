@@ -0,0 +1,150 @@
+"""
+This module provides the queues feeding bulk screening jobs to the workers
+"""
+
+import asyncio
+import uuid
+from typing import Dict, Optional, Tuple
+from aioredis.exceptions import ResponseError
+from app.utils.redis_utils import RedisUtil
+
+
+# A queued message id and its fields
+QueueMessage = Tuple[str, Dict[str, str]]
+
+
+class JobQueue:
+    """
+    Interface of a work queue with at-least-once delivery
+    """
+    # Whether queued messages survive a restart of the process
+    DURABLE = False
+
+    async def start(self) -> None:
+        pass
+
+    async def put(self, fields: Dict[str, str]) -> None:
+        raise NotImplementedError("Subclasses must implement this method")
+
+    async def get(self, timeout: float) -> Optional[QueueMessage]:
+        """
+        Wait for the next message
+
+        Args:
+            timeout: Seconds to wait before giving up
+
+        Returns:
+            The next message, or None when the timeout expired
+        """
+        raise NotImplementedError("Subclasses must implement this method")
+
+    async def ack(self, message_id: str) -> None:
+        raise NotImplementedError("Subclasses must implement this method")
+
+
+class InMemoryJobQueue(JobQueue):
+    """
+    Process-local queue, for tests and single-worker deployments
+    """
+    def __init__(self) -> None:
+        self._queue: 'asyncio.Queue[QueueMessage]' = asyncio.Queue()
+
+    async def put(self, fields: Dict[str, str]) -> None:
+        await self._queue.put((uuid.uuid4().hex, fields))
+
+    async def get(self, timeout: float) -> Optional[QueueMessage]:
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def ack(self, message_id: str) -> None:
+        pass
+
+
+class RedisStreamJobQueue(JobQueue):
+    """
+    Queue backed by a Redis Stream and a consumer group shared by every worker.
+
+    Messages are acknowledged once processed. Messages left unacknowledged by a
+    crashed consumer for longer than claim_idle seconds are claimed by another one.
+
+    Args:
+        redis_util: The Redis client
+        stream: The stream name
+        group: The consumer group name
+        claim_idle: Seconds after which an unacknowledged message is redelivered
+    """
+    DURABLE = True
+
+    def __init__(
+        self,
+        redis_util: RedisUtil,
+        stream: str = 'screening_jobs',
+        group: str = 'screening_workers',
+        claim_idle: float = 300.0
+    ) -> None:
+        self.redis = redis_util.redis
+        self.stream = stream
+        self.group = group
+        self.consumer = uuid.uuid4().hex
+        self.claim_idle_ms = int(claim_idle * 1000)
+
+    # Private methods
+    @staticmethod
+    def _decode(value) -> str:
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    def _to_message(self, message_id, fields) -> QueueMessage:
+        return self._decode(message_id), {
+            self._decode(field): self._decode(value) for field, value in fields.items()
+        }
+
+    async def _claim_idle_message(self) -> Optional[QueueMessage]:
+        pending = await self.redis.xpending_range(self.stream, self.group, '-', '+', 1)
+        if not pending or pending[0]['time_since_delivered'] < self.claim_idle_ms:
+            return None
+
+        claimed = await self.redis.xclaim(
+            self.stream,
+            self.group,
+            self.consumer,
+            self.claim_idle_ms,
+            [pending[0]['message_id']]
+        )
+        for message_id, fields in claimed:
+            if fields:
+                return self._to_message(message_id, fields)
+        return None
+
+    # Public methods
+    async def start(self) -> None:
+        try:
+            await self.redis.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+        except ResponseError as err:
+            # the group is created once, by whichever worker starts first
+            if 'BUSYGROUP' not in str(err):
+                raise err
+
+    async def put(self, fields: Dict[str, str]) -> None:
+        await self.redis.xadd(self.stream, fields)
+
+    async def get(self, timeout: float) -> Optional[QueueMessage]:
+        message = await self._claim_idle_message()
+        if message is not None:
+            return message
+
+        response = await self.redis.xreadgroup(
+            self.group,
+            self.consumer,
+            {self.stream: '>'},
+            count=1,
+            block=int(timeout * 1000)
+        )
+        for _, messages in response or []:
+            for message_id, fields in messages:
+                return self._to_message(message_id, fields)
+        return None
+
+    async def ack(self, message_id: str) -> None:
+        await self.redis.xack(self.stream, self.group, message_id)
@@ -0,0 +1,49 @@
+"""
+This module provides the sanctions list version tagging cached screening results
+"""
+
+import time
+from app.utils.redis_utils import RedisUtil
+
+
+class ListVersion:
+    """
+    Shared counter bumped whenever the sanctions lists change.
+
+    Cache keys embed the current version, so bumping it invalidates every cached
+    result at once and the old entries simply expire. Each process re-reads the
+    version at most every refresh_interval seconds, so a bump reaches every
+    worker within that delay.
+
+    Args:
+        redis_util: The Redis client storing the version
+        refresh_interval: Seconds a process reuses the version it last read
+    """
+    KEY = 'sanctions_list_version'
+
+    def __init__(self, redis_util: RedisUtil, refresh_interval: float = 5.0) -> None:
+        self.redis_util = redis_util
+        self.refresh_interval = refresh_interval
+        self._version = 0
+        self._expires_at = 0.0
+
+    async def get(self) -> int:
+        """
+        Return the current version, 0 until it is first bumped
+        """
+        if time.monotonic() >= self._expires_at:
+            version = await self.redis_util.get(self.KEY)
+            self._version = int(version) if version else 0
+            self._expires_at = time.monotonic() + self.refresh_interval
+        return self._version
+
+    async def bump(self) -> int:
+        """
+        Increment the version, invalidating every cached result
+
+        Returns:
+            The new version
+        """
+        self._version = await self.redis_util.incr(self.KEY)
+        self._expires_at = time.monotonic() + self.refresh_interval
+        return self._version
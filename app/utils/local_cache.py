@@ -0,0 +1,99 @@
+"""
+This module provides a bounded in-process cache with TTL and LRU eviction
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class LocalCache:
+    """
+    In-process cache tier consulted before Redis.
+
+    Entries expire after ttl seconds, and the least recently used entry is
+    evicted once max_size entries are stored. A max_size of 0 disables the cache.
+
+    Args:
+        max_size: The maximum number of entries
+        ttl: The lifetime of an entry in seconds
+    """
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: 'OrderedDict[Any, Tuple[float, Any]]' = OrderedDict()
+
+        # counters used to size the cache
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Any) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def get_many(self, keys: List[Any]) -> List[Optional[Any]]:
+        return [self.get(key) for key in keys]
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store an entry for ttl seconds, capped to the cache's TTL
+
+        Args:
+            key: The key of the entry
+            value: The value of the entry
+            ttl: The lifetime of the entry when shorter than the cache's, e.g. what
+                remains of the lifetime of a value copied from another tier
+        """
+        if self.max_size <= 0:
+            return
+
+        ttl = self.ttl if ttl is None else min(self.ttl, ttl)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def set_many(self, data: Dict[Any, Any], ttl: Optional[float] = None) -> None:
+        for key, value in data.items():
+            self.set(key, value, ttl)
+
+    def delete(self, key: Any) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the size and counters of the cache
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
@@ -0,0 +1,300 @@
+"""
+This module provides in-process counters and histograms exposed in the Prometheus text format
+"""
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+# Upper bounds in seconds of the latency histograms
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+class _CounterValue:
+    __slots__ = ('value',)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeValue(_CounterValue):
+    __slots__ = ()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _HistogramValue:
+    __slots__ = ('bounds', 'counts', 'sum')
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        # one count per bucket plus the +Inf one, made cumulative when rendered
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time)
+
+
+class _Metric:
+    """
+    A metric family, with one value per combination of label values.
+
+    Resolving the labels costs a dict lookup, so hot paths can bind the
+    value of fixed labels once with labels() and update it directly.
+    """
+    TYPE = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _create_value(self):
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def labels(self, *labelvalues: str):
+        value = self._values.get(labelvalues)
+        if value is None:
+            if len(labelvalues) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects the labels {self.labelnames}")
+            value = self._create_value()
+            self._values[labelvalues] = value
+        return value
+
+    def _render_values(self, labels: List[Tuple[str, str]], value) -> List[str]:
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.TYPE}']
+        for labelvalues, value in self._values.items():
+            lines.extend(self._render_values(list(zip(self.labelnames, labelvalues)), value))
+        return lines
+
+
+class Counter(_Metric):
+    TYPE = 'counter'
+
+    def _create_value(self) -> _CounterValue:
+        return _CounterValue()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def _render_values(self, labels: List[Tuple[str, str]], value: _CounterValue) -> List[str]:
+        return [f'{self.name}{_format_labels(labels)} {_format_value(value.value)}']
+
+
+class Gauge(Counter):
+    TYPE = 'gauge'
+
+    def _create_value(self) -> _GaugeValue:
+        return _GaugeValue()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class Histogram(_Metric):
+    TYPE = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _create_value(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _render_values(self, labels: List[Tuple[str, str]], value: _HistogramValue) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), value.counts):
+            cumulative += count
+            bucket_labels = _format_labels(labels + [('le', _format_value(bound))])
+            lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+        lines.append(f'{self.name}_sum{_format_labels(labels)} {_format_value(value.sum)}')
+        lines.append(f'{self.name}_count{_format_labels(labels)} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Holds the metrics of the process and renders them for scraping.
+
+    Each worker process has its own registry, so each one is scraped separately.
+    """
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """
+        Return every metric in the Prometheus text exposition format
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class StageTimings:
+    """
+    Durations of the stages of one request, each also observed by a histogram
+    labelled by stage. Stages run several times, like concurrent upstream
+    calls, add up.
+
+    Args:
+        histogram: The histogram observing every stage, None to only keep the durations
+    """
+    __slots__ = ('histogram', 'durations')
+
+    def __init__(self, histogram: Optional[Histogram] = None) -> None:
+        self.histogram = histogram
+        self.durations: Dict[str, float] = {}
+
+    def record(self, stage: str, seconds: float) -> None:
+        self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+        if self.histogram is not None:
+            self.histogram.labels(stage).observe(seconds)
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start_time)
+
+    def as_dict(self) -> Dict[str, float]:
+        """
+        Return the duration of each stage in milliseconds
+        """
+        return {stage: round(seconds * 1000, 3) for stage, seconds in self.durations.items()}
+
+    def as_server_timing(self) -> str:
+        """
+        Return the durations as a Server-Timing header value
+        """
+        return ', '.join(f'{stage};dur={milliseconds}' for stage, milliseconds in self.as_dict().items())
+
+
+metrics = MetricsRegistry()
+
+# Screening requests
+SCREENING_STAGE_SECONDS = metrics.histogram(
+    'screening_stage_seconds',
+    'Duration of each stage of the screening requests',
+    ['stage']
+)
+SCREENING_CACHE_LOOKUPS = metrics.counter(
+    'screening_cache_lookups_total',
+    'Screening results looked up per cache tier (local, redis, mongo) and result (hit, miss)',
+    ['tier', 'result']
+)
+SCREENING_PEOPLE = metrics.counter(
+    'screening_people_total',
+    'People screened by the engine (screened), or whose result came from a concurrent screening (coalesced)',
+    ['source']
+)
+ADMISSIONS = metrics.counter(
+    'screening_admissions_total',
+    'Engine calls per admission lane (priority, bulk) and outcome (admitted, rejected, timeout)',
+    ['lane', 'outcome']
+)
+
+# OFAC API
+OFAC_REQUEST_SECONDS = metrics.histogram(
+    'ofac_request_seconds',
+    'Duration of the OFAC API requests, including reading the response, by outcome',
+    ['outcome']
+)
+OFAC_CASES_PER_REQUEST = metrics.histogram(
+    'ofac_cases_per_request',
+    'Number of cases sent per OFAC API request',
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000)
+)
+OFAC_ERRORS = metrics.counter(
+    'ofac_errors_total',
+    'Failed OFAC API requests by reason',
+    ['reason']
+)
+
+# MongoDB
+MONGO_BULK_WRITE_SECONDS = metrics.histogram(
+    'mongo_bulk_write_seconds',
+    'Duration of the MongoDB bulk writes per collection',
+    ['collection']
+)
+MONGO_BULK_WRITE_OPERATIONS = metrics.counter(
+    'mongo_bulk_write_operations_total',
+    'Operations sent in MongoDB bulk writes per collection',
+    ['collection']
+)
+
+# State of the shared clients, set when scraped
+LOCAL_CACHE_ENTRIES = metrics.gauge('local_cache_entries', 'Entries of the in-process results cache')
+WRITE_BEHIND_DEPTH = metrics.gauge('write_behind_depth', 'Operations waiting in the write-behind buffer')
+OFAC_CIRCUIT_OPEN = metrics.gauge('ofac_circuit_open', 'Whether the OFAC API circuit is open (1) or not (0)')
+ADMISSION_SLOTS_IN_USE = metrics.gauge('admission_slots_in_use', 'Engine calls running')
+ADMISSION_WAITING = metrics.gauge('admission_waiting', 'Engine calls waiting for a slot per lane', ['lane'])
@@ -0,0 +1,160 @@
+"""
+This module provides an opt-in sampling profiler of single requests,
+writing their stacks in the collapsed format read by flame graph tools
+"""
+
+import logging
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from types import FrameType
+from typing import Iterator, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Roots of the samples taken while the event loop was not running the profiled request
+IDLE_ROOT = '[idle]'
+OTHER_ROOT = '[other tasks]'
+
+# Characters kept from the request ids used as file names
+UNSAFE_CHARACTERS = re.compile(r'[^A-Za-z0-9._-]')
+
+
+def _format_frame(frame: FrameType) -> str:
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stack of a thread from a background thread every interval
+    seconds, so the profiled code runs unmodified and only pays for the sampling.
+
+    Samples are attributed to the profiled code when they go through its root
+    frame, the frame of the coroutine running it, and are kept from that frame
+    down. Other samples went to other tasks of the event loop, like other
+    requests or the tasks the profiled code spawned, or to waiting for I/O.
+
+    Args:
+        root_frame: The frame the profiled code runs below
+        interval: Seconds between two samples
+        thread_id: The sampled thread, the current one by default
+    """
+    def __init__(self, root_frame: FrameType, interval: float, thread_id: Optional[int] = None) -> None:
+        self.root_frame = root_frame
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.stacks: Counter = Counter()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # Private methods
+    def _get_stack(self, frame: FrameType) -> str:
+        frames: List[str] = []
+        while frame is not None:
+            frames.append(_format_frame(frame))
+            if frame is self.root_frame:
+                return ';'.join(reversed(frames))
+            frame = frame.f_back
+
+        # the loop is blocked in the selector while waiting for I/O
+        if frames and frames[0].startswith('select (selectors.py'):
+            return IDLE_ROOT
+        return ';'.join([OTHER_ROOT] + frames[::-1])
+
+    def _sample(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)  # pylint: disable=protected-access
+            if frame is None:
+                return
+            self.stacks[self._get_stack(frame)] += 1
+
+    # Public methods
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._sample, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop sampling, waiting for a sample being taken to complete
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        """
+        Return one 'frame;frame;... count' line per distinct stack, root first
+        """
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+    """
+    Profiles the requests an operator asked for, one sampling thread per profiled
+    request, and writes their collapsed stacks to output_dir/<request id>.collapsed.
+
+    Nothing is sampled outside of profile(), so requests that are not profiled
+    do not pay for it.
+
+    Args:
+        output_dir: The directory the profiles are written to
+        interval: Seconds between two samples
+        max_active: The maximum number of requests profiled at once, others are not profiled
+    """
+    def __init__(self, output_dir: str, interval: float = 0.005, max_active: int = 4) -> None:
+        self.output_dir = output_dir
+        self.interval = interval
+        self.max_active = max_active
+        self.active = 0
+        self.profiled = 0
+        self.skipped = 0
+
+    # Private methods
+    def _write(self, path: str, profiler: SamplingProfiler) -> None:
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as output:
+                output.write(profiler.collapsed())
+        except OSError as err:
+            logger.error("Profiler - Error writing %s: %s", path, err)
+
+    # Public methods
+    def get_path(self, request_id: str) -> str:
+        file_name = UNSAFE_CHARACTERS.sub('_', request_id)[:128] or 'request'
+        return os.path.join(self.output_dir, f'{file_name}.collapsed')
+
+    @contextmanager
+    def profile(self, request_id: str, root_frame: FrameType) -> Iterator[Optional[str]]:
+        """
+        Sample the current thread while the block runs
+
+        Args:
+            request_id: The id the profile is stored under
+            root_frame: The frame of the coroutine running the block
+
+        Returns:
+            The path the profile is written to, None when too many requests are profiled already
+        """
+        if self.active >= self.max_active:
+            self.skipped += 1
+            yield None
+            return
+
+        profiler = SamplingProfiler(root_frame, self.interval)
+        path = self.get_path(request_id)
+        self.active += 1
+        profiler.start()
+        try:
+            yield path
+        finally:
+            profiler.stop()
+            self.active -= 1
+            self.profiled += 1
+            # a few kilobytes, not worth a thread
+            self._write(path, profiler)
+            logger.info("Profiler - Wrote the profile of request %s to %s", request_id, path)
@@ -0,0 +1,181 @@
+"""
+This module provides a cost-aware token bucket rate limiter shared through Redis
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple
+from app.utils.redis_utils import RedisUtil
+
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceededError(Exception):
+    def __init__(self, message, retry_after: int):
+        self.message = message
+        self.retry_after = retry_after
+        super().__init__(self.message)
+
+class RateLimitDecision(NamedTuple):
+    allowed: bool
+    # tokens left in the bucket, negative while the client pays off a large request
+    remaining: float
+    # seconds before the request would be allowed, 0 when allowed
+    retry_after: int
+
+
+class _LocalBucket:
+    """
+    What one process knows of a client's bucket since it last read it from Redis
+    """
+    __slots__ = ('tokens', 'synced_at', 'spent', 'pending')
+
+    def __init__(self) -> None:
+        self.tokens = 0.0
+        self.synced_at = float('-inf')
+        # tokens admitted locally since the last sync
+        self.spent = 0.0
+        # tokens owed to the shared bucket, charged with the next Redis call
+        self.pending = 0.0
+
+
+class RateLimiter:
+    """
+    Token bucket per client, refilled at rate tokens per second up to capacity.
+
+    Requests are charged a cost rather than counted, so a bulk request pays for
+    every identity it screens. A request is admitted while the bucket holds its
+    cost, or a full bucket for costs larger than the capacity: the bucket then
+    goes negative and the client waits for it to refill.
+
+    Each decision taking the shared bucket is a single atomic script call to Redis.
+    Clients whose locally estimated bucket stays above local_margin of the capacity
+    are admitted without it for up to sync_interval seconds, their cost being
+    charged to the shared bucket with their next Redis call. Costs only known once
+    a request is done are charged the same way.
+
+    Args:
+        redis_util: The Redis client
+        rate: The tokens refilled per second
+        capacity: The maximum number of tokens of a bucket
+        local_margin: The ratio of the capacity that must remain for a local admission
+        sync_interval: The maximum seconds between two Redis calls for a client
+        max_clients: The number of clients whose local bucket is kept
+    """
+    KEY_PREFIX = 'rate_limit'
+
+    def __init__(
+        self,
+        redis_util: RedisUtil,
+        rate: float,
+        capacity: float,
+        local_margin: float = 0.5,
+        sync_interval: float = 1.0,
+        max_clients: int = 10000
+    ) -> None:
+        self.redis_util = redis_util
+        self.rate = rate
+        self.capacity = capacity
+        self.local_margin = local_margin
+        self.sync_interval = sync_interval
+        self.max_clients = max_clients
+        self._buckets: 'OrderedDict[str, _LocalBucket]' = OrderedDict()
+
+        # counters used to tune the limits
+        self.local_admissions = 0
+        self.remote_admissions = 0
+        self.rejections = 0
+        self.errors = 0
+
+    # Private methods
+    def _get_bucket(self, client_id: str) -> _LocalBucket:
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            bucket = _LocalBucket()
+            self._buckets[client_id] = bucket
+            while len(self._buckets) > self.max_clients:
+                # buckets owing tokens are dropped too, the debt is bounded by one sync interval
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client_id)
+        return bucket
+
+    def _estimate(self, bucket: _LocalBucket, now: float) -> float:
+        refilled = bucket.tokens + (now - bucket.synced_at) * self.rate
+        return min(self.capacity, refilled) - bucket.spent
+
+    # Public methods
+    async def acquire(self, client_id: str, cost: float) -> RateLimitDecision:
+        """
+        Take cost tokens from the client's bucket
+
+        Args:
+            client_id: The client being limited
+            cost: The cost of the request
+
+        Returns:
+            Whether the request is admitted, and otherwise when to retry it
+        """
+        bucket = self._get_bucket(client_id)
+        now = time.monotonic()
+        if now - bucket.synced_at < self.sync_interval:
+            estimate = self._estimate(bucket, now)
+            if estimate - cost >= self.capacity * self.local_margin:
+                bucket.spent += cost
+                bucket.pending += cost
+                self.local_admissions += 1
+                return RateLimitDecision(True, estimate - cost, 0)
+
+        try:
+            allowed, remaining, retry_after = await self.redis_util.take_tokens(
+                f'{self.KEY_PREFIX}:{client_id}',
+                cost,
+                bucket.pending,
+                self.rate,
+                self.capacity
+            )
+        except Exception as err:  # pylint: disable=broad-exception-caught
+            # fail open, the limiter must not take the screening service down with Redis
+            logger.warning("Rate limiter - Error taking tokens: %s", err)
+            self.errors += 1
+            return RateLimitDecision(True, 0.0, 0)
+
+        bucket.synced_at = time.monotonic()
+        bucket.tokens = remaining
+        bucket.spent = 0.0
+        bucket.pending = 0.0
+        if allowed:
+            self.remote_admissions += 1
+        else:
+            self.rejections += 1
+        return RateLimitDecision(allowed, remaining, retry_after)
+
+    def charge(self, client_id: str, cost: float) -> None:
+        """
+        Charge tokens for work that was already admitted, with the client's next Redis call
+
+        Args:
+            client_id: The client being limited
+            cost: The cost to add
+        """
+        if cost <= 0:
+            return
+        bucket = self._get_bucket(client_id)
+        bucket.spent += cost
+        bucket.pending += cost
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the limits and counters of the limiter
+        """
+        return {
+            'rate': self.rate,
+            'capacity': self.capacity,
+            'clients': len(self._buckets),
+            'local_admissions': self.local_admissions,
+            'remote_admissions': self.remote_admissions,
+            'rejections': self.rejections,
+            'errors': self.errors
+        }
@@ -1,16 +1,65 @@
 import json
-import os
-from typing import Any, Dict, Optional
-from dotenv import load_dotenv
+import logging
+from typing import Any, Dict, List, Optional, Tuple
 import aioredis
+from app.config import get_settings
+from app.utils.result_codec import decode_result, encode_result
+
+
+logger = logging.getLogger(__name__)
+
+
+# Delete each lock only if it still holds our token
+RELEASE_LOCKS_SCRIPT = """
+local released = 0
+for _, key in ipairs(KEYS) do
+    if redis.call('GET', key) == ARGV[1] then
+        released = released + redis.call('DEL', key)
+    end
+end
+return released
+"""
+
+# Refill a token bucket for the time elapsed since it was last taken from, charge it
+# the tokens owed by earlier requests, then take the cost of the request if the bucket
+# holds it (or is full, for costs above the capacity).
+# Returns whether the request is allowed, the tokens left and the seconds to wait.
+TAKE_TOKENS_SCRIPT = """
+local cost = tonumber(ARGV[1])
+local debt = tonumber(ARGV[2])
+local rate = tonumber(ARGV[3])
+local capacity = tonumber(ARGV[4])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate) - debt
+
+local allowed = 0
+local retry_after = 0
+local required = math.min(cost, capacity)
+if tokens >= required then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = math.ceil((required - tokens) / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+-- a bucket left alone long enough is full again, so it can expire
+redis.call('EXPIRE', KEYS[1], math.ceil((capacity - math.min(tokens, 0)) / rate) + 1)
+return {allowed, tostring(tokens), retry_after}
+"""
 
 class RedisUtil:
     def __init__(self):
-        load_dotenv()
-        redis_url = os.getenv('REDIS_URL')
+        redis_url = get_settings().redis_url
 
         # Redis connection pool
         self.redis = aioredis.from_url(redis_url, encoding="utf-8")
+        self._take_tokens_script = None
 
     async def get(self, key: Any) -> Optional[Any]:
         # Check if the data is in cache
@@ -28,7 +77,7 @@ class RedisUtil:
                 return json.loads(data_json)
             return None
         except TypeError as err:
-            print(f"Redis - Error decoding JSON when fetching: {err}")
+            logger.warning("Redis - Error decoding JSON when fetching: %s", err)
             raise err
 
     async def set(self, key: Any, data: Any, ex=3600) -> None:
@@ -40,8 +89,92 @@ class RedisUtil:
             # Store JSON string in Redis
             await self.redis.set(key, data_json, ex)
         except TypeError as err:
-            print(f"Redis - Error encoding JSON when setting: {err}")
+            logger.warning("Redis - Error encoding JSON when setting: %s", err)
+            raise err
+
+    async def get_results(self, keys: List[Any]) -> List[Optional[Dict[str, bool]]]:
+        # Fetch every screening result in a single MGET round trip
+        if not keys:
+            return []
+
+        try:
+            return [decode_result(value) for value in await self.redis.mget(keys)]
+        except (TypeError, ValueError) as err:
+            logger.warning("Redis - Error decoding screening result when fetching: %s", err)
             raise err
 
+    async def get_results_with_ttls(
+        self,
+        keys: List[Any]
+    ) -> List[Tuple[Optional[Dict[str, bool]], Optional[float]]]:
+        # Fetch every screening result and its remaining lifetime in seconds in a single pipelined round trip
+        if not keys:
+            return []
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.mget(keys)
+            for key in keys:
+                pipe.pttl(key)
+            values, *ttls = await pipe.execute()
+
+        try:
+            results = [decode_result(value) for value in values]
+        except (TypeError, ValueError) as err:
+            logger.warning("Redis - Error decoding screening result when fetching: %s", err)
+            raise err
+        # negative for keys that are missing or never expire
+        return [(result, ttl / 1000 if ttl >= 0 else None) for result, ttl in zip(results, ttls)]
+
+    async def set_results(self, data: Dict[Any, Dict[str, bool]], ex=3600) -> None:
+        # Store every screening result in its compact encoding in a single pipelined round trip
+        if not data:
+            return
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, value in data.items():
+                pipe.set(key, encode_result(value), ex)
+            await pipe.execute()
+
+    async def incr(self, key: Any) -> int:
+        return await self.redis.incr(key)
+
+    async def acquire_locks(self, keys: List[Any], token: str, px: int) -> List[bool]:
+        # Try to take every lock (SET NX with expiry) in a single pipelined round trip
+        if not keys:
+            return []
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.set(key, token, px=px, nx=True)
+            acquired = await pipe.execute()
+        return [bool(is_acquired) for is_acquired in acquired]
+
+    async def release_locks(self, keys: List[Any], token: str) -> None:
+        # Release every lock still held with our token in a single round trip
+        if keys:
+            await self.redis.eval(RELEASE_LOCKS_SCRIPT, len(keys), *keys, token)
+
+    async def take_tokens(
+        self,
+        key: Any,
+        cost: float,
+        debt: float,
+        rate: float,
+        capacity: float
+    ) -> Tuple[bool, float, int]:
+        # Refill and take from a token bucket in a single atomic round trip (EVALSHA once loaded)
+        if self._take_tokens_script is None:
+            self._take_tokens_script = self.redis.register_script(TAKE_TOKENS_SCRIPT)
+        allowed, tokens, retry_after = await self._take_tokens_script(
+            keys=[key],
+            args=[cost, debt, rate, capacity]
+        )
+        return bool(allowed), float(tokens), int(retry_after)
+
     async def clear_cache(self, key: Any) -> None:
         await self.redis.delete(key)
+
+    async def close(self) -> None:
+        # Close the client and disconnect every pooled connection
+        await self.redis.close()
+        await self.redis.connection_pool.disconnect()
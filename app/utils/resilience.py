@@ -0,0 +1,332 @@
+"""
+This module provides adaptive timeouts, retries, hedging and a circuit breaker
+for calls to an upstream service
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set, Tuple, TypeVar
+
+
+T = TypeVar('T')
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
+
+
+class LatencyTracker:
+    """
+    Keeps the latencies of the most recent calls to derive timeouts from.
+
+    Args:
+        window: The number of recent latencies kept
+        min_samples: The number of latencies needed before percentiles are trusted
+    """
+    def __init__(self, window: int = 200, min_samples: int = 20) -> None:
+        self.min_samples = min_samples
+        self._latencies: Deque[float] = deque(maxlen=window)
+
+    def record(self, latency: float) -> None:
+        self._latencies.append(latency)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """
+        Return a percentile (0 to 1) of the recent latencies, None until there are enough of them
+        """
+        if len(self._latencies) < self.min_samples:
+            return None
+        latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(percentile * len(latencies)))]
+
+
+class RetryBudget:
+    """
+    Caps retries to a ratio of the calls, so retries cannot multiply the load
+    on an upstream that is already failing.
+
+    Every call deposits ratio tokens, up to max_tokens, and every retry or
+    hedged call withdraws one.
+
+    Args:
+        ratio: The number of retries allowed per call
+        max_tokens: The maximum number of retries saved up
+    """
+    def __init__(self, ratio: float = 0.1, max_tokens: float = 10.0) -> None:
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+
+    def deposit(self) -> None:
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    @property
+    def tokens(self) -> float:
+        return self._tokens
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast while the upstream error rate is too high.
+
+    The circuit opens once at least min_calls calls were made in the last
+    window seconds and failure_ratio of them failed. After open_duration
+    seconds a single probe call is let through: its success closes the circuit,
+    its failure opens it again.
+
+    Args:
+        failure_ratio: The ratio of failed calls opening the circuit
+        min_calls: The number of calls in the window before the ratio is considered
+        window: Seconds of call outcomes considered
+        open_duration: Seconds the circuit stays open before a probe is let through
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+        self,
+        failure_ratio: float = 0.5,
+        min_calls: int = 10,
+        window: float = 30.0,
+        open_duration: float = 30.0
+    ) -> None:
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.window = window
+        self.open_duration = open_duration
+        self.state = self.CLOSED
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._failures = 0
+        self._retry_at = 0.0
+
+    # Private methods
+    def _prune(self, now: float) -> None:
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            _, succeeded = self._outcomes.popleft()
+            if not succeeded:
+                self._failures -= 1
+
+    def _open(self, now: float) -> None:
+        self.state = self.OPEN
+        self._retry_at = now + self.open_duration
+        self._outcomes.clear()
+        self._failures = 0
+
+    # Public methods
+    def allow(self) -> bool:
+        """
+        Return whether a call may be made now
+        """
+        if self.state == self.CLOSED:
+            return True
+
+        now = time.monotonic()
+        if now < self._retry_at:
+            return False
+
+        # let a single probe through, and another one if it never reports back
+        self.state = self.HALF_OPEN
+        self._retry_at = now + self.open_duration
+        return True
+
+    def record_success(self) -> None:
+        now = time.monotonic()
+        if self.state == self.HALF_OPEN:
+            self.state = self.CLOSED
+        self._outcomes.append((now, True))
+        self._prune(now)
+
+    def record_failure(self) -> None:
+        now = time.monotonic()
+        if self.state == self.HALF_OPEN:
+            self._open(now)
+            return
+
+        self._outcomes.append((now, False))
+        self._failures += 1
+        self._prune(now)
+        if len(self._outcomes) >= self.min_calls and self._failures >= self.failure_ratio * len(self._outcomes):
+            self._open(now)
+
+
+class ResilientCaller:
+    """
+    Calls an upstream service through a circuit breaker, with a timeout adapted
+    to its recent latencies, budgeted retries with jittered exponential backoff
+    and, optionally, a hedged second call when the first one is slow.
+
+    The timeout of a call is timeout_multiplier times the timeout_percentile of
+    the recent latencies, kept between min_timeout and max_timeout.
+
+    Args:
+        max_timeout: Seconds before a call times out, until enough latencies are known
+        min_timeout: The lower bound of the adaptive timeout
+        timeout_percentile: The latency percentile the timeout is derived from
+        timeout_multiplier: The factor applied to that percentile
+        max_retries: The number of retries of a failed idempotent call
+        retry_budget: The ratio of retries and hedged calls to calls
+        backoff_base: Seconds of the first backoff, doubled on each retry
+        backoff_cap: The maximum seconds of a backoff
+        hedge_percentile: The latency percentile after which a hedged call is made,
+            None disables hedging
+        circuit_breaker: The circuit breaker, a default one when omitted
+    """
+    def __init__(
+        self,
+        max_timeout: float = 10.0,
+        min_timeout: float = 1.0,
+        timeout_percentile: float = 0.99,
+        timeout_multiplier: float = 2.0,
+        max_retries: int = 2,
+        retry_budget: float = 0.1,
+        backoff_base: float = 0.1,
+        backoff_cap: float = 2.0,
+        hedge_percentile: Optional[float] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None
+    ) -> None:
+        self.max_timeout = max_timeout
+        self.min_timeout = min(min_timeout, max_timeout)
+        self.timeout_percentile = timeout_percentile
+        self.timeout_multiplier = timeout_multiplier
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.hedge_percentile = hedge_percentile
+        self.latencies = LatencyTracker()
+        self.retry_budget = RetryBudget(retry_budget)
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+
+        # counters used to tune the policy
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.hedges = 0
+        self.rejections = 0
+
+    # Private methods
+    def _get_backoff(self, attempt: int) -> float:
+        # full jitter, so retries of concurrent calls do not arrive together
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    async def _call_hedged(self, function: Callable[[float], Awaitable[T]], timeout: float) -> T:
+        """
+        Make a second identical call when the first one is slower than the
+        hedge percentile, and return whichever succeeds first
+        """
+        hedge_delay = self.latencies.percentile(self.hedge_percentile)
+        first = asyncio.ensure_future(function(timeout))
+        if hedge_delay is None or hedge_delay >= timeout:
+            return await first
+
+        tasks: Set[asyncio.Future] = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if not done and self.retry_budget.withdraw():
+                self.hedges += 1
+                tasks.add(asyncio.ensure_future(function(timeout)))
+
+            error: Optional[BaseException] = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    # Public methods
+    def get_timeout(self) -> float:
+        """
+        Return the timeout of the next call
+        """
+        latency = self.latencies.percentile(self.timeout_percentile)
+        if latency is None:
+            return self.max_timeout
+        return min(self.max_timeout, max(self.min_timeout, latency * self.timeout_multiplier))
+
+    async def call(
+        self,
+        function: Callable[[float], Awaitable[T]],
+        is_retryable: Callable[[BaseException], bool],
+        idempotent: bool = True
+    ) -> T:
+        """
+        Call the upstream service
+
+        Args:
+            function: Makes the call, given its timeout in seconds
+            is_retryable: Whether a call failing with an exception may be retried
+            idempotent: Whether the call may be retried or hedged at all
+
+        Returns:
+            The result of the first successful call
+
+        Raises:
+            CircuitOpenError: When the circuit is open
+        """
+        attempt = 0
+        self.calls += 1
+        self.retry_budget.deposit()
+        while True:
+            if not self.circuit_breaker.allow():
+                self.rejections += 1
+                raise CircuitOpenError("Upstream circuit is open, failing fast")
+
+            timeout = self.get_timeout()
+            start_time = time.monotonic()
+            try:
+                if idempotent and self.hedge_percentile is not None:
+                    result = await self._call_hedged(function, timeout)
+                else:
+                    result = await function(timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:  # pylint: disable=broad-exception-caught
+                # slow failures stretch the observed latencies, so timeouts adapt upwards
+                self.latencies.record(time.monotonic() - start_time)
+                self.failures += 1
+                self.circuit_breaker.record_failure()
+
+                retryable = idempotent and is_retryable(err) and attempt < self.max_retries
+                if not retryable or not self.retry_budget.withdraw():
+                    raise err
+
+                self.retries += 1
+                await asyncio.sleep(self._get_backoff(attempt))
+                attempt += 1
+                continue
+
+            self.latencies.record(time.monotonic() - start_time)
+            self.circuit_breaker.record_success()
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the state and counters of the policy
+        """
+        return {
+            'circuit': self.circuit_breaker.state,
+            'timeout': self.get_timeout(),
+            'p50_latency': self.latencies.percentile(0.5),
+            'p99_latency': self.latencies.percentile(0.99),
+            'retry_tokens': self.retry_budget.tokens,
+            'calls': self.calls,
+            'failures': self.failures,
+            'retries': self.retries,
+            'hedges': self.hedges,
+            'rejections': self.rejections
+        }
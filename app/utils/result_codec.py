@@ -0,0 +1,79 @@
+"""
+This module provides the compact encoding of cached screening flags
+"""
+
+import json
+import struct
+import time
+from typing import Dict, Optional
+
+# Format version, flags bitfield, screening time in epoch seconds
+_RESULT = struct.Struct('>BBI')
+FORMAT_VERSION = 1
+
+NAME_MATCH = 0x01
+DOB_MATCH = 0x02
+COUNTRY_MATCH = 0x04
+
+# Every possible decoded value, shared read-only by every lookup
+_DECODED_FLAGS = tuple(
+    {
+        'name_match': bool(bits & NAME_MATCH),
+        'dob_match': bool(bits & DOB_MATCH),
+        'country_match': bool(bits & COUNTRY_MATCH)
+    }
+    for bits in range(8)
+)
+
+
+def encode_result(flags: Dict[str, bool], screened_at: Optional[float] = None) -> bytes:
+    """
+    Pack screening flags into 6 bytes
+
+    Args:
+        flags: The name_match, dob_match and country_match flags, any other key is ignored
+        screened_at: The screening time in epoch seconds, defaults to now
+
+    Returns:
+        The encoded value
+    """
+    bits = (
+        (NAME_MATCH if flags['name_match'] else 0)
+        | (DOB_MATCH if flags['dob_match'] else 0)
+        | (COUNTRY_MATCH if flags['country_match'] else 0)
+    )
+    return _RESULT.pack(FORMAT_VERSION, bits, int(screened_at if screened_at is not None else time.time()))
+
+
+def decode_result(value: Optional[bytes]) -> Optional[Dict[str, bool]]:
+    """
+    Unpack screening flags encoded by encode_result, or stored as JSON by previous versions
+
+    The returned dict is shared between lookups and must not be modified.
+
+    Args:
+        value: The encoded value
+
+    Returns:
+        The screening flags, or None when there is no value
+    """
+    if not value:
+        return None
+    if len(value) == _RESULT.size and value[0] == FORMAT_VERSION:
+        return _DECODED_FLAGS[value[1] & 0x07]
+
+    flags = json.loads(value)
+    return {
+        'name_match': flags['name_match'],
+        'dob_match': flags['dob_match'],
+        'country_match': flags['country_match']
+    }
+
+
+def get_screened_at(value: bytes) -> Optional[int]:
+    """
+    Return the screening time of an encoded value, None for JSON values
+    """
+    if len(value) == _RESULT.size and value[0] == FORMAT_VERSION:
+        return _RESULT.unpack(value)[2]
+    return None
@@ -0,0 +1,183 @@
+"""
+This module provides single-flight coalescing of concurrent screenings
+"""
+
+import asyncio
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set, Tuple
+from app.utils.redis_utils import RedisUtil
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+    # failures are re-raised to waiters, never log them as unretrieved
+    if not future.cancelled():
+        future.exception()
+
+
+class SingleFlight:
+    """
+    Ensures each key is only screened by one caller at a time.
+
+    The first caller to acquire a key owns it, and every concurrent caller
+    asking for the same key waits for the owner's result instead of screening
+    it again. With a RedisUtil the ownership is also claimed with a Redis lock,
+    so callers in other worker processes wait for the owner's cache write.
+
+    Args:
+        redis_util: Enables the cross-process Redis lock when provided
+        lock_timeout: Seconds after which a Redis lock expires, and after which
+            a caller stops waiting for another process and screens the key itself
+        poll_interval: Seconds between cache polls while waiting for another process
+    """
+    LOCK_PREFIX = 'lock:'
+
+    def __init__(
+        self,
+        redis_util: Optional[RedisUtil] = None,
+        lock_timeout: float = 30.0,
+        poll_interval: float = 0.05
+    ) -> None:
+        self.redis_util = redis_util
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.token = uuid.uuid4().hex
+        self._calls: Dict[str, asyncio.Future] = {}
+        # the event loop only keeps weak references to tasks, hold them until they are done
+        self._tasks: Set[asyncio.Task] = set()
+
+    # Private methods
+    def _lock_keys(self, keys: List[str]) -> List[str]:
+        return [f'{self.LOCK_PREFIX}{key}' for key in keys]
+
+    async def _wait_for_remote(self, keys: List[str]) -> None:
+        """
+        Poll the cache until another process has written the keys,
+        then resolve them locally
+        """
+        deadline = time.monotonic() + self.lock_timeout
+        remaining = list(keys)
+        try:
+            while remaining and time.monotonic() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                values = await self.redis_util.get_results(remaining)
+                self.resolve({
+                    key: value for key, value in zip(remaining, values) if value is not None
+                })
+                remaining = [key for key, value in zip(remaining, values) if value is None]
+        finally:
+            # the other process did not deliver in time, let the waiters screen these themselves
+            self.resolve({key: None for key in remaining})
+
+    # Public methods
+    async def acquire(self, keys: List[str]) -> Tuple[List[str], Dict[str, asyncio.Future]]:
+        """
+        Acquire the keys that nobody is screening yet
+
+        Args:
+            keys: Unique keys to screen
+
+        Returns:
+            The keys now owned by the caller, which it must release or fail,
+            and futures for the keys owned by someone else
+        """
+        loop = asyncio.get_running_loop()
+        owned = []
+        pending = {}
+        for key in keys:
+            if key in self._calls:
+                pending[key] = self._calls[key]
+                continue
+            future = loop.create_future()
+            future.add_done_callback(_consume_exception)
+            self._calls[key] = future
+            owned.append(key)
+
+        if self.redis_util is None or not owned:
+            return owned, pending
+
+        # keys locked by another process are waited on like local ones
+        try:
+            acquired = await self.redis_util.acquire_locks(
+                self._lock_keys(owned),
+                self.token,
+                int(self.lock_timeout * 1000)
+            )
+        except BaseException:
+            # nobody owns the keys, let the callers who started waiting on them screen them
+            self.resolve({key: None for key in owned})
+            raise
+        contended = [key for key, is_acquired in zip(owned, acquired) if not is_acquired]
+        if contended:
+            for key in contended:
+                pending[key] = self._calls[key]
+            task = asyncio.create_task(self._wait_for_remote(contended))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            owned = [key for key, is_acquired in zip(owned, acquired) if is_acquired]
+
+        return owned, pending
+
+    def resolve(self, results: Dict[str, Any]) -> None:
+        """
+        Hand the results of owned keys to every waiter
+
+        Args:
+            results: The result of each key, or None to let waiters screen the key themselves
+        """
+        for key, result in results.items():
+            future = self._calls.pop(key, None)
+            if future is not None and not future.done():
+                future.set_result(result)
+
+    async def release(self, results: Dict[str, Any]) -> None:
+        """
+        Resolve owned keys and release their Redis locks
+
+        Args:
+            results: The result of each owned key
+        """
+        self.resolve(results)
+        if self.redis_util is not None and results:
+            await self.redis_util.release_locks(self._lock_keys(list(results)), self.token)
+
+    async def abandon(self, keys: List[str]) -> None:
+        """
+        Give up on owned keys for reasons of the caller's own, like its request being
+        cancelled, so every waiter screens them itself
+
+        Args:
+            keys: The owned keys given up on
+        """
+        await self.release({key: None for key in keys})
+
+    async def fail(self, keys: List[str], err: BaseException) -> None:
+        """
+        Propagate a screening failure of owned keys to every waiter
+
+        Args:
+            keys: The owned keys that failed
+            err: The exception raised while screening them
+        """
+        for key in keys:
+            future = self._calls.pop(key, None)
+            if future is not None and not future.done():
+                future.set_exception(err)
+        if self.redis_util is not None and keys:
+            await self.redis_util.release_locks(self._lock_keys(keys), self.token)
+
+    @staticmethod
+    async def wait(pending: Dict[str, asyncio.Future]) -> Dict[str, Any]:
+        """
+        Wait for the keys owned by someone else
+
+        Args:
+            pending: The futures returned by acquire
+
+        Returns:
+            The result of each key, None when the caller has to screen it itself
+        """
+        if not pending:
+            return {}
+        results = await asyncio.gather(*(asyncio.shield(future) for future in pending.values()))
+        return dict(zip(pending, results))
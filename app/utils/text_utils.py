@@ -0,0 +1,115 @@
+"""
+This module provides name normalization helpers shared by the screening engines
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import List
+
+
+_NON_ALPHANUMERIC = re.compile(r'[^\w\s]', re.UNICODE)
+_WHITESPACE = re.compile(r'\s+')
+
+# Spellings of the same or close sounds across romanizations (English, French, German,
+# Russian...), longest first. 'S' stands for the "sh" sound, which has no letter of its own
+_TRANSLITERATIONS = {
+    'tsch': 'S', 'dzh': 'j', 'sch': 'S', 'tch': 'S',
+    'ch': 'S', 'sh': 'S', 'zh': 'j', 'dj': 'j', 'kh': 'h', 'gh': 'g',
+    'ph': 'v', 'th': 't', 'dh': 'd', 'ck': 'k', 'qu': 'k',
+    'c': 'k', 'q': 'k', 'z': 's', 'f': 'v', 'w': 'v', 'y': 'i', 'x': 'ks',
+}
+_TRANSLITERATION = re.compile('|'.join(sorted(_TRANSLITERATIONS, key=len, reverse=True)))
+_REPEATED = re.compile(r'(.)\1+')
+_VOWELS = re.compile(r'[aeiou]')
+
+
+def normalize_name(name: str) -> str:
+    """
+    Normalize a name for comparison
+
+    Applies Unicode compatibility normalization, strips accents, replaces
+    punctuation with spaces, casefolds and collapses whitespace.
+
+    Args:
+        name: The name to normalize
+
+    Returns:
+        The normalized name, e.g. "Abú  ABBAS," becomes "abu abbas"
+    """
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(char for char in name if not unicodedata.combining(char))
+    name = _NON_ALPHANUMERIC.sub(' ', name).replace('_', ' ')
+    return _WHITESPACE.sub(' ', name).strip().casefold()
+
+
+def name_tokens(name: str) -> List[str]:
+    """
+    Split a name into its normalized tokens
+
+    Args:
+        name: The name to tokenize
+
+    Returns:
+        A list of normalized tokens
+    """
+    normalized = normalize_name(name)
+    return normalized.split(' ') if normalized else []
+
+
+def get_name_key(name: str) -> str:
+    """
+    Return the order-insensitive form of a name
+
+    Args:
+        name: The name to convert
+
+    Returns:
+        The sorted normalized tokens of the name, e.g. "Abbas, ABU" becomes "abbas abu"
+    """
+    return ' '.join(sorted(name_tokens(name)))
+
+
+@lru_cache(maxsize=65536)
+def transliterate_token(token: str) -> str:
+    """
+    Rewrite a normalized token with one spelling per sound, so romanizations
+    of the same name mostly agree
+
+    Args:
+        token: A normalized token, see name_tokens
+
+    Returns:
+        The token with equivalent spellings merged and repeated letters collapsed,
+        e.g. "mohammed" becomes "mohamed" and "muhammad" becomes "muhamad"
+    """
+    token = _REPEATED.sub(r'\1', token)
+    # a second pass merges the spellings the first one formed, like "qh" turned into "kh"
+    for _ in range(2):
+        token = _TRANSLITERATION.sub(lambda match: _TRANSLITERATIONS[match.group()], token)
+    return _REPEATED.sub(r'\1', token)
+
+
+@lru_cache(maxsize=65536)
+def phonetic_code(token: str) -> str:
+    """
+    Return the consonant skeleton of a normalized token, in the spirit of Metaphone
+    but tuned for romanized names rather than English spelling
+
+    Vowels are dropped after the first letter (a leading vowel becomes 'a'),
+    as is a final 'h', which romanizations add or leave out at will.
+
+    Args:
+        token: A normalized token, see name_tokens
+
+    Returns:
+        The phonetic code, e.g. "mhmd" for "Mohammed", "Muhammad" and "Mohamad"
+    """
+    transliterated = transliterate_token(token)
+    if not transliterated:
+        return ''
+    first = 'a' if transliterated[0] in 'aeiou' else transliterated[0]
+    rest = _VOWELS.sub('', transliterated[1:])
+    if rest.endswith('h'):
+        rest = rest[:-1]
+    return _REPEATED.sub(r'\1', first + rest)
@@ -0,0 +1,265 @@
+"""
+This module provides a write-behind buffer for bulk upserts to MongoDB
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from pymongo.errors import BulkWriteError
+from app.config import get_settings
+from app.database import MongoDB
+
+
+logger = logging.getLogger(__name__)
+
+
+# A buffered upsert is identified by its collection and filter query
+BufferKey = Tuple[str, Tuple]
+
+
+class WriteBehindBuffer:
+    """
+    Buffers bulk upsert operations in process and writes them in the background.
+
+    Operations are flushed once flush_size of them are buffered, or flush_interval
+    seconds after the previous flush. Upserts of the same filter query are merged
+    before being written, the latest update values winning and increments adding up.
+    Once max_size operations are buffered, writers wait for the next flush to make room,
+    or with drop_when_full their new operations are dropped, for bookkeeping that is
+    not worth slowing requests down while the database is unavailable.
+
+    A failed flush only keeps the operations that were not written for the next one,
+    as rewriting the others would apply their increments twice.
+
+    Buffered operations are lost if the process dies before they are flushed,
+    so only buffer writes the caller does not depend on.
+
+    Args:
+        db_client: The MongoDB client
+        flush_size: The number of buffered operations triggering a flush
+        flush_interval: The maximum number of seconds an operation stays buffered
+        max_size: The number of buffered operations at which writers are blocked
+        drop_when_full: Whether to drop new operations rather than block writers once full
+        batch_size: The maximum number of operations per bulk write, defaults to the
+            MONGO_BULK_WRITE_BATCH_SIZE setting
+    """
+    def __init__(
+        self,
+        db_client: MongoDB,
+        flush_size: int = 500,
+        flush_interval: float = 0.2,
+        max_size: int = 10000,
+        drop_when_full: bool = False,
+        batch_size: Optional[int] = None
+    ) -> None:
+        self.db_client = db_client
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_size = max(max_size, flush_size)
+        self.drop_when_full = drop_when_full
+        self.batch_size = batch_size or get_settings().mongo_bulk_write_batch_size
+        self._operations: Dict[BufferKey, Dict[str, Dict[str, Any]]] = {}
+        self._flush_requested = asyncio.Event()
+        self._space_available = asyncio.Event()
+        self._space_available.set()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        # counters used to size the buffer
+        self.buffered = 0
+        self.merged = 0
+        self.flushes = 0
+        self.flushed = 0
+        self.failures = 0
+        self.blocked = 0
+        self.dropped = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    def __len__(self) -> int:
+        return len(self._operations)
+
+    # Private methods
+    @staticmethod
+    def _get_key(collection_name: str, filter_query: Dict[str, Any]) -> BufferKey:
+        return collection_name, tuple(sorted(filter_query.items()))
+
+    @staticmethod
+    def _merge_operations(
+        older: Dict[str, Dict[str, Any]],
+        newer: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Dict[str, Any]]:
+        merged = {'filter_query': newer['filter_query']}
+        for values in ('update_values', 'insert_values'):
+            if values in older or values in newer:
+                merged[values] = {**older.get(values, {}), **newer.get(values, {})}
+        if 'increment_values' in older or 'increment_values' in newer:
+            increment_values = dict(older.get('increment_values', {}))
+            for field, value in newer.get('increment_values', {}).items():
+                increment_values[field] = increment_values.get(field, 0) + value
+            merged['increment_values'] = increment_values
+        return merged
+
+    def _merge(self, key: BufferKey, operation: Dict[str, Dict[str, Any]]) -> None:
+        buffered = self._operations.get(key)
+        if buffered is None:
+            self._operations[key] = operation
+            return
+
+        self.merged += 1
+        self._operations[key] = self._merge_operations(buffered, operation)
+
+    def _update_space(self) -> None:
+        if len(self._operations) < self.max_size:
+            self._space_available.set()
+        else:
+            self._space_available.clear()
+
+    async def _run(self) -> None:
+        # closing lets the last flush finish, cancelling it would lose the operations it swapped out
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            try:
+                await self.flush()
+            except Exception as err:  # pylint: disable=broad-exception-caught
+                # the operations were put back in the buffer, retry on the next flush
+                logger.error("Write-behind buffer - Error flushing: %s", err)
+
+    # Public methods
+    def start(self) -> None:
+        """
+        Start the background flushes
+        """
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._run())
+
+    async def put(self, collection_name: str, operations: List[Dict[str, Dict[str, Any]]]) -> None:
+        """
+        Buffer upsert operations, waiting for room while the buffer is full
+
+        Args:
+            collection_name: The name of the collection to update.
+            operations: A list of operations, each containing a filter query and update values.
+        """
+        self.start()
+        for operation in operations:
+            key = self._get_key(collection_name, operation['filter_query'])
+            if key not in self._operations and len(self._operations) >= self.max_size:
+                if self.drop_when_full:
+                    self.dropped += 1
+                    self._flush_requested.set()
+                    continue
+                self.blocked += 1
+                self._flush_requested.set()
+                while len(self._operations) >= self.max_size:
+                    self._space_available.clear()
+                    await self._space_available.wait()
+            self._merge(key, operation)
+            self.buffered += 1
+
+        self._update_space()
+        if len(self._operations) >= self.flush_size:
+            self._flush_requested.set()
+
+    async def flush(self) -> None:
+        """
+        Write every buffered operation, in bulk upserts of at most batch_size operations per collection
+
+        Raises:
+            Exception: The first error of the flush, after the operations that were not
+                written were put back in the buffer
+        """
+        async with self._flush_lock:
+            if not self._operations:
+                return
+
+            operations, self._operations = self._operations, {}
+            self._update_space()
+
+            by_collection: Dict[str, List[Tuple[BufferKey, Dict[str, Dict[str, Any]]]]] = {}
+            for key, operation in operations.items():
+                by_collection.setdefault(key[0], []).append((key, operation))
+
+            start_time = time.perf_counter()
+            unwritten: List[Tuple[BufferKey, Dict[str, Dict[str, Any]]]] = []
+            error: Optional[Exception] = None
+            for collection_name, collection_operations in by_collection.items():
+                for i in range(0, len(collection_operations), self.batch_size):
+                    batch = collection_operations[i:i + self.batch_size]
+                    if error is not None and not isinstance(error, BulkWriteError):
+                        # the database is likely unreachable, keep the rest for the next flush
+                        unwritten.extend(batch)
+                        continue
+                    try:
+                        await self.db_client.bulk_upsert_documents(
+                            collection_name,
+                            [operation for _, operation in batch],
+                            self.batch_size
+                        )
+                    except BulkWriteError as err:
+                        # unordered bulk writes apply every operation but the ones reported
+                        failed = {write_error['index'] for write_error in err.details.get('writeErrors', [])}
+                        unwritten.extend(batch[index] for index in sorted(failed))
+                        error = error or err
+                    except Exception as err:  # pylint: disable=broad-exception-caught
+                        # a batch failing as a whole, like on a connection error, was most likely not written
+                        unwritten.extend(batch)
+                        error = err
+
+            elapsed_ms = (time.perf_counter() - start_time) * 1000
+            self.flushed += len(operations) - len(unwritten)
+            if error is not None:
+                # keep the operations for the next flush, under the ones buffered since
+                self.failures += 1
+                for key, operation in unwritten:
+                    buffered = self._operations.get(key)
+                    self._operations[key] = (
+                        operation if buffered is None else self._merge_operations(operation, buffered)
+                    )
+                self._update_space()
+                raise error
+
+            self.flushes += 1
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self.total_flush_ms += elapsed_ms
+
+    async def close(self) -> None:
+        """
+        Stop the background flushes once the running one is done, and drain the buffer
+        """
+        if self._flush_task is not None:
+            self._closing = True
+            self._flush_requested.set()
+            await self._flush_task
+            self._flush_task = None
+            self._closing = False
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the depth and counters of the buffer
+        """
+        return {
+            'depth': len(self._operations),
+            'flush_size': self.flush_size,
+            'flush_interval': self.flush_interval,
+            'max_size': self.max_size,
+            'buffered': self.buffered,
+            'merged': self.merged,
+            'blocked': self.blocked,
+            'dropped': self.dropped,
+            'flushes': self.flushes,
+            'flushed': self.flushed,
+            'failures': self.failures,
+            'last_flush_ms': self.last_flush_ms,
+            'max_flush_ms': self.max_flush_ms,
+            'avg_flush_ms': self.total_flush_ms / self.flushes if self.flushes else 0.0
+        }
@@ -0,0 +1,214 @@
+"""
+Recall and speed of the blocking index against the brute-force n-gram matcher
+
+Builds a sanctions list of --entries synthetic entries plus one entry per person
+of tests/conftest.py, then screens romanization variants of those people
+("Mohammed" / "Muhammad" / "Mohamad", token order, doubled letters...) and of
+--sampled synthetic entries. Recall is the share of variants whose entry is
+among the blocking candidates, or matched by match_names_blocked and by the
+brute-force match_names.
+
+Usage:
+    python -m benchmarks.bench_blocking --entries 20000 --variants 20
+"""
+
+import argparse
+import ast
+import json
+import random
+import time
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+from app.sanctions.sdn_index import SdnIndex
+from app.sanctions.sdn_list import SanctionEntry
+from app.utils.countries import normalize_country
+
+
+CONFTEST_PATH = 'tests/conftest.py'
+
+GIVEN_NAMES = (
+    'Mohammed', 'Ahmed', 'Ali', 'Hassan', 'Hussein', 'Abdullah', 'Omar', 'Khalid', 'Youssef', 'Ibrahim',
+    'Mahmoud', 'Mustafa', 'Abdul', 'Rahman', 'Karim', 'Jamal', 'Said', 'Nasser', 'Tariq', 'Walid',
+    'Sergei', 'Alexander', 'Dmitri', 'Vladimir', 'Nikolai', 'Mikhail', 'Yuri', 'Igor', 'Oleg', 'Boris',
+    'Reza', 'Hossein', 'Mehdi', 'Javad', 'Qasem', 'Ghulam', 'Zahir', 'Shafiq', 'Bashir', 'Faisal'
+)
+FAMILY_NAMES = (
+    'Al Masri', 'Haddad', 'Khoury', 'Nasrallah', 'Zaydan', 'Qureshi', 'Siddiqui', 'Hakimi', 'Karimi', 'Rahimi',
+    'Ivanov', 'Petrov', 'Sokolov', 'Kuznetsov', 'Chernov', 'Volkov', 'Zhukov', 'Morozov', 'Novikov', 'Fedorov',
+    'Tehrani', 'Shirazi', 'Jafari', 'Mousavi', 'Hashemi', 'Sadeghi', 'Akbari', 'Ghorbani', 'Rostami', 'Bakr',
+    'Al Baghdadi', 'Al Tikriti', 'Ould Abdallah', 'Ben Ali', 'Bin Laden', 'Abu Bakr', 'El Sayed', 'Darwish'
+)
+# Syllables of the rarer synthetic names, for a vocabulary as varied as a real list's
+SYLLABLES = (
+    'ab', 'al', 'am', 'ar', 'ba', 'bek', 'da', 'di', 'dor', 'fa', 'ga', 'gor', 'ha', 'hi', 'ja', 'ka', 'kov',
+    'la', 'li', 'ma', 'mi', 'mor', 'na', 'ni', 'no', 'ov', 'ra', 'ri', 'ro', 'sa', 'si', 'sha', 'ta', 'ti',
+    'tor', 'va', 'vi', 'ya', 'za', 'zi', 'ud', 'ul', 'um', 'in', 'ik', 'ef', 'esh', 'ur', 'ol', 'an'
+)
+COUNTRIES = ('YE', 'AF', 'IR', 'SY', 'RU', 'CU', 'IQ', 'LY', 'LB', 'KP')
+
+# Spellings romanizations swap for one another
+SUBSTITUTIONS = (
+    ('mm', 'm'), ('ed', 'ad'), ('o', 'u'), ('u', 'o'), ('ou', 'u'), ('u', 'ou'), ('ei', 'ay'), ('ai', 'ay'),
+    ('y', 'i'), ('i', 'y'), ('ee', 'i'), ('kh', 'ch'), ('kh', 'h'), ('sh', 'sch'), ('j', 'dj'), ('q', 'k'),
+    ('k', 'q'), ('ss', 's'), ('s', 'ss'), ('z', 's'), ('w', 'v'), ('v', 'w'), ('ph', 'f'), ('ah', 'a'),
+    ('ov', 'off'), ('ch', 'tch'), ('ei', 'ey'), ('ie', 'iy'), ('e', 'a'), ('a', 'e')
+)
+
+
+def read_conftest_people(path: str) -> List[Dict[str, Any]]:
+    """
+    Return the people posted by the fixtures of tests/conftest.py
+    """
+    with open(path, encoding='utf-8') as conftest:
+        tree = ast.parse(conftest.read())
+    people = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Dict):
+            keys = [key.value for key in node.keys if isinstance(key, ast.Constant)]
+            if {'name', 'dob', 'country'} <= set(keys):
+                person = ast.literal_eval(node)
+                people[person['name']] = person
+    return list(people.values())
+
+
+def romanize(rng: random.Random, name: str, changes: int) -> str:
+    """
+    Return a spelling of name with up to changes substitutions, and its tokens maybe reordered
+    """
+    variant = name.lower()
+    for _ in range(changes):
+        applicable = [(old, new) for old, new in SUBSTITUTIONS if old in variant]
+        if not applicable:
+            break
+        old, new = rng.choice(applicable)
+        positions = [index for index in range(len(variant)) if variant.startswith(old, index)]
+        index = rng.choice(positions)
+        variant = variant[:index] + new + variant[index + len(old):]
+    tokens = variant.split()
+    if len(tokens) > 1 and rng.random() < 0.3:
+        rng.shuffle(tokens)
+    return ' '.join(tokens).title()
+
+
+def synthetic_token(rng: random.Random, common: Sequence[str]) -> str:
+    """
+    Return a common name half of the time, a rarer made up one otherwise
+    """
+    if rng.random() < 0.5:
+        return rng.choice(common)
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).title()
+
+
+def build_entries(rng: random.Random, count: int, people: List[Dict[str, Any]]) -> List[SanctionEntry]:
+    entries = []
+    for number in range(count):
+        tokens = [synthetic_token(rng, GIVEN_NAMES) for _ in range(rng.randint(1, 2))]
+        tokens.append(synthetic_token(rng, FAMILY_NAMES))
+        name = romanize(rng, ' '.join(tokens), rng.randint(0, 2))
+        aliases = tuple(romanize(rng, name, 2) for _ in range(rng.randint(0, 2)))
+        birth_year = rng.randint(1940, 2000)
+        entries.append(SanctionEntry(
+            uid=str(number),
+            names=(name,) + aliases,
+            dobs=frozenset(),
+            birth_years=frozenset([birth_year]) if rng.random() < 0.8 else frozenset(),
+            countries=frozenset([rng.choice(COUNTRIES)])
+        ))
+    for number, person in enumerate(people):
+        entries.append(SanctionEntry(
+            uid=f'conftest-{number}',
+            names=(person['name'],),
+            dobs=frozenset([person['dob']]),
+            birth_years=frozenset([int(person['dob'][:4])]),
+            countries=frozenset([normalize_country(person['country'])])
+        ))
+    return entries
+
+
+def measure(
+    index: SdnIndex,
+    queries: Sequence[Tuple[str, int]],
+    repeat: int
+) -> Dict[str, Any]:
+    names = [name for name, _ in queries]
+    candidates = [index.blocking.get_candidate_names(name) for name in names]
+    candidate_entries = [{index.blocking.owners[name_id] for name_id in name_ids} for name_ids in candidates]
+    blocked = index.match_names_blocked(names)
+    brute_force = index.match_names(names)
+
+    def recall(matches: List[set]) -> float:
+        found = sum(position in match for (_, position), match in zip(queries, matches))
+        return round(found / len(queries), 4) if queries else 0.0
+
+    sizes = sorted(len(name_ids) for name_ids in candidates)
+    return {
+        'queries': len(queries),
+        'candidate_recall': recall(candidate_entries),
+        'blocked_match_recall': recall(blocked),
+        'brute_force_match_recall': recall(brute_force),
+        'candidates_mean': round(sum(sizes) / len(sizes), 1) if sizes else 0,
+        'candidates_p99': sizes[min(len(sizes) - 1, int(0.99 * len(sizes)))] if sizes else 0,
+        'candidates_us_per_name': time_per_name(
+            lambda: [index.blocking.get_candidate_names(name) for name in names], len(names), repeat
+        ),
+        'blocked_match_us_per_name': time_per_name(
+            lambda: index.match_names_blocked(names), len(names), repeat
+        ),
+        'brute_force_match_us_per_name': time_per_name(
+            lambda: index.match_names(names), len(names), repeat
+        )
+    }
+
+
+def time_per_name(function: Callable[[], Any], count: int, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start_time)
+    return round(best / max(count, 1) * 1e6, 2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=20000)
+    parser.add_argument('--variants', type=int, default=20, help='Variants per conftest person')
+    parser.add_argument('--sampled', type=int, default=500, help='Synthetic entries screened as variants')
+    parser.add_argument('--changes', type=int, default=2, help='Spelling changes per variant')
+    parser.add_argument('--min-score', type=float, default=0.9)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    people = read_conftest_people(CONFTEST_PATH)
+    entries = build_entries(rng, args.entries, people)
+
+    start_time = time.perf_counter()
+    index = SdnIndex(entries, min_score=args.min_score)
+    build_seconds = time.perf_counter() - start_time
+
+    conftest_queries = [
+        (romanize(rng, person['name'], rng.randint(1, args.changes)), args.entries + number)
+        for number, person in enumerate(people)
+        for _ in range(args.variants)
+    ]
+    sampled_queries = [
+        (romanize(rng, entries[position].names[0], rng.randint(1, args.changes)), position)
+        for position in rng.sample(range(args.entries), min(args.sampled, args.entries))
+    ]
+
+    report = {
+        'entries': len(entries),
+        'names': len(index.blocking),
+        'token_blocks': len(index.blocking.token_blocks),
+        'build_seconds': round(build_seconds, 2),
+        'conftest_people': [person['name'] for person in people],
+        'conftest_variants_sample': [name for name, _ in conftest_queries[:5]],
+        'conftest': measure(index, conftest_queries, args.repeat),
+        'sampled': measure(index, sampled_queries, args.repeat)
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
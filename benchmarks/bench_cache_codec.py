@@ -0,0 +1,125 @@
+"""
+Micro-benchmark of the cached screening result encodings
+
+Compares the previous JSON values (flags and id) with the compact binary
+encoding: value size, and the cost of decoding a value and building the
+result of a cache hit. With --redis-url, also measures the Redis memory used
+per key (MEMORY USAGE) by writing --keys keys of each format.
+
+Usage:
+    python -m benchmarks.bench_cache_codec --values 100000 [--redis-url redis://localhost:6379/15]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Callable, Dict, List
+from app.utils.identity_utils import get_identity_key
+from app.utils.result_codec import decode_result, encode_result
+
+
+def build_results(count: int) -> List[Dict[str, Any]]:
+    rng = random.Random(0)
+    return [
+        {
+            'name_match': rng.random() < 0.3,
+            'dob_match': rng.random() < 0.1,
+            'country_match': rng.random() < 0.2,
+            'id': person_id
+        }
+        for person_id in range(count)
+    ]
+
+
+def legacy_decode(values: List[bytes]) -> List[Dict[str, Any]]:
+    results = []
+    for person_id, value in enumerate(values):
+        cached_data = json.loads(value)
+        results.append({**cached_data, 'id': person_id})
+    return results
+
+
+def compact_decode(values: List[bytes]) -> List[Dict[str, Any]]:
+    results = []
+    for person_id, value in enumerate(values):
+        cached_data = decode_result(value)
+        results.append({**cached_data, 'id': person_id})
+    return results
+
+
+def time_per_value(function: Callable[[], Any], count: int, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start_time)
+    return round(best / count * 1e9, 1)
+
+
+async def redis_memory_per_key(redis_url: str, values: Dict[str, List[bytes]], key_count: int) -> Dict[str, float]:
+    # imported here so the rest of the benchmark runs without a Redis server
+    import aioredis  # pylint: disable=import-outside-toplevel
+
+    redis = aioredis.from_url(redis_url)
+    memory = {}
+    try:
+        for name, encoded_values in values.items():
+            keys = [f'bench:{name}:{get_identity_key(str(i), "2000-01-01", "US")}' for i in range(key_count)]
+            async with redis.pipeline(transaction=False) as pipe:
+                for key, value in zip(keys, encoded_values):
+                    pipe.set(key, value, ex=600)
+                await pipe.execute()
+            async with redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.memory_usage(key)
+                usages = await pipe.execute()
+            memory[name] = round(sum(usages) / len(usages), 1)
+            await redis.delete(*keys)
+    finally:
+        await redis.close()
+    return memory
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--values', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--redis-url')
+    parser.add_argument('--keys', type=int, default=10000)
+    args = parser.parse_args()
+
+    results = build_results(args.values)
+    legacy_values = [json.dumps(result).encode('utf-8') for result in results]
+    compact_values = [encode_result(result) for result in results]
+
+    report = {
+        'values': args.values,
+        'legacy_value_bytes': round(sum(map(len, legacy_values)) / args.values, 1),
+        'compact_value_bytes': round(sum(map(len, compact_values)) / args.values, 1),
+        # decoding a value and building the result of a cache hit
+        'legacy_decode_ns_per_value': time_per_value(
+            lambda: legacy_decode(legacy_values), args.values, args.repeat
+        ),
+        'compact_decode_ns_per_value': time_per_value(
+            lambda: compact_decode(compact_values), args.values, args.repeat
+        ),
+        'encode_ns_per_value': time_per_value(
+            lambda: [encode_result(result) for result in results], args.values, args.repeat
+        ),
+    }
+
+    if args.redis_url:
+        key_count = min(args.keys, args.values)
+        report['redis_bytes_per_key'] = asyncio.run(redis_memory_per_key(
+            args.redis_url,
+            {'legacy': legacy_values[:key_count], 'compact': compact_values[:key_count]},
+            key_count
+        ))
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
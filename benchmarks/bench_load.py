@@ -0,0 +1,233 @@
+"""
+End-to-end load benchmark of the screening API
+
+Drives app.main.app in process with concurrent POST /api/v1/screen/ requests,
+screened by the OFAC engine against a local stub OFAC server answering after
+--ofac-latency-ms. Redis is an in-memory fake by default (requires the fakeredis
+package) and MongoDB an in-memory stand-in answering after --mongo-latency-ms,
+or local servers are used with --redis-url and --mongo-host. The sanctions list version is bumped before each run, so
+results cached or stored by previous runs are never reused.
+
+Each batch holds --cache-hit-ratio people screened during the warm-up, and
+--duplicate-ratio repetitions of other people of the same batch, the rest
+being people never screened before.
+
+Reports throughput, latency percentiles, upstream calls and peak RSS as JSON.
+
+Usage:
+    python -m benchmarks.bench_load --requests 200 --concurrency 16 --batch-size 50 \\
+        --duplicate-ratio 0.1 --cache-hit-ratio 0.5 --ofac-latency-ms 100
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import resource
+import sys
+import time
+from itertools import count
+from typing import Any, Dict, Iterator, List
+import httpx
+from app.config import get_settings
+from app.main import app
+from app.registry import registry
+from app.utils.redis_utils import RedisUtil
+from benchmarks.fakes import InMemoryMongoDB
+from tests.ofac_stub import OfacStubServer
+
+
+COUNTRIES = ('Yemen', 'US', 'Canada', 'Afghanistan', 'France', 'Iran', 'Mexico', 'Syria')
+
+
+def person_factory(seed: int) -> Iterator[Dict[str, Any]]:
+    """
+    Yields distinct people, one in a hundred with a sanctioned name
+    """
+    rng = random.Random(seed)
+    for number in count():
+        name = f'SANCTIONED Person {number}' if number % 100 == 0 else f'Person {number}'
+        yield {
+            'name': name,
+            'dob': f'{rng.randint(1930, 2005)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+            'country': rng.choice(COUNTRIES)
+        }
+
+
+def build_batch(
+    rng: random.Random,
+    new_people: Iterator[Dict[str, Any]],
+    cached_people: List[Dict[str, Any]],
+    batch_size: int,
+    duplicate_ratio: float,
+    cache_hit_ratio: float
+) -> List[Dict[str, Any]]:
+    duplicates = int(batch_size * duplicate_ratio)
+    distinct = batch_size - duplicates
+    hits = min(int(distinct * cache_hit_ratio), len(cached_people))
+
+    people = rng.sample(cached_people, hits) if hits else []
+    people.extend(next(new_people) for _ in range(distinct - hits))
+    people.extend(rng.choice(people) for _ in range(duplicates) if people)
+    rng.shuffle(people)
+    return [{**person, 'id': person_id} for person_id, person in enumerate(people)]
+
+
+def percentile(latencies: List[float], value: float) -> float:
+    if not latencies:
+        return 0.0
+    latencies = sorted(latencies)
+    return round(latencies[min(len(latencies) - 1, int(value * len(latencies)))] * 1000, 2)
+
+
+def get_peak_rss_mb() -> float:
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak_rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def use_fake_clients(args: argparse.Namespace) -> None:
+    """
+    Gives the registry in-memory Redis and MongoDB clients unless local servers are used
+    """
+    if not args.redis_url:
+        try:
+            # only needed without a local server
+            import fakeredis.aioredis  # pylint: disable=import-outside-toplevel
+        except ImportError as err:
+            raise SystemExit("fakeredis is required without a local Redis, install it or pass --redis-url") from err
+
+        redis_util = RedisUtil.__new__(RedisUtil)
+        redis_util.redis = fakeredis.aioredis.FakeRedis()
+        redis_util._take_tokens_script = None  # pylint: disable=protected-access
+        registry._redis_util = redis_util  # pylint: disable=protected-access
+
+    if not args.mongo_host:
+        registry._db_client = InMemoryMongoDB(args.mongo_latency_ms / 1000)  # pylint: disable=protected-access
+
+
+def configure(args: argparse.Namespace, ofac_api_url: str) -> None:
+    settings = get_settings()
+    settings.screening_engine = 'ofac'
+    settings.ofac_api_url = ofac_api_url
+    settings.ofac_api_key = 'benchmark'
+    settings.ofac_api_fallback_engine = ''
+    settings.ofac_api_timeout = max(settings.ofac_api_timeout, args.ofac_latency_ms / 1000 * 10)
+    settings.rate_limit = args.rate_limit
+    if args.redis_url:
+        settings.redis_url = args.redis_url
+    if args.mongo_host:
+        settings.mongo_host = args.mongo_host
+        settings.mongo_port = args.mongo_port
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    new_people = person_factory(args.seed)
+    stub_fault = 'slow' if args.ofac_latency_ms > 0 else 'ok'
+
+    async with OfacStubServer(default=stub_fault, delay=args.ofac_latency_ms / 1000) as stub:
+        configure(args, stub.url)
+        use_fake_clients(args)
+
+        async with app.router.lifespan_context(app):
+            list_version = await registry.list_version.bump()
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=None) as client:
+                # screen the people later batches hit the cache with
+                cached_people = [next(new_people) for _ in range(args.cached_people)]
+                for start in range(0, len(cached_people), args.batch_size):
+                    batch = cached_people[start:start + args.batch_size]
+                    body = [{**person, 'id': person_id} for person_id, person in enumerate(batch)]
+                    response = await client.post('/api/v1/screen/', json=body)
+                    response.raise_for_status()
+
+                warmup_requests, warmup_cases = stub.requests, stub.cases
+                batches = [
+                    build_batch(rng, new_people, cached_people, args.batch_size,
+                                args.duplicate_ratio, args.cache_hit_ratio)
+                    for _ in range(args.requests)
+                ]
+
+                latencies: List[float] = []
+                errors: Dict[str, int] = {}
+                queue = iter(batches)
+
+                async def worker() -> None:
+                    for batch in queue:
+                        start_time = time.perf_counter()
+                        response = await client.post('/api/v1/screen/', json=batch)
+                        latencies.append(time.perf_counter() - start_time)
+                        if response.status_code != 200:
+                            errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+
+                start_time = time.perf_counter()
+                await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+                elapsed = time.perf_counter() - start_time
+
+            upstream_stats = registry.ofac_caller.stats()
+
+    people = args.requests * args.batch_size
+    return {
+        'config': {
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'batch_size': args.batch_size,
+            'duplicate_ratio': args.duplicate_ratio,
+            'cache_hit_ratio': args.cache_hit_ratio,
+            'cached_people': args.cached_people,
+            'ofac_latency_ms': args.ofac_latency_ms,
+            'redis': 'local' if args.redis_url else 'fake',
+            'mongo': 'local' if args.mongo_host else 'fake',
+            'mongo_latency_ms': None if args.mongo_host else args.mongo_latency_ms,
+            'write_behind': get_settings().write_behind,
+            'list_version': list_version
+        },
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(args.requests / elapsed, 1),
+        'people_per_second': round(people / elapsed, 1),
+        'latency_ms': {
+            'p50': percentile(latencies, 0.5),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+            'max': percentile(latencies, 1.0)
+        },
+        'errors': errors,
+        'upstream': {
+            'requests': stub.requests - warmup_requests,
+            'cases': stub.cases - warmup_cases,
+            'retries': upstream_stats['retries'],
+            'hedges': upstream_stats['hedges']
+        },
+        'peak_rss_mb': get_peak_rss_mb()
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--duplicate-ratio', type=float, default=0.1)
+    parser.add_argument('--cache-hit-ratio', type=float, default=0.5)
+    parser.add_argument('--cached-people', type=int, default=1000,
+                        help='People screened during the warm-up, drawn from for cache hits')
+    parser.add_argument('--ofac-latency-ms', type=float, default=100)
+    parser.add_argument('--rate-limit', action='store_true', help='Keep the rate limiter enabled')
+    parser.add_argument('--redis-url', help='Use a local Redis server instead of a fake one')
+    parser.add_argument('--mongo-host', help='Use a local MongoDB server instead of a fake one')
+    parser.add_argument('--mongo-port', default='27017')
+    parser.add_argument('--mongo-latency-ms', type=float, default=1.0,
+                        help='Round trip of the in-memory MongoDB stand-in')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    # the service's own output goes to stderr, so stdout only holds the report
+    with contextlib.redirect_stdout(sys.stderr):
+        report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
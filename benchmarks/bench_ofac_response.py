@@ -0,0 +1,140 @@
+"""
+Micro-benchmark of the OFAC response processing, per screened case
+
+Compares OfacResponseProcessor with the previous per-match linear scans on a
+synthetic response, and the streaming parse when ijson is installed.
+
+Usage:
+    python -m benchmarks.bench_ofac_response --cases 1000 --matches 30
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Callable, Dict, List
+from app.services.ofac_response import OfacResponseProcessor, is_stream_parsing_available
+
+
+COUNTRIES = ['Yemen', 'Afghanistan', 'Iran', 'Syria', 'Russia', 'Cuba', 'Iraq', 'Libya']
+
+
+def build_response(case_count: int, match_count: int, sanction_count: int) -> Dict[str, Any]:
+    rng = random.Random(0)
+    sanctions = []
+    for sanction_id in range(sanction_count):
+        sanctions.append({
+            'id': str(sanction_id),
+            'addresses': [{'country': rng.choice(COUNTRIES)} for _ in range(3)],
+            'personDetails': {
+                'citizenships': [rng.choice(COUNTRIES)],
+                'nationalities': [rng.choice(COUNTRIES)]
+            }
+        })
+
+    results = []
+    for case_id in range(case_count):
+        matches = []
+        for _ in range(match_count):
+            field_names = rng.sample(['Name', 'DOB', 'Citizenship', 'Address'], 2)
+            matches.append({
+                'matchSummary': {'matchFields': [{'fieldName': name} for name in field_names]},
+                'sanction': rng.choice(sanctions)
+            })
+        results.append({'id': str(case_id), 'matches': matches})
+    return {'error': False, 'results': results}
+
+
+def legacy_process(response: Dict[str, Any], countries: Dict[int, str]) -> List[Dict[str, Any]]:
+    """
+    The transformation used before OfacResponseProcessor, kept as the baseline
+    """
+    person_screening_results = []
+    for result in response.get('results', []):
+        person_id = int(result['id'])
+        country = countries[person_id]
+        person_screening_result = {
+            'id': person_id, 'name_match': False, 'dob_match': False, 'country_match': False
+        }
+        for match in result.get('matches', []):
+            for match_field in match.get('matchSummary', {}).get('matchFields', []):
+                if person_screening_result['name_match'] and person_screening_result['dob_match']:
+                    break
+                field_name = match_field.get('fieldName')
+                if field_name == 'Name':
+                    person_screening_result['name_match'] = True
+                    continue
+                if field_name == 'DOB':
+                    person_screening_result['dob_match'] = True
+
+            sanction = match.get('sanction', {})
+            found = any(a.get('country') == country for a in sanction.get('addresses', []))
+            details = sanction.get('personDetails', {})
+            found = found or country in details.get('citizenships', [])
+            found = found or country in details.get('nationalities', [])
+            if found:
+                person_screening_result['country_match'] = True
+        person_screening_results.append(person_screening_result)
+    return person_screening_results
+
+
+def time_per_case(run: Callable[[], Any], case_count: int, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best / case_count * 1e6
+
+
+async def stream_bytes(body: bytes, chunk_size: int = 65536):
+    for i in range(0, len(body), chunk_size):
+        yield body[i:i + chunk_size]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', type=int, default=1000)
+    parser.add_argument('--matches', type=int, default=30)
+    parser.add_argument('--sanctions', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    response = build_response(args.cases, args.matches, args.sanctions)
+    rng = random.Random(1)
+    countries = {case_id: rng.choice(COUNTRIES) for case_id in range(args.cases)}
+
+    report = {
+        'cases': args.cases,
+        'matches_per_case': args.matches,
+        # processing of an already parsed response
+        'legacy_us_per_case': time_per_case(
+            lambda: legacy_process(response, countries), args.cases, args.repeat
+        ),
+        'processor_us_per_case': time_per_case(
+            lambda: OfacResponseProcessor(countries).process_response(response),
+            args.cases,
+            args.repeat
+        ),
+    }
+
+    # parsing and processing of the raw response body
+    body = json.dumps(response).encode('utf-8')
+    report['parse_and_process_us_per_case'] = time_per_case(
+        lambda: OfacResponseProcessor(countries).process_response(json.loads(body)),
+        args.cases,
+        args.repeat
+    )
+    if is_stream_parsing_available():
+        report['stream_parse_and_process_us_per_case'] = time_per_case(
+            lambda: asyncio.run(OfacResponseProcessor(countries).process_stream(stream_bytes(body))),
+            args.cases,
+            args.repeat
+        )
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+In-memory stand-ins for the databases, for benchmarks that measure the service rather than its databases
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from app.database import MongoDB
+
+
+class _Collection:
+    async def create_index(self, *args, **kwargs) -> None:
+        pass
+
+    async def drop_index(self, *args, **kwargs) -> None:
+        pass
+
+
+class _Cursor:
+    def __init__(self, documents: List[Dict[str, Any]], latency: float) -> None:
+        self.documents = documents
+        self.latency = latency
+
+    def sort(self, field: str, direction: int = 1) -> '_Cursor':
+        self.documents.sort(key=lambda document: document.get(field, 0), reverse=direction < 0)
+        return self
+
+    def limit(self, limit: int) -> '_Cursor':
+        self.documents = self.documents[:limit]
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        await asyncio.sleep(self.latency)
+        return self.documents[:length] if length else self.documents
+
+    def __aiter__(self) -> Iterator[Dict[str, Any]]:
+        return self._iterate()
+
+    async def _iterate(self):
+        await asyncio.sleep(self.latency)
+        for document in self.documents:
+            yield document
+
+
+def _matches(document: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    for field, condition in query.items():
+        value = document.get(field)
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+            continue
+        for operator, operand in condition.items():
+            if operator == '$in' and value not in operand:
+                return False
+            if operator == '$gt' and (value is None or value <= operand):
+                return False
+            if operator == '$gte' and (value is None or value < operand):
+                return False
+            if operator == '$exists' and (field in document) != operand:
+                return False
+    return True
+
+
+class InMemoryMongoDB(MongoDB):
+    """
+    Keeps documents in dicts, keyed by their upsert filter, with an index on
+    the identity field, so each operation costs as little as a real indexed
+    one apart from the round trip, simulated by sleeping latency seconds per call.
+
+    Only supports the queries the screening path makes.
+
+    Args:
+        latency: Seconds of each simulated round trip
+    """
+    def __init__(self, latency: float = 0.0) -> None:  # pylint: disable=super-init-not-called
+        self.latency = latency
+        self.collections: Dict[str, Dict[Tuple, Dict[str, Any]]] = {}
+        self.identities: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # counters of the calls made, reported by the benchmarks
+        self.calls = 0
+
+    # Private methods
+    def _find(self, collection_name: str, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        identity = query.get('identity')
+        if isinstance(identity, dict) and '$in' in identity:
+            index = self.identities.get(collection_name, {})
+            candidates = [index[key] for key in identity['$in'] if key in index]
+        else:
+            candidates = list(self.collections.get(collection_name, {}).values())
+        return [document for document in candidates if _matches(document, query)]
+
+    @staticmethod
+    def _project(document: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if not projection:
+            return dict(document)
+        fields = [field for field, included in projection.items() if included and field != '_id']
+        return {field: document[field] for field in fields if field in document}
+
+    # Public methods
+    def close(self) -> None:
+        pass
+
+    def get_collection(self, collection_name: str) -> _Collection:
+        return _Collection()
+
+    def find_documents_cursor(
+        self,
+        collection_name: str,
+        query: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None
+    ) -> _Cursor:
+        self.calls += 1
+        documents = [self._project(document, projection) for document in self._find(collection_name, query)]
+        return _Cursor(documents, self.latency)
+
+    async def find_documents(self, collection_name: str, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return await self.find_documents_cursor(collection_name, query).to_list()
+
+    async def find_document(self, collection_name: str, query: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        documents = await self.find_documents(collection_name, query)
+        return documents[0] if documents else None
+
+    async def insert_document(self, collection_name: str, document: Dict[str, Any]) -> None:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        current_time = datetime.now(timezone.utc)
+        document = {**document, 'created_at': current_time, 'updated_at': current_time}
+        self.collections.setdefault(collection_name, {})[(('_id', document.get('_id')),)] = document
+
+    async def bulk_upsert_documents(
+        self,
+        collection_name: str,
+        operations: List[Dict[str, Dict[str, Any]]],
+        batch_size: Optional[int] = None
+    ) -> List[int]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        current_time = datetime.now(timezone.utc)
+        documents = self.collections.setdefault(collection_name, {})
+        identities = self.identities.setdefault(collection_name, {})
+        for operation in operations:
+            filter_query = operation['filter_query']
+            key = tuple(sorted(filter_query.items()))
+            document = documents.get(key)
+            if document is None:
+                document = {**filter_query, **operation.get('insert_values', {}), 'created_at': current_time}
+                documents[key] = document
+            if 'update_values' in operation:
+                document.update(operation['update_values'])
+                document['updated_at'] = current_time
+            for field, value in operation.get('increment_values', {}).items():
+                document[field] = document.get(field, 0) + value
+            if 'identity' in document:
+                identities[document['identity']] = document
+        return [len(operations)]
@@ -3,10 +3,14 @@ from fastapi.testclient import TestClient
 from app.main import app
 
 
-client = TestClient(app)
+@pytest.fixture(scope='session')
+def client():
+    # run the application lifespan so the shared clients are created once
+    with TestClient(app) as test_client:
+        yield test_client
 
 @pytest.fixture(scope='module')
-def single_person_fixture():
+def single_person_fixture(client):
     person_data = [
         {
             "id": 1,
@@ -20,7 +24,7 @@ def single_person_fixture():
     return response.json()
 
 @pytest.fixture(scope='module')
-def multiple_people_fixture():
+def multiple_people_fixture(client):
     person_data = [
         {
             "id": 1,
@@ -0,0 +1,55 @@
+"""
+Shared clients backed by in-memory MongoDB and Redis, and a screening engine recording its calls
+"""
+
+from typing import List
+import pytest
+from app.database import MongoDB
+from app.registry import ClientRegistry
+from app.schemas import Person, PersonScreeningResult
+from app.services.screening_service import ScreeningService
+from app.utils.redis_utils import RedisUtil
+
+fakeredis = pytest.importorskip('fakeredis')
+mongomock_motor = pytest.importorskip('mongomock_motor')
+
+
+def make_clients() -> ClientRegistry:
+    """
+    Return a registry whose MongoDB and Redis clients are in memory, to be created in the test's event loop
+    """
+    clients = ClientRegistry()
+
+    redis_util = RedisUtil.__new__(RedisUtil)
+    redis_util.redis = fakeredis.FakeAsyncRedis()
+    redis_util._take_tokens_script = None  # pylint: disable=protected-access
+    clients._redis_util = redis_util  # pylint: disable=protected-access
+
+    db_client = MongoDB.__new__(MongoDB)
+    db_client.client = mongomock_motor.AsyncMongoMockClient()
+    db_client.db = db_client.client['sdn_screener']
+    clients._db_client = db_client  # pylint: disable=protected-access
+    return clients
+
+
+def person(person_id: int, name: str, dob: str = '1950-01-01', country: str = 'Yemen') -> Person:
+    return Person(id=person_id, name=name, dob=dob, country=country)
+
+
+class RecordingEngine(ScreeningService):
+    """
+    Matches the names containing SANCTIONED, and records the names of every call
+    """
+    calls: List[List[str]] = []
+
+    async def _screen_people(self, people: List[Person]) -> List[PersonScreeningResult]:
+        self.calls.append([person.name for person in people])
+        return [
+            {
+                'id': person.id,
+                'name_match': 'SANCTIONED' in person.name,
+                'dob_match': False,
+                'country_match': True
+            }
+            for person in people
+        ]
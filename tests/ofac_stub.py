@@ -0,0 +1,99 @@
+"""
+Local stand-in for the OFAC API screening endpoint, with injectable latency and faults
+"""
+
+import asyncio
+import json
+from typing import List, Optional
+
+
+class OfacStubServer:
+    """
+    Answers screening requests with one result per case, a name match for
+    names containing SANCTIONED.
+
+    Each request consumes the next fault of the faults list, then falls back to
+    the default fault:
+        'ok': answer normally
+        'slow': answer after delay seconds
+        'status': answer with the status code
+        'error': answer with an error payload
+        'reset': close the connection without answering
+    """
+    def __init__(self, faults: Optional[List[str]] = None, default: str = 'ok', delay: float = 1.0,
+                 status: int = 503) -> None:
+        self.faults = list(faults or [])
+        self.default = default
+        self.delay = delay
+        self.status = status
+        self.requests = 0
+        self.cases = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        port = self.server.sockets[0].getsockname()[1]
+        return f'http://127.0.0.1:{port}/v4/screen'
+
+    async def __aenter__(self) -> 'OfacStubServer':
+        self.server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    @staticmethod
+    def _response(status: int, payload: dict) -> bytes:
+        body = json.dumps(payload).encode('utf-8')
+        head = (
+            f'HTTP/1.1 {status} Stub\r\n'
+            'Content-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            '\r\n'
+        )
+        return head.encode('utf-8') + body
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                content_length = 0
+                for line in head.decode('latin-1').split('\r\n'):
+                    if line.lower().startswith('content-length:'):
+                        content_length = int(line.split(':', 1)[1])
+                request = json.loads(await reader.readexactly(content_length))
+
+                self.requests += 1
+                self.cases += len(request.get('cases') or [])
+                fault = self.faults.pop(0) if self.faults else self.default
+                if fault == 'reset':
+                    break
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                if fault == 'slow':
+                    await asyncio.sleep(self.delay)
+                self.in_flight -= 1
+
+                if fault == 'status':
+                    response = self._response(self.status, {'error': True, 'errorMessage': 'unavailable'})
+                elif fault == 'error':
+                    response = self._response(200, {'error': True, 'errorMessage': 'Invalid API key'})
+                else:
+                    response = self._response(200, {'error': False, 'results': [
+                        {
+                            'id': str(case['id']),
+                            'matches': [
+                                {'matchSummary': {'matchFields': [{'fieldName': 'Name'}]}, 'sanction': {}}
+                            ] if 'SANCTIONED' in case['name'] else []
+                        }
+                        for case in request['cases']
+                    ]})
+                writer.write(response)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+from app.utils.admission import AdmissionController, AdmissionRejectedError
+
+
+def test_bulk_calls_leave_the_reserved_slots_to_priority_calls():
+    async def run():
+        controller = AdmissionController(concurrency=2, priority_reserved=1, priority_max_people=1,
+                                         bulk_max_wait=1.0)
+        await controller.acquire(100)
+        bulk = asyncio.ensure_future(controller.acquire(100))
+        await asyncio.sleep(0.01)
+        assert not bulk.done()
+
+        # the reserved slot is free for a small call, queued bulk calls wait for the bulk one
+        await controller.acquire(1)
+        assert controller.in_use == 2
+
+        priority = asyncio.ensure_future(controller.acquire(1))
+        await asyncio.sleep(0.01)
+        controller.release(0.1)
+        await asyncio.sleep(0.01)
+        # the waiting priority call goes first, the bulk one is over the bulk capacity
+        assert priority.done() and not bulk.done()
+
+        controller.release(0.1)
+        controller.release(0.1)
+        await asyncio.sleep(0.01)
+        assert bulk.done()
+        assert controller.admitted == {'priority': 2, 'bulk': 2}
+
+    asyncio.run(run())
+
+
+def test_calls_expected_to_wait_too_long_are_rejected_early():
+    async def run():
+        controller = AdmissionController(concurrency=1, priority_reserved=0, priority_max_wait=0.5)
+        await controller.acquire(1)
+        controller.release(1.0)
+        await controller.acquire(1)
+
+        # a slot frees up in about a second, longer than the lane allows
+        with pytest.raises(AdmissionRejectedError) as err:
+            await controller.acquire(1)
+        assert err.value.retry_after == 1
+        assert not controller.waiters['priority']
+
+        # callers that can wait get the slot when it is released
+        waiter = asyncio.ensure_future(controller.acquire(1, wait=True))
+        await asyncio.sleep(0.01)
+        controller.release(1.0)
+        await waiter
+        assert controller.rejected['priority'] == 1
+
+    asyncio.run(run())
+
+
+def test_calls_still_waiting_past_the_max_wait_time_out():
+    async def run():
+        controller = AdmissionController(concurrency=1, priority_reserved=0, priority_max_wait=0.01)
+        await controller.acquire(1)
+        with pytest.raises(AdmissionRejectedError):
+            await controller.acquire(1)
+
+        controller.release()
+        assert controller.in_use == 0
+        assert not controller.waiters['priority']
+
+    asyncio.run(run())
@@ -0,0 +1,75 @@
+from app.sanctions.blocking import BlockingIndex, get_blocking_keys
+from app.sanctions.sdn_index import SdnIndex
+from app.sanctions.sdn_list import SanctionEntry
+from app.utils.text_utils import phonetic_code
+
+
+ENTRIES = [
+    SanctionEntry(
+        uid='306',
+        names=('Abu ABBAS', 'Muhammad ZAYDAN'),
+        dobs=frozenset(['1948-12-10']),
+        birth_years=frozenset([1948]),
+        countries=frozenset(['YE'])
+    ),
+    SanctionEntry(
+        uid='173',
+        names=('Ubaidullah Akhund Sher MOHAMMED',),
+        dobs=frozenset(),
+        birth_years=frozenset([1950]),
+        countries=frozenset(['AF'])
+    ),
+    SanctionEntry(
+        uid='500',
+        names=('Muhammad HADDAD',),
+        dobs=frozenset(),
+        birth_years=frozenset(),
+        countries=frozenset()
+    )
+]
+
+
+def test_phonetic_code():
+    assert phonetic_code('mohammed') == phonetic_code('muhammad') == phonetic_code('mohamad')
+    assert phonetic_code('chernov') == phonetic_code('tschernow')
+    assert phonetic_code('yusuf') == phonetic_code('youssef')
+    assert phonetic_code('zaydan') != phonetic_code('haddad')
+
+    # token order does not change the sorted key
+    assert get_blocking_keys('Zaidan Mohamed')[1][0] == get_blocking_keys('Muhammad Zaydan')[1][0]
+
+
+def test_candidates():
+    index = BlockingIndex(ENTRIES)
+
+    def get_candidates(name):
+        return {index.owners[name_id] for name_id in index.get_candidate_names(name)}
+
+    # sharing the common "Muhammad" token is not enough
+    assert get_candidates('Mohamed Zaidan') == {0}
+    assert get_candidates('Ubaydullah Achund Scher Mohamad') == {1}
+    assert get_candidates('Zaidan Mohamed') == {0}
+
+
+def test_match_names_blocked():
+    index = SdnIndex(ENTRIES)
+    names = ['Mohamed Zaidan', 'ABBAS, Abu', 'Ubaidullah Akhund Sher Mohamed', 'Jane Doe']
+
+    assert index.match_names_blocked(names) == [set(), {0}, {1}, set()]
+    assert index.match_names(names) == [set(), {0}, {1}, set()]
+
+
+def test_names_sounding_alike_are_still_scored():
+    index = SdnIndex([
+        SanctionEntry('1', ('Mark SMITH',), frozenset(), frozenset(), frozenset()),
+        SanctionEntry('2', ('Ali HASSAN',), frozenset(), frozenset(), frozenset())
+    ])
+    names = ['Mirko Smoot', 'Ella Hosni', 'Mark Smith']
+
+    # both share a phonetic key with a list name, which only makes it a candidate
+    candidates = [
+        {index.blocking.owners[name_id] for name_id in index.blocking.get_candidate_names(name)}
+        for name in names
+    ]
+    assert candidates == [{0}, {1}, {0}]
+    assert index.match_names_blocked(names) == [set(), set(), {0}]
@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import json
+import pytest
+from app.commands.warm_cache import warm_cache
+from app.config import get_settings
+from app.services import engines
+from app.utils.list_version import ListVersion
+from tests.fakes import RecordingEngine, make_clients, person
+
+
+@pytest.fixture(autouse=True)
+def recording_engine(monkeypatch):
+    monkeypatch.setitem(engines.SCREENING_ENGINES, get_settings().screening_engine, RecordingEngine)
+    monkeypatch.setattr(RecordingEngine, 'calls', [])
+
+
+async def screen(clients, people):
+    return await RecordingEngine(people, clients).get_screening_results()
+
+
+def test_list_version_bump_reaches_other_processes_after_refresh():
+    async def run():
+        clients = make_clients()
+        bumping = ListVersion(clients.redis_util, refresh_interval=60)
+        cached = ListVersion(clients.redis_util, refresh_interval=60)
+        refreshing = ListVersion(clients.redis_util, refresh_interval=0)
+        versions = [await bumping.get(), await cached.get(), await refreshing.get()]
+
+        bumped = await bumping.bump()
+        versions += [await bumping.get(), await cached.get(), await refreshing.get()]
+        await clients.close()
+        return bumped, versions
+
+    bumped, versions = asyncio.run(run())
+    assert bumped == 1
+    # a process keeps the version it read until its refresh interval is over
+    assert versions == [0, 0, 0, 1, 0, 1]
+
+
+def test_list_version_bump_invalidates_cached_results():
+    async def run():
+        clients = make_clients()
+        people = [person(1, 'Jane Doe')]
+        await screen(clients, people)
+        await screen(clients, people)
+        calls_before_bump = len(RecordingEngine.calls)
+
+        await clients.list_version.bump()
+        await screen(clients, people)
+        await clients.close()
+        return calls_before_bump
+
+    calls_before_bump = asyncio.run(run())
+    assert calls_before_bump == 1
+    assert RecordingEngine.calls == [['Jane Doe'], ['Jane Doe']]
+
+
+def test_warm_up_screens_the_most_requested_people_first(capsys):
+    async def run():
+        clients = make_clients()
+        collection = clients.db_client.get_collection(RecordingEngine.PERSON_COLLECTION)
+        request_counts = {'Jane Doe': 3, 'John Roe': 5, 'Max Moe': 1, 'Ann Poe': 0}
+        for name, request_count in request_counts.items():
+            stored_person = person(0, name)
+            await collection.insert_one({
+                'identity': stored_person.identity,
+                'name': name,
+                'dob': stored_person.dob,
+                'country': stored_person.country,
+                'request_count': request_count
+            })
+        await clients.list_version.bump()
+
+        args = argparse.Namespace(limit=3, batch_size=2, interval=0)
+        await warm_cache(clients, args)
+        warm_calls = list(RecordingEngine.calls)
+
+        # the warmed results are cached under the current version
+        await screen(clients, [person(1, 'John Roe'), person(2, 'Max Moe')])
+        await clients.request_counter.flush()
+        counts = {
+            document['name']: document['request_count']
+            async for document in collection.find({}, {'name': 1, 'request_count': 1})
+        }
+        await clients.close()
+        return warm_calls, counts
+
+    warm_calls, counts = asyncio.run(run())
+    assert warm_calls == [['John Roe', 'Jane Doe'], ['Max Moe']]
+    assert RecordingEngine.calls == warm_calls
+    assert json.loads(capsys.readouterr().out)['screened'] == 3
+    # the warm-up is not counted as requests, the screening after it is
+    assert counts == {'Jane Doe': 3, 'John Roe': 6, 'Max Moe': 2, 'Ann Poe': 0}
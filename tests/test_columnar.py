@@ -0,0 +1,59 @@
+import pytest
+from app.schemas import Person
+from app.utils.columnar import (
+    ColumnarFormatError,
+    read_arrow_people,
+    read_csv_people,
+    write_arrow_results,
+    write_csv_results
+)
+
+
+CSV_PEOPLE = (
+    b'id,name,dob,country,note\n'
+    b'1,Abu Abbas,1948-12-10,Yemen,\n'
+    b'2,"Doe, John",1950-01-01,US,quoted name\n'
+)
+
+
+def test_csv_rows_match_validated_people():
+    rows = read_csv_people(CSV_PEOPLE)
+    person = Person(id=2, name='Doe, John', dob='1950-01-01', country='US')
+
+    assert [row.id for row in rows] == [1, 2]
+    assert (rows[1].name, rows[1].dob, rows[1].country) == (person.name, person.dob, person.country)
+    assert rows[1].identity == person.identity
+
+
+def test_invalid_csv_rows_are_reported():
+    with pytest.raises(ColumnarFormatError) as err:
+        read_csv_people(b'id,name,dob,country\n1,A,1948-12-10,YE\n2,B,1948,YE\n3,C,,YE\n')
+    assert [error['row'] for error in err.value.errors] == [1, 2]
+
+    with pytest.raises(ColumnarFormatError) as err:
+        read_csv_people(b'id,name,country\n1,A,YE\n')
+    assert 'dob' in err.value.message
+
+
+def test_results_are_written_in_the_request_format():
+    results = [{'id': 1, 'name_match': True, 'dob_match': False, 'country_match': True}]
+    assert write_csv_results(results) == b'id,name_match,dob_match,country_match\n1,true,false,true\n'
+
+    pa = pytest.importorskip('pyarrow')
+    assert pa.ipc.open_stream(write_arrow_results(results)).read_all().to_pylist() == results
+
+
+def test_arrow_dates_are_read_as_datetimes():
+    pa = pytest.importorskip('pyarrow')
+    table = pa.table({
+        'id': [1],
+        'name': ['Abu Abbas'],
+        'dob': pa.array([10205], type=pa.date32()),
+        'country': ['Yemen']
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    rows = read_arrow_people(sink.getvalue().to_pybytes())
+    assert rows[0].dob.isoformat() == '1997-12-10T00:00:00'
@@ -0,0 +1,123 @@
+import asyncio
+from datetime import datetime, timezone
+from app.config import get_settings
+from app.services import engines
+from app.services.key_migration_service import KeyMigrationService
+from app.services.screening_service import ScreeningService
+from tests.fakes import RecordingEngine, make_clients, person
+
+
+def test_person_collection_indexes():
+    async def run():
+        clients = make_clients()
+        await ScreeningService.create_indexes(clients.db_client)
+        collection = clients.db_client.get_collection(ScreeningService.PERSON_COLLECTION)
+        indexes = await collection.index_information()
+        await clients.close()
+        return indexes
+
+    indexes = asyncio.run(run())
+    assert indexes['identity_1']['key'] == [('identity', 1)]
+    assert indexes['identity_1']['unique']
+    assert indexes['request_count_-1']['key'] == [('request_count', -1)]
+
+
+def test_bulk_upsert_is_written_in_batches():
+    async def run():
+        clients = make_clients()
+        db_client = clients.db_client
+        operations = [
+            {'filter_query': {'identity': str(i)}, 'update_values': {'identity': str(i), 'name_match': False}}
+            for i in range(5)
+        ]
+        first_results = await db_client.bulk_upsert_documents('person', operations, batch_size=2)
+
+        # counting a request neither overwrites the flags nor refreshes updated_at
+        stored = await db_client.find_document('person', {'identity': '0'})
+        await db_client.bulk_upsert_documents('person', [
+            {'filter_query': {'identity': '0'}, 'increment_values': {'request_count': 2}},
+            {'filter_query': {'identity': '5'}, 'insert_values': {'name': 'Jane Doe'},
+             'increment_values': {'request_count': 1}}
+        ])
+        documents = {
+            document['identity']: document
+            for document in await db_client.find_documents('person', {})
+        }
+        await clients.close()
+        return first_results, stored, documents
+
+    first_results, stored, documents = asyncio.run(run())
+    assert [result.upserted_count for result in first_results] == [2, 2, 1]
+    assert len(documents) == 6
+    assert documents['0']['request_count'] == 2
+    assert documents['0']['name_match'] is False
+    assert documents['0']['updated_at'] == stored['updated_at']
+    assert documents['5']['name'] == 'Jane Doe'
+    assert 'updated_at' not in documents['5']
+    assert 'created_at' in documents['5']
+
+
+def test_people_stored_before_identities_do_not_block_upserts(monkeypatch):
+    monkeypatch.setitem(engines.SCREENING_ENGINES, get_settings().screening_engine, RecordingEngine)
+    monkeypatch.setattr(RecordingEngine, 'calls', [])
+
+    async def run():
+        clients = make_clients()
+        collection = clients.db_client.get_collection(ScreeningService.PERSON_COLLECTION)
+        legacy_person = person(1, 'Jane Doe')
+        await collection.create_index([('name', 1), ('dob', 1), ('country', 1)], unique=True)
+        await collection.insert_one({
+            'name': legacy_person.name,
+            'dob': legacy_person.dob,
+            'country': legacy_person.country,
+            'name_match': False
+        })
+
+        await ScreeningService.create_indexes(clients.db_client)
+        indexes = await collection.index_information()
+        # both the stored results and the request count are upserted on the identity
+        await RecordingEngine([legacy_person], clients).get_screening_results()
+        await clients.request_counter.flush()
+        documents = await clients.db_client.find_documents(ScreeningService.PERSON_COLLECTION, {})
+        await clients.close()
+        return indexes, documents
+
+    indexes, documents = asyncio.run(run())
+    assert ScreeningService.LEGACY_INDEX not in indexes
+    assert RecordingEngine.calls == [['Jane Doe']]
+    # the key migration merges the legacy document into the new one
+    assert len(documents) == 2
+    stored = next(document for document in documents if 'identity' in document)
+    assert stored['request_count'] == 1
+    assert stored['name_match'] is False
+
+
+def test_migrated_people_are_served_from_the_person_collection(monkeypatch):
+    monkeypatch.setattr(RecordingEngine, 'calls', [])
+
+    async def run():
+        clients = make_clients()
+        collection = clients.db_client.get_collection(ScreeningService.PERSON_COLLECTION)
+        legacy_person = person(1, 'SANCTIONED One')
+        await collection.insert_one({
+            'name': legacy_person.name,
+            'dob': legacy_person.dob,
+            'country': legacy_person.country,
+            'name_match': True,
+            'dob_match': False,
+            'country_match': True,
+            'updated_at': datetime.now(timezone.utc)
+        })
+        await clients.list_version.bump()
+
+        stats = await KeyMigrationService(clients).migrate()
+        screening_service = RecordingEngine([legacy_person], clients)
+        screening_service.db_cache_max_age = 3600
+        results = await screening_service.get_screening_results()
+        await clients.close()
+        return stats, results
+
+    stats, results = asyncio.run(run())
+    assert stats['updated'] == 1
+    assert RecordingEngine.calls == []
+    assert results == [{'id': 1, 'name_match': True, 'dob_match': False, 'country_match': True}]
@@ -0,0 +1,17 @@
+from datetime import datetime
+from app.utils.identity_utils import get_identity, get_identity_key
+
+
+def test_equivalent_people_share_an_identity_key():
+    key = get_identity_key('Abu Abbas', datetime(1948, 12, 10), 'Yemen')
+
+    assert get_identity_key('ABU  abbás', '1948-12-10', 'YE') == key
+    assert get_identity_key(' abu abbas ', datetime(1948, 12, 10, 0, 0), ' yemen') == key
+    assert get_identity_key('Abu Abbas', datetime(1948, 12, 11), 'Yemen') != key
+    assert len(key) == 32
+
+
+def test_identity_is_canonical():
+    assert get_identity('Abú  ABBAS,', datetime(1948, 12, 10), 'yemen') == (
+        'abu abbas', '1948-12-10', 'YE'
+    )
@@ -0,0 +1,34 @@
+import asyncio
+import httpx
+import pytest
+from fastapi import FastAPI
+from app.config import get_settings
+from app.registry import get_registry
+from app.routes import metrics, screener
+from tests.fakes import make_clients
+
+
+@pytest.mark.parametrize('path', ['/metrics', '/api/v1/screen/cache-stats', '/api/v1/screen/admission-stats'])
+def test_internal_routes_require_the_internal_token(monkeypatch, path):
+    async def run():
+        clients = make_clients()
+        app = FastAPI()
+        app.include_router(screener.router, prefix='/api/v1')
+        app.include_router(metrics.router)
+        app.dependency_overrides[get_registry] = lambda: clients
+
+        transport = httpx.ASGITransport(app=app)
+        statuses = []
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            monkeypatch.setattr(get_settings(), 'internal_token', '')
+            statuses.append((await client.get(path, headers={'Authorization': 'Bearer '})).status_code)
+
+            monkeypatch.setattr(get_settings(), 'internal_token', 'secret')
+            for headers in ({}, {'Authorization': 'Bearer wrong'}, {'Authorization': 'Basic secret'}):
+                statuses.append((await client.get(path, headers=headers)).status_code)
+            statuses.append((await client.get(path, headers={'Authorization': 'Bearer secret'})).status_code)
+        await clients.close()
+        return statuses
+
+    # hidden without a token, then only answered with it
+    assert asyncio.run(run()) == [404, 401, 401, 401, 200]
@@ -0,0 +1,143 @@
+import asyncio
+import pytest
+from app.config import get_settings
+from app.services import engines
+from app.services.job_service import ScreeningJobService, ScreeningJobWorkers
+from app.utils.job_queue import InMemoryJobQueue, RedisStreamJobQueue
+from app.utils.rate_limiter import RateLimiter
+from tests.fakes import RecordingEngine, make_clients, person
+
+
+@pytest.fixture(autouse=True)
+def recording_engine(monkeypatch):
+    monkeypatch.setitem(engines.SCREENING_ENGINES, get_settings().screening_engine, RecordingEngine)
+    monkeypatch.setattr(RecordingEngine, 'calls', [])
+
+
+async def wait_for_job(job_service, job_id, status='completed'):
+    for _ in range(200):
+        job_status = await job_service.get_job(job_id)
+        if job_status.status == status:
+            return job_status
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} is still {job_status.status}")
+
+
+def test_job_is_screened_in_chunks():
+    async def run():
+        clients = make_clients()
+        job_service = ScreeningJobService(clients, InMemoryJobQueue(), chunk_size=2)
+        workers = ScreeningJobWorkers(job_service, worker_count=2)
+        await workers.start()
+
+        names = ['Jane Doe', 'SANCTIONED One', 'John Roe', 'SANCTIONED Two', 'Max Moe']
+        job = await job_service.create_job([person(i, name) for i, name in enumerate(names)])
+        assert job.total == 5
+        assert job.chunk_count == 3
+
+        job_status = await wait_for_job(job_service, job.job_id)
+        pages = [await job_service.get_job(job.job_id, page) for page in range(job.chunk_count)]
+        await workers.stop()
+        await clients.close()
+        return job_status, pages
+
+    job_status, pages = asyncio.run(run())
+    assert job_status.processed == 5
+    assert job_status.completed_chunks == 3
+    assert all(len(call) <= 2 for call in RecordingEngine.calls)
+
+    # one chunk of results per page, in the order of the people
+    assert [page.next_page for page in pages] == [1, 2, None]
+    results = [result for page in pages for result in page.results]
+    assert [result.id for result in results] == [0, 1, 2, 3, 4]
+    assert [result.name_match for result in results] == [False, True, False, True, False]
+
+
+def test_pending_chunks_are_resumed_after_a_crash():
+    async def run():
+        clients = make_clients()
+        job_service = ScreeningJobService(clients, InMemoryJobQueue(), chunk_size=2)
+        job = await job_service.create_job([person(i, f'Person {i}') for i in range(4)])
+        # a first worker screened one chunk, then the process died with the queued messages
+        await job_service.process_chunk(job.job_id, 0)
+        first_calls = list(RecordingEngine.calls)
+
+        restarted_service = ScreeningJobService(clients, InMemoryJobQueue(), chunk_size=2)
+        workers = ScreeningJobWorkers(restarted_service, worker_count=1)
+        await workers.start()
+        job_status = await wait_for_job(restarted_service, job.job_id)
+        await workers.stop()
+
+        # a redelivered chunk is not screened again
+        await restarted_service.process_chunk(job.job_id, 1)
+        await clients.close()
+        return first_calls, job_status
+
+    first_calls, job_status = asyncio.run(run())
+    assert first_calls == [['Person 0', 'Person 1']]
+    assert RecordingEngine.calls == [['Person 0', 'Person 1'], ['Person 2', 'Person 3']]
+    assert job_status.completed_chunks == 2
+
+
+def test_workers_charge_the_client_for_the_people_screened():
+    async def run():
+        clients = make_clients()
+        clients._rate_limiter = RateLimiter(None, rate=1, capacity=100)  # pylint: disable=protected-access
+        job_service = ScreeningJobService(clients, InMemoryJobQueue(), chunk_size=2)
+        job = await job_service.create_job([person(i, f'Person {i}') for i in range(3)], client_id='a')
+        anonymous_job = await job_service.create_job([person(3, 'Person 3')])
+        await job_service.process_chunk(job.job_id, 0)
+        await job_service.process_chunk(job.job_id, 1)
+        await job_service.process_chunk(anonymous_job.job_id, 0)
+        buckets = dict(clients.rate_limiter._buckets)  # pylint: disable=protected-access
+        await clients.close()
+        return buckets
+
+    buckets = asyncio.run(run())
+    settings = get_settings()
+    assert list(buckets) == ['a']
+    assert buckets['a'].pending == pytest.approx(3 * (settings.rate_limit_miss_cost - settings.rate_limit_hit_cost))
+
+
+def test_failing_chunk_is_retried_then_failed(monkeypatch):
+    async def fail(self, people):
+        raise RuntimeError('engine down')
+
+    monkeypatch.setattr(RecordingEngine, '_screen_people', fail)
+
+    async def run():
+        clients = make_clients()
+        job_service = ScreeningJobService(clients, InMemoryJobQueue(), chunk_size=10)
+        workers = ScreeningJobWorkers(job_service, worker_count=1)
+        await workers.start()
+        job = await job_service.create_job([person(1, 'Jane Doe')])
+        job_status = await wait_for_job(job_service, job.job_id, status='failed')
+        await workers.stop()
+        await clients.close()
+        return job_status
+
+    job_status = asyncio.run(run())
+    assert job_status.failed_chunks == 1
+    assert job_status.results is None
+
+
+def test_redis_stream_queue_redelivers_unacknowledged_messages():
+    async def run():
+        clients = make_clients()
+        crashed = RedisStreamJobQueue(clients.redis_util, claim_idle=0)
+        await crashed.start()
+        await crashed.put({'job_id': 'a', 'index': '0'})
+        message_id, fields = await crashed.get(timeout=0.1)
+
+        # another worker claims the message its consumer never acknowledged
+        queue = RedisStreamJobQueue(clients.redis_util, claim_idle=0)
+        claimed = await queue.get(timeout=0.1)
+        await queue.ack(claimed[0])
+        remaining = await queue.get(timeout=0.1)
+        await clients.close()
+        return message_id, fields, claimed, remaining
+
+    message_id, fields, claimed, remaining = asyncio.run(run())
+    assert fields == {'job_id': 'a', 'index': '0'}
+    assert claimed == (message_id, fields)
+    assert remaining is None
@@ -0,0 +1,85 @@
+import asyncio
+from app.config import get_settings
+from app.sanctions.list_diff import DeltaIndex, diff_sanctions_lists
+from app.sanctions.sdn_list import SanctionEntry
+from app.services import engines, rescreening_service
+from app.services.rescreening_service import DeltaRescreeningService
+from tests.fakes import RecordingEngine, make_clients, person
+
+
+def entry(uid, *names, countries=()):
+    return SanctionEntry(uid, tuple(names), frozenset(), frozenset(), frozenset(countries))
+
+
+PREVIOUS = [entry('1', 'Abu ABBAS'), entry('2', 'Ali HASSAN'), entry('3', 'Omar FAROUK'), entry('5', 'Muhammad ZAYDAN')]
+CURRENT = [
+    entry('1', 'Abu ABBAS'),
+    entry('2', 'Ali HASSAN', countries=('YE',)),
+    entry('4', 'Ivan Aleksandrovich PETROV'),
+    entry('5', 'Muhammad ZAYDAN')
+]
+
+
+def test_diff_returns_added_changed_and_removed_entries():
+    delta = diff_sanctions_lists(PREVIOUS, CURRENT)
+
+    assert sorted(delta_entry.uid for delta_entry in delta) == ['2', '2', '3', '4']
+
+
+def test_delta_index_only_matches_changed_entries():
+    delta_index = DeltaIndex(PREVIOUS, CURRENT, min_score=0.8)
+    names = ['Ivan Aleksandrovitch Petrov', 'FAROUK, Omar', 'Abu Abbas', 'Petrov Sergei']
+
+    matched_uids = [
+        {delta_index.index.entries[position].uid for position in matches}
+        for matches in delta_index.match_names(names)
+    ]
+
+    # a spelling variant and a removed entry hit, an unchanged entry or a shared token alone does not
+    assert matched_uids == [{'4'}, {'3'}, set(), set()]
+
+
+def test_rescreen_skips_unaffected_and_never_screened_people(monkeypatch):
+    monkeypatch.setitem(engines.SCREENING_ENGINES, get_settings().screening_engine, RecordingEngine)
+    monkeypatch.setattr(RecordingEngine, 'calls', [])
+    monkeypatch.setattr(get_settings(), 'local_min_score', 0.8)
+    monkeypatch.setattr(
+        rescreening_service,
+        'load_sanctions_list',
+        lambda path: {'previous': PREVIOUS, 'current': CURRENT}[path]
+    )
+
+    async def run():
+        clients = make_clients()
+        collection = clients.db_client.get_collection(RecordingEngine.PERSON_COLLECTION)
+        flags = {'name_match': False, 'dob_match': False, 'country_match': True}
+        for name, stored_flags in [
+            ('Ivan Aleksandrovitch Petrov', flags),
+            ('Jane Doe', flags),
+            ('Omar Farouk', {**flags, 'name_match': True}),
+            # only counted as requested, never screened
+            ('Ali Hassan', {})
+        ]:
+            stored_person = person(0, name)
+            await collection.insert_one({
+                'identity': stored_person.identity,
+                'name': name,
+                'dob': stored_person.dob,
+                'country': stored_person.country,
+                'request_count': 1,
+                **stored_flags
+            })
+
+        stats = await DeltaRescreeningService(clients, batch_size=2).rescreen('previous', 'current')
+        await clients.close()
+        return stats
+
+    stats = asyncio.run(run())
+    assert sorted(name for call in RecordingEngine.calls for name in call) == [
+        'Ivan Aleksandrovitch Petrov', 'Omar Farouk'
+    ]
+    assert stats['delta_entries'] == 3
+    assert stats['scanned'] == 3
+    assert stats['rescreened'] == 2
+    # only the delisted person's flags changed
+    assert stats['changed'] == 1
@@ -0,0 +1,46 @@
+import time
+from app.utils.local_cache import LocalCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LocalCache(max_size=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get_many(['a', 'c']) == [1, 3]
+
+    stats = cache.stats()
+    assert stats['size'] == 2
+    assert stats['hits'] == 3
+    assert stats['misses'] == 1
+    assert stats['evictions'] == 1
+
+
+def test_entries_expire():
+    cache = LocalCache(max_size=2, ttl=0.01)
+    cache.set('a', 1)
+    time.sleep(0.02)
+
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+    assert not cache
+
+
+def test_disabled_cache():
+    cache = LocalCache(max_size=0, ttl=60)
+    cache.set('a', 1)
+    assert cache.get('a') is None
+
+
+def test_entry_lifetime_is_capped():
+    cache = LocalCache(max_size=2, ttl=60)
+    # copied from a tier where it is about to expire
+    cache.set_many({'a': 1}, ttl=0.01)
+    cache.set('b', 2, ttl=3600)
+    time.sleep(0.02)
+
+    assert cache.get('a') is None
+    assert cache.get('b') == 2
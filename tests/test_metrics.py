@@ -0,0 +1,55 @@
+import pytest
+from app.utils.metrics import MetricsRegistry, StageTimings
+
+
+def test_metrics_are_rendered_in_the_prometheus_format():
+    metrics = MetricsRegistry()
+    lookups = metrics.counter('lookups_total', 'Cache lookups', ['tier', 'result'])
+    lookups.labels('redis', 'hit').inc(3)
+    lookups.labels('redis', 'miss').inc()
+    metrics.gauge('entries', 'Cached entries').set(7)
+    metrics.gauge('waiting', 'Waiting calls', ['lane']).labels('bulk').set(2)
+
+    lines = metrics.render().splitlines()
+    assert lines[:2] == ['# HELP lookups_total Cache lookups', '# TYPE lookups_total counter']
+    assert 'lookups_total{tier="redis",result="hit"} 3.0' in lines
+    assert 'lookups_total{tier="redis",result="miss"} 1.0' in lines
+    assert '# TYPE entries gauge' in lines
+    assert 'entries 7' in lines
+    assert 'waiting{lane="bulk"} 2' in lines
+
+    with pytest.raises(ValueError):
+        metrics.counter('entries', 'Duplicate')
+    with pytest.raises(ValueError):
+        lookups.labels('redis')
+
+
+def test_histogram_buckets_are_cumulative():
+    metrics = MetricsRegistry()
+    histogram = metrics.histogram('cases', 'Cases per request', buckets=(1, 10, 100))
+    for value in (1, 5, 50, 500):
+        histogram.observe(value)
+
+    lines = metrics.render().splitlines()
+    assert 'cases_bucket{le="1"} 1' in lines
+    assert 'cases_bucket{le="10"} 2' in lines
+    assert 'cases_bucket{le="100"} 3' in lines
+    assert 'cases_bucket{le="+Inf"} 4' in lines
+    assert 'cases_sum 556.0' in lines
+    assert 'cases_count 4' in lines
+
+
+def test_stage_timings_add_up_and_are_observed():
+    metrics = MetricsRegistry()
+    histogram = metrics.histogram('stage_seconds', 'Stage durations', ['stage'])
+    timings = StageTimings(histogram)
+    timings.record('engine', 0.1)
+    timings.record('engine', 0.05)
+    with timings.stage('store'):
+        pass
+
+    durations = timings.as_dict()
+    assert durations['engine'] == 150.0
+    assert set(durations) == {'engine', 'store'}
+    assert timings.as_server_timing().startswith('engine;dur=150.0, store;dur=')
+    assert 'stage_seconds_count{stage="engine"} 2' in metrics.render().splitlines()
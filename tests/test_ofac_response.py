@@ -0,0 +1,62 @@
+import asyncio
+import json
+import pytest
+from app.services.ofac_response import OfacResponseError, OfacResponseProcessor
+
+
+RESPONSE = {
+    'error': False,
+    'results': [
+        {
+            'id': '1',
+            'matches': [
+                {
+                    'matchSummary': {'matchFields': [{'fieldName': 'Name'}]},
+                    'sanction': {'id': 'a', 'addresses': [{'country': 'Syria'}]}
+                },
+                {
+                    'matchSummary': {'matchFields': [{'fieldName': 'Name'}, {'fieldName': 'DOB'}]},
+                    'sanction': {'id': 'b', 'personDetails': {'nationalities': ['YEMEN']}}
+                }
+            ]
+        },
+        {
+            'id': '2',
+            'matches': [
+                {
+                    'matchSummary': {'matchFields': [{'fieldName': 'Name'}]},
+                    'sanction': {'id': 'a', 'addresses': [{'country': 'Syria'}]}
+                }
+            ]
+        }
+    ]
+}
+
+
+async def stream(body: bytes):
+    for i in range(0, len(body), 16):
+        yield body[i:i + 16]
+
+
+def test_process_response():
+    processor = OfacResponseProcessor({1: 'YE', 2: 'Afghanistan'})
+
+    assert processor.process_response(RESPONSE) == [
+        {'id': 1, 'name_match': True, 'dob_match': True, 'country_match': True},
+        {'id': 2, 'name_match': True, 'dob_match': False, 'country_match': False}
+    ]
+
+    with pytest.raises(OfacResponseError):
+        processor.process_response({'error': True, 'errorMessage': 'Invalid API key'})
+
+
+def test_process_stream():
+    pytest.importorskip('ijson')
+    processor = OfacResponseProcessor({1: 'Yemen', 2: 'Afghanistan'})
+
+    body = json.dumps(RESPONSE).encode('utf-8')
+    assert asyncio.run(processor.process_stream(stream(body))) == processor.process_response(RESPONSE)
+
+    body = json.dumps({'error': True, 'errorMessage': 'Invalid API key', 'results': []}).encode('utf-8')
+    with pytest.raises(OfacResponseError):
+        asyncio.run(processor.process_stream(stream(body)))
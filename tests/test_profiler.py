@@ -0,0 +1,38 @@
+import asyncio
+import inspect
+import time
+from app.utils.profiler import IDLE_ROOT, RequestProfiler
+
+
+def spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_samples_below_the_root_frame_are_written_by_request_id(tmp_path):
+    profiler = RequestProfiler(str(tmp_path), interval=0.001)
+
+    async def handle():
+        with profiler.profile('request/1', inspect.currentframe()) as path:
+            spin(0.05)
+            await asyncio.sleep(0.05)
+        return path
+
+    path = asyncio.run(handle())
+    assert path == str(tmp_path / 'request_1.collapsed')
+
+    stacks = dict(line.rsplit(' ', 1) for line in open(path, encoding='utf-8').read().splitlines())
+    assert any(stack.startswith('handle (') and ';spin (test_profiler.py:' in stack for stack in stacks)
+    assert IDLE_ROOT in stacks
+    assert profiler.profiled == 1 and profiler.active == 0
+
+
+def test_requests_over_the_limit_are_not_profiled(tmp_path):
+    profiler = RequestProfiler(str(tmp_path), max_active=0)
+    with profiler.profile('request', inspect.currentframe()) as path:
+        pass
+
+    assert path is None
+    assert profiler.skipped == 1
+    assert not list(tmp_path.iterdir())
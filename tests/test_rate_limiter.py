@@ -0,0 +1,104 @@
+import asyncio
+from starlette.requests import Request
+from app.config import get_settings
+from app.routes.rate_limit import get_client_id
+from app.services.rate_limit_service import RateLimitService
+from app.utils.rate_limiter import RateLimiter, RateLimitExceededError
+
+
+class BucketRedis:
+    """
+    Stands in for the token bucket script of RedisUtil, without refills
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.tokens = {}
+        self.calls = []
+
+    async def take_tokens(self, key, cost, debt, rate, capacity):
+        self.calls.append((cost, debt))
+        tokens = self.tokens.get(key, capacity) - debt
+        required = min(cost, capacity)
+        if tokens < required:
+            self.tokens[key] = tokens
+            return False, tokens, int((required - tokens) / rate) + 1
+        self.tokens[key] = tokens - cost
+        return True, tokens - cost, 0
+
+
+class FailingRedis:
+    async def take_tokens(self, *args):
+        raise ConnectionError('redis is down')
+
+
+def test_clients_well_under_the_limit_skip_redis():
+    async def run():
+        redis_util = BucketRedis(100)
+        rate_limiter = RateLimiter(redis_util, rate=0.001, capacity=100, local_margin=0.5, sync_interval=60)
+
+        assert (await rate_limiter.acquire('a', 10)).allowed
+        assert len(redis_util.calls) == 1
+
+        # 90 tokens left locally, admitted without Redis while 50 remain afterwards
+        for _ in range(4):
+            assert (await rate_limiter.acquire('a', 10)).allowed
+        assert len(redis_util.calls) == 1
+
+        # the locally admitted costs are charged with the next Redis call
+        assert (await rate_limiter.acquire('a', 10)).allowed
+        assert redis_util.calls[-1] == (10, 40)
+        assert redis_util.tokens['rate_limit:a'] == 40
+
+    asyncio.run(run())
+
+
+def test_exhausted_clients_get_a_retry_after():
+    async def run():
+        rate_limiter = RateLimiter(BucketRedis(10), rate=1, capacity=10, sync_interval=0)
+        service = RateLimitService(rate_limiter, 'a', request_cost=1, hit_cost=0.5, miss_cost=2)
+
+        # 1 + 2 * 0.5 on admission, then 4 * (2 - 0.5) once screened
+        await service.admit(2)
+        service.charge(0, 4)
+        await service.admit(2)
+
+        try:
+            await service.admit(2)
+        except RateLimitExceededError as err:
+            assert err.retry_after > 0
+        else:
+            raise AssertionError('the client should be limited')
+
+        # other clients have their own bucket
+        other = RateLimitService(rate_limiter, 'b', request_cost=1, hit_cost=0.5, miss_cost=2)
+        await other.admit(2)
+
+    asyncio.run(run())
+
+
+def test_requests_are_admitted_when_redis_fails():
+    async def run():
+        rate_limiter = RateLimiter(FailingRedis(), rate=1, capacity=10)
+        assert (await rate_limiter.acquire('a', 100)).allowed
+        assert rate_limiter.stats()['errors'] == 1
+
+    asyncio.run(run())
+
+
+def test_client_id_ignores_the_forwarded_addresses_set_by_the_client(monkeypatch):
+    def request(forwarded_for=None):
+        headers = [(b'x-forwarded-for', forwarded_for.encode())] if forwarded_for is not None else []
+        return Request({'type': 'http', 'headers': headers, 'client': ('10.0.0.2', 1234)})
+
+    monkeypatch.setattr(get_settings(), 'rate_limit_client_header', 'X-Forwarded-For')
+    monkeypatch.setattr(get_settings(), 'rate_limit_trusted_hops', 1)
+    # the proxy appends the address it was reached from to whatever the client sent
+    assert get_client_id(request('203.0.113.7')) == '203.0.113.7'
+    assert get_client_id(request('1.2.3.4, 203.0.113.7')) == '203.0.113.7'
+    assert get_client_id(request('5.6.7.8, 203.0.113.7')) == '203.0.113.7'
+    assert get_client_id(request()) == '10.0.0.2'
+
+    # behind two proxies, the client is second from the right
+    monkeypatch.setattr(get_settings(), 'rate_limit_trusted_hops', 2)
+    assert get_client_id(request('1.2.3.4, 203.0.113.7, 10.0.0.1')) == '203.0.113.7'
+    assert get_client_id(request('10.0.0.1')) == '10.0.0.2'
@@ -0,0 +1,173 @@
+import asyncio
+import time
+import httpx
+import pytest
+from app.config import get_settings
+from app.registry import ClientRegistry
+from app.schemas import Person
+from app.services.engines import SCREENING_ENGINES
+from app.services.ofac_screening_service import OfacScreeningService
+from app.services.screening_service import ScreeningService
+from app.utils.resilience import CircuitBreaker, CircuitOpenError, ResilientCaller
+from tests.ofac_stub import OfacStubServer
+
+
+PEOPLE = [
+    Person(id=1, name='SANCTIONED Person', dob='1950-01-01', country='Yemen'),
+    Person(id=2, name='Jane Doe', dob='1990-01-01', country='Canada')
+]
+
+
+class FallbackScreeningService(ScreeningService):
+    async def _screen_people(self, people):
+        return [
+            {'id': person.id, 'name_match': True, 'dob_match': True, 'country_match': True}
+            for person in people
+        ]
+
+
+@pytest.fixture
+def ofac_settings(monkeypatch):
+    settings = get_settings()
+    # the database clients are created but never connected to
+    monkeypatch.setattr(settings, 'mongo_user', 'user')
+    monkeypatch.setattr(settings, 'mongo_password', 'password')
+    monkeypatch.setattr(settings, 'ofac_api_url', '')
+    monkeypatch.setattr(settings, 'ofac_api_chunk_size', 100)
+    monkeypatch.setattr(settings, 'ofac_api_stream_parse', False)
+    monkeypatch.setattr(settings, 'ofac_api_fallback_engine', '')
+    return settings
+
+
+async def screen(stub, caller, people=None):
+    people = PEOPLE if people is None else people
+    get_settings().ofac_api_url = stub.url
+    clients = ClientRegistry()
+    clients._ofac_caller = caller  # pylint: disable=protected-access
+    try:
+        service = OfacScreeningService(people, clients)
+        return await service._screen_people(people), service  # pylint: disable=protected-access
+    finally:
+        await clients.close()
+
+
+@pytest.mark.usefixtures('ofac_settings')
+def test_transient_failures_are_retried():
+    async def run():
+        async with OfacStubServer(faults=['status', 'reset']) as stub:
+            caller = ResilientCaller(backoff_base=0.01)
+            results, _ = await screen(stub, caller)
+            return results, stub.requests, caller.stats()
+
+    results, requests, stats = asyncio.run(run())
+    assert [result['name_match'] for result in results] == [True, False]
+    assert requests == 3
+    assert stats['retries'] == 2
+
+
+@pytest.mark.usefixtures('ofac_settings')
+def test_error_payloads_are_not_retried():
+    async def run():
+        async with OfacStubServer(default='error') as stub:
+            with pytest.raises(OfacScreeningService.OfacScreeningServiceError):
+                await screen(stub, ResilientCaller(backoff_base=0.01))
+            return stub.requests
+
+    assert asyncio.run(run()) == 1
+
+
+@pytest.mark.usefixtures('ofac_settings')
+def test_open_circuit_fails_fast_then_recovers():
+    async def run():
+        async with OfacStubServer(default='status') as stub:
+            caller = ResilientCaller(
+                max_retries=0,
+                circuit_breaker=CircuitBreaker(min_calls=3, open_duration=0.2)
+            )
+            for _ in range(3):
+                with pytest.raises(httpx.HTTPStatusError):
+                    await screen(stub, caller)
+
+            # no request reaches the upstream while the circuit is open
+            with pytest.raises(CircuitOpenError):
+                await screen(stub, caller)
+            assert stub.requests == 3
+
+            # a successful probe closes the circuit
+            stub.default = 'ok'
+            await asyncio.sleep(0.25)
+            await screen(stub, caller)
+            return caller.circuit_breaker.state
+
+    assert asyncio.run(run()) == CircuitBreaker.CLOSED
+
+
+def test_open_circuit_falls_back_to_secondary_engine(ofac_settings, monkeypatch):
+    monkeypatch.setitem(SCREENING_ENGINES, 'fallback', FallbackScreeningService)
+    ofac_settings.ofac_api_fallback_engine = 'fallback'
+
+    async def run():
+        async with OfacStubServer() as stub:
+            caller = ResilientCaller(circuit_breaker=CircuitBreaker(open_duration=60))
+            caller.circuit_breaker._open(time.monotonic())  # pylint: disable=protected-access
+            results, service = await screen(stub, caller)
+            return results, service.degraded, stub.requests
+
+    results, degraded, requests = asyncio.run(run())
+    assert all(result['country_match'] for result in results)
+    assert degraded
+    assert requests == 0
+
+
+@pytest.mark.usefixtures('ofac_settings')
+def test_timeout_adapts_to_observed_latencies():
+    async def run():
+        async with OfacStubServer(delay=2.0) as stub:
+            caller = ResilientCaller(max_timeout=10, min_timeout=0.2, max_retries=0)
+            for _ in range(20):
+                await screen(stub, caller)
+            assert caller.get_timeout() < 1
+
+            # a slow upstream now times out long before the 10 second ceiling
+            stub.faults = ['slow']
+            start_time = time.monotonic()
+            with pytest.raises(httpx.TimeoutException):
+                await screen(stub, caller)
+            return time.monotonic() - start_time
+
+    assert asyncio.run(run()) < 1.5
+
+
+@pytest.mark.usefixtures('ofac_settings')
+def test_slow_calls_are_hedged():
+    async def run():
+        async with OfacStubServer(delay=2.0) as stub:
+            caller = ResilientCaller(min_timeout=5, hedge_percentile=0.5)
+            for _ in range(20):
+                await screen(stub, caller)
+
+            stub.faults = ['slow']
+            start_time = time.monotonic()
+            results, _ = await screen(stub, caller)
+            return results, time.monotonic() - start_time, caller.stats()
+
+    results, elapsed, stats = asyncio.run(run())
+    assert len(results) == 2
+    assert elapsed < 1.5
+    assert stats['hedges'] == 1
+
+
+def test_concurrent_chunks_stay_within_the_limit(ofac_settings):
+    ofac_settings.ofac_api_chunk_size = 2
+    ofac_settings.ofac_api_max_concurrency = 3
+    people = [Person(id=i, name=f'Person {i}', dob='1990-01-01', country='Canada') for i in range(20)]
+
+    async def run():
+        async with OfacStubServer(default='slow', delay=0.05) as stub:
+            results, _ = await screen(stub, ResilientCaller(), people)
+            return results, stub.requests, stub.max_in_flight
+
+    results, requests, max_in_flight = asyncio.run(run())
+    assert [result['id'] for result in results] == list(range(20))
+    assert requests == 10
+    assert max_in_flight == 3
@@ -0,0 +1,25 @@
+import json
+from app.utils.result_codec import decode_result, encode_result, get_screened_at
+
+
+def test_flags_round_trip():
+    for bits in range(8):
+        flags = {
+            'name_match': bool(bits & 1),
+            'dob_match': bool(bits & 2),
+            'country_match': bool(bits & 4)
+        }
+        value = encode_result({**flags, 'id': 7}, screened_at=1700000000)
+
+        assert len(value) == 6
+        assert decode_result(value) == flags
+        assert get_screened_at(value) == 1700000000
+
+
+def test_json_values_are_still_decoded():
+    value = json.dumps({'name_match': True, 'dob_match': False, 'country_match': True, 'id': 3})
+
+    assert decode_result(value.encode('utf-8')) == {
+        'name_match': True, 'dob_match': False, 'country_match': True
+    }
+    assert decode_result(None) is None
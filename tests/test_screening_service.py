@@ -1,9 +1,3 @@
-from fastapi.testclient import TestClient
-from app.main import app
-
-
-client = TestClient(app)
-
 def test_single_person_screening(single_person_fixture):
     screening = single_person_fixture[0]
 
@@ -28,7 +22,7 @@ def test_multiple_people_screening(multiple_people_fixture):
     assert second_person['dob_match']
     assert second_person['country_match']
 
-def test_unprocessable_entity():
+def test_unprocessable_entity(client):
     person_data = [
         {
             "id": 1
@@ -0,0 +1,116 @@
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from app.sanctions.index_store import SdnIndexStore
+from app.sanctions.ngram_matcher import NgramMatcher
+from app.sanctions.sdn_index import SdnIndex
+from app.sanctions.sdn_list import load_sanctions_list
+from app.schemas import Person
+
+
+SDN_XML = """<?xml version="1.0"?>
+<sdnList xmlns="https://sanctionslistservice.ofac.treas.gov/api/PublicationPreview/exports/XML">
+    <sdnEntry>
+        <uid>306</uid>
+        <firstName>Abu</firstName>
+        <lastName>ABBAS</lastName>
+        <sdnType>Individual</sdnType>
+        <akaList>
+            <aka><uid>1</uid><firstName>Muhammad</firstName><lastName>ZAYDAN</lastName></aka>
+        </akaList>
+        <addressList>
+            <address><uid>2</uid><country>Yemen</country></address>
+        </addressList>
+        <dateOfBirthList>
+            <dateOfBirthItem><uid>3</uid><dateOfBirth>10 Dec 1948</dateOfBirth></dateOfBirthItem>
+        </dateOfBirthList>
+    </sdnEntry>
+    <sdnEntry>
+        <uid>400</uid>
+        <lastName>ABBAS</lastName>
+        <sdnType>Vessel</sdnType>
+    </sdnEntry>
+</sdnList>
+"""
+
+SDN_CSV = (
+    '36,"AEROCARIBBEAN AIRLINES",-0- ,"CUBA",-0- ,-0- ,-0- ,-0- ,-0- ,-0- ,-0- ,-0- \n'
+    '173,"MOHAMMED, Ubaidullah Akhund Sher","individual","SDGT",-0- ,-0- ,-0- ,-0- ,-0- ,-0- ,-0- ,'
+    '"DOB 1950; nationality Afghanistan."\n'
+)
+
+ADD_CSV = '36,25,"Havana","-0- ","Cuba",-0- \n'
+
+
+def write_list_files(directory):
+    (directory / 'sdn.xml').write_text(SDN_XML)
+    (directory / 'sdn.csv').write_text(SDN_CSV)
+    (directory / 'add.csv').write_text(ADD_CSV)
+
+
+def screen(index, name, dob, country):
+    person = Person(id=1, name=name, dob=datetime.fromisoformat(dob), country=country)
+    return index.screen(person, index.match_name(person.name))
+
+
+def test_load_sanctions_list(tmp_path):
+    write_list_files(tmp_path)
+    entries = {entry.uid: entry for entry in load_sanctions_list(str(tmp_path))}
+
+    # vessels are not screened
+    assert set(entries) == {'36', '173', '306'}
+    assert entries['306'].names == ('Abu ABBAS', 'Muhammad ZAYDAN')
+    assert entries['306'].dobs == {'1948-12-10'}
+    assert entries['306'].countries == {'YE'}
+    assert entries['173'].names == ('Ubaidullah Akhund Sher MOHAMMED',)
+    assert entries['173'].birth_years == {1950}
+    assert entries['173'].countries == {'AF'}
+    assert entries['36'].countries == {'CU'}
+
+
+def test_screen_person(tmp_path):
+    write_list_files(tmp_path)
+    index = SdnIndex(load_sanctions_list(str(tmp_path)))
+
+    screening = screen(index, 'abu  ABBAS', '1948-12-10', 'YE')
+    assert screening['name_match']
+    assert screening['dob_match']
+    assert screening['country_match']
+
+    screening = screen(index, 'Ubaidullah Akhund Sher Mohammed', '1950-01-01', 'Afghanistan')
+    assert screening['name_match']
+    assert not screening['dob_match']
+    assert screening['country_match']
+
+    screening = screen(index, 'Jane Doe', '1948-12-10', 'Yemen')
+    assert not screening['name_match']
+    assert not screening['dob_match']
+    assert not screening['country_match']
+
+
+def test_index_store_swaps_on_new_list(tmp_path):
+    write_list_files(tmp_path)
+    store = SdnIndexStore(str(tmp_path), poll_interval=0)
+
+    assert store.load()
+    first_index = store.index
+    assert not store.load()
+
+    (tmp_path / 'sdn.csv').unlink()
+    assert store.load()
+    assert store.index is not first_index
+    assert len(store.index) == 1
+    assert len(first_index) == 3
+
+
+def test_fuzzy_name_matching():
+    matcher = NgramMatcher(
+        ['Abu ABBAS', 'Muhammad ZAYDAN', 'Ubaidullah Akhund Sher MOHAMMED'],
+        [0, 0, 1],
+        min_score=0.8
+    )
+    names = ['ABBAS, Abu', 'Ubaidullah Akhund Sher Mohamed', 'Jane Doe']
+
+    assert matcher.match(names) == [{0}, {1}, set()]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert matcher.match_sharded(names, executor, shard_size=2) == [{0}, {1}, set()]
@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+from app.utils.single_flight import SingleFlight
+
+
+def test_concurrent_keys_are_screened_once():
+    async def run():
+        single_flight = SingleFlight()
+        owned, pending = await single_flight.acquire(['a', 'b'])
+        assert owned == ['a', 'b']
+        assert not pending
+
+        # a concurrent caller only owns the key nobody is screening
+        owned, pending = await single_flight.acquire(['b', 'c'])
+        assert owned == ['c']
+        assert list(pending) == ['b']
+
+        waiter = asyncio.ensure_future(SingleFlight.wait(pending))
+        await single_flight.release({'a': {'name_match': True}, 'b': {'name_match': False}})
+        assert await waiter == {'b': {'name_match': False}}
+
+        # released keys can be acquired again
+        owned, _ = await single_flight.acquire(['a'])
+        assert owned == ['a']
+
+    asyncio.run(run())
+
+
+def test_failures_are_propagated_to_waiters():
+    async def run():
+        single_flight = SingleFlight()
+        await single_flight.acquire(['a'])
+        _, pending = await single_flight.acquire(['a'])
+
+        waiter = asyncio.ensure_future(SingleFlight.wait(pending))
+        await single_flight.fail(['a'], RuntimeError('upstream failed'))
+        with pytest.raises(RuntimeError):
+            await waiter
+
+    asyncio.run(run())
+
+
+class FailingLocks:
+    async def acquire_locks(self, keys, token, px):
+        raise ConnectionError('redis is down')
+
+
+def test_keys_are_handed_back_when_locking_fails():
+    async def run():
+        single_flight = SingleFlight(FailingLocks())
+        with pytest.raises(ConnectionError):
+            await single_flight.acquire(['a'])
+
+        # the keys are not left to an owner that never screens them
+        single_flight.redis_util = None
+        owned, pending = await single_flight.acquire(['a'])
+        assert owned == ['a']
+        assert not pending
+
+    asyncio.run(run())
+
+
+def test_abandoned_keys_are_screened_by_waiters():
+    async def run():
+        single_flight = SingleFlight()
+        await single_flight.acquire(['a'])
+        _, pending = await single_flight.acquire(['a'])
+
+        waiter = asyncio.ensure_future(SingleFlight.wait(pending))
+        await single_flight.abandon(['a'])
+        assert await waiter == {'a': None}
+
+    asyncio.run(run())
@@ -0,0 +1,139 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.services.local_screening_service import LocalScreeningService
+from app.utils.local_cache import LocalCache
+from tests.fakes import RecordingEngine, make_clients, person
+
+
+FLAGS = {'name_match': True, 'dob_match': False, 'country_match': True}
+
+
+@pytest.fixture(autouse=True)
+def recording_engine(monkeypatch):
+    monkeypatch.setattr(RecordingEngine, 'calls', [])
+
+
+async def store(clients, stored_person, age, list_version=0, collection_name=RecordingEngine.PERSON_COLLECTION):
+    collection = clients.db_client.get_collection(collection_name)
+    await collection.insert_one({
+        'identity': stored_person.identity,
+        'list_version': list_version,
+        'updated_at': datetime.now(timezone.utc) - timedelta(seconds=age),
+        **FLAGS
+    })
+
+
+async def screen(clients, people):
+    screening_service = RecordingEngine(people, clients)
+    screening_service.db_cache_max_age = 3600
+    return await screening_service.get_screening_results()
+
+
+def test_fresh_stored_results_are_reused_and_cached():
+    async def run():
+        clients = make_clients()
+        clients._local_cache = LocalCache(100, ttl=3600)  # pylint: disable=protected-access
+        fresh, stale = person(1, 'Jane Doe'), person(2, 'John Roe')
+        await store(clients, fresh, age=3000)
+        await store(clients, stale, age=4000)
+
+        results = await screen(clients, [fresh, stale])
+        key = f'0:{fresh.identity}'
+        redis_ttl = await clients.redis_util.redis.ttl(key)
+        local_ttl = clients.local_cache._entries[key][0] - time.monotonic()  # pylint: disable=protected-access
+        await clients.close()
+        return results, redis_ttl, local_ttl
+
+    results, redis_ttl, local_ttl = asyncio.run(run())
+    # only the stale result is screened again
+    assert RecordingEngine.calls == [['John Roe']]
+    assert {**FLAGS, 'id': 1} in results
+    # the cached copies expire with the freshness window, not after the full cache TTL
+    assert 0 < redis_ttl <= 600
+    assert 0 < local_ttl <= 600
+
+
+def test_stored_results_of_another_list_version_are_ignored():
+    async def run():
+        clients = make_clients()
+        stored_person = person(1, 'Jane Doe')
+        await store(clients, stored_person, age=0, list_version=0)
+        await clients.list_version.bump()
+
+        results = await screen(clients, [stored_person])
+        await clients.close()
+        return results
+
+    results = asyncio.run(run())
+    assert RecordingEngine.calls == [['Jane Doe']]
+    assert results == [{'id': 1, 'name_match': False, 'dob_match': False, 'country_match': True}]
+
+
+def test_stored_results_of_another_engine_are_ignored():
+    async def run():
+        clients = make_clients()
+        stored_person = person(1, 'Jane Doe')
+        await store(clients, stored_person, age=0, collection_name=LocalScreeningService.PERSON_COLLECTION)
+
+        results = await screen(clients, [stored_person])
+        await clients.close()
+        return results
+
+    results = asyncio.run(run())
+    assert LocalScreeningService.PERSON_COLLECTION != RecordingEngine.PERSON_COLLECTION
+    assert RecordingEngine.calls == [['Jane Doe']]
+    assert not results[0]['name_match']
+
+
+def test_people_sharing_an_id_keep_their_own_results():
+    async def run():
+        clients = make_clients()
+        people = [person(1, 'SANCTIONED One'), person(1, 'Jane Doe')]
+        results = await screen(clients, people)
+        # the second screening is served from the cache
+        cached_results = await screen(clients, people)
+        stored = {
+            document['name']: document['name_match']
+            for document in await clients.db_client.find_documents(RecordingEngine.PERSON_COLLECTION, {})
+        }
+        await clients.close()
+        return results, cached_results, stored
+
+    results, cached_results, stored = asyncio.run(run())
+    assert RecordingEngine.calls == [['SANCTIONED One', 'Jane Doe']]
+    for screening_results in (results, cached_results):
+        assert sorted(result['name_match'] for result in screening_results) == [False, True]
+        assert all(result['id'] == 1 for result in screening_results)
+    assert stored == {'SANCTIONED One': True, 'Jane Doe': False}
+
+
+def test_results_are_read_and_written_in_one_redis_round_trip_each():
+    async def run():
+        clients = make_clients()
+        redis = clients.redis_util.redis
+        pipelines = []
+        create_pipeline = redis.pipeline
+
+        def pipeline(*args, **kwargs):
+            pipe = create_pipeline(*args, **kwargs)
+            execute = pipe.execute
+
+            async def recording_execute(*execute_args, **execute_kwargs):
+                pipelines.append([command[0][0] for command in pipe.command_stack])
+                return await execute(*execute_args, **execute_kwargs)
+
+            pipe.execute = recording_execute
+            return pipe
+
+        redis.pipeline = pipeline
+        people = [person(i, f'Person {i}') for i in range(5)]
+        await screen(clients, people)
+        await clients.close()
+        return pipelines
+
+    pipelines = asyncio.run(run())
+    assert RecordingEngine.calls == [[f'Person {i}' for i in range(5)]]
+    # one read of every result with its lifetime, then one write of the fresh results
+    assert pipelines == [['MGET'] + ['PTTL'] * 5, ['SET'] * 5]
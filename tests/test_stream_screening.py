@@ -0,0 +1,129 @@
+import asyncio
+import json
+import httpx
+import pytest
+from fastapi import FastAPI
+from app.config import get_settings
+from app.registry import get_registry
+from app.routes import screener
+from app.routes.rate_limit import get_rate_limit_service
+from app.services import engines
+from app.services.rate_limit_service import RateLimitService
+from app.services.stream_screening_service import StreamScreeningService
+from app.utils.rate_limiter import RateLimiter
+from tests.fakes import RecordingEngine, make_clients
+
+
+@pytest.fixture(autouse=True)
+def recording_engine(monkeypatch):
+    monkeypatch.setitem(engines.SCREENING_ENGINES, get_settings().screening_engine, RecordingEngine)
+    monkeypatch.setattr(RecordingEngine, 'calls', [])
+
+
+def ndjson_line(person_id, name):
+    return json.dumps({'id': person_id, 'name': name, 'dob': '1950-01-01', 'country': 'Yemen'}) + '\n'
+
+
+async def split_body(body, chunk_size=7):
+    # lines arrive split across chunks
+    for i in range(0, len(body), chunk_size):
+        yield body[i:i + chunk_size]
+
+
+class BucketRedis:
+    """
+    Stands in for the token bucket script of RedisUtil, without refills
+    """
+    def __init__(self):
+        self.tokens = None
+
+    async def take_tokens(self, key, cost, debt, rate, capacity):
+        tokens = (capacity if self.tokens is None else self.tokens) - debt
+        if tokens < cost:
+            self.tokens = tokens
+            return False, tokens, int((cost - tokens) / rate) + 1
+        self.tokens = tokens - cost
+        return True, self.tokens, 0
+
+
+async def screen_stream(body, window_size, rate_limit_service=None):
+    clients = make_clients()
+    stream_screening_service = StreamScreeningService(clients, window_size, rate_limit_service=rate_limit_service)
+    outputs = [output async for output in stream_screening_service.screen(split_body(body))]
+    await clients.close()
+    return outputs
+
+
+def parse(outputs):
+    return [json.loads(line) for output in outputs for line in output.decode('utf-8').splitlines()]
+
+
+def test_stream_is_screened_in_windows():
+    body = (
+        ndjson_line(1, 'Jane Doe') + ndjson_line(2, 'SANCTIONED One') + '\n'
+        + '{"id": 3}\n' + ndjson_line(4, 'John Roe') + ndjson_line(5, 'Max Moe')
+    ).encode('utf-8')
+    outputs = asyncio.run(screen_stream(body, window_size=2))
+
+    # each window is written once screened, invalid lines as soon as they are read
+    assert RecordingEngine.calls == [['Jane Doe', 'SANCTIONED One'], ['John Roe', 'Max Moe']]
+    windows = [parse([output]) for output in outputs]
+    assert [{result['id'] for result in window} for window in windows[:1] + windows[2:]] == [{1, 2}, {4, 5}]
+    error = windows[1][0]
+    assert error['line'] == 4
+    assert error['error'][0]['loc'] == ['name']
+    assert [result['name_match'] for result in windows[0]] == [False, True]
+
+
+def test_failure_ends_the_stream_with_an_error_line(monkeypatch):
+    screen_people = RecordingEngine._screen_people
+
+    async def fail_on_second_window(self, people):
+        if RecordingEngine.calls:
+            raise RuntimeError('upstream connection details')
+        return await screen_people(self, people)
+
+    monkeypatch.setattr(RecordingEngine, '_screen_people', fail_on_second_window)
+    body = ''.join(ndjson_line(i, f'Person {i}') for i in range(4)).encode('utf-8')
+    lines = parse(asyncio.run(screen_stream(body, window_size=2)))
+
+    assert [line.get('id') for line in lines[:2]] == [0, 1]
+    # the cause of internal errors is only logged
+    assert lines[2:] == [{'error': 'Screening stopped: internal error', 'fatal': True}]
+
+
+def test_stream_over_the_rate_limit_ends_with_an_error_line():
+    rate_limiter = RateLimiter(BucketRedis(), rate=1, capacity=5, sync_interval=0)
+    rate_limit_service = RateLimitService(rate_limiter, 'a', request_cost=1, hit_cost=1, miss_cost=2)
+    body = ''.join(ndjson_line(i, f'Person {i}') for i in range(6)).encode('utf-8')
+    lines = parse(asyncio.run(screen_stream(body, window_size=2, rate_limit_service=rate_limit_service)))
+
+    # 2 tokens for the first window as it is read, 2 more once its people were screened,
+    # leaving 1 for the 2 of the second window
+    assert RecordingEngine.calls == [['Person 0', 'Person 1']]
+    assert [line.get('id') for line in lines[:2]] == [0, 1]
+    assert lines[2:] == [
+        {'error': 'Screening stopped: Rate limit exceeded, retry in 2 seconds', 'retry_after': 2, 'fatal': True}
+    ]
+
+
+def test_stream_endpoint():
+    async def run():
+        clients = make_clients()
+        app = FastAPI()
+        app.include_router(screener.router, prefix='/api/v1')
+        app.dependency_overrides[get_registry] = lambda: clients
+        app.dependency_overrides[get_rate_limit_service] = lambda: RateLimitService(None, 'test')
+
+        body = ndjson_line(1, 'SANCTIONED One') + ndjson_line(2, 'Jane Doe')
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            response = await client.post('/api/v1/screen/stream', content=body)
+        await clients.close()
+        return response
+
+    response = asyncio.run(run())
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert {result['id']: result['name_match'] for result in results} == {1: True, 2: False}
@@ -0,0 +1,183 @@
+import asyncio
+import pytest
+from pymongo.errors import BulkWriteError
+from app.utils.write_behind import WriteBehindBuffer
+
+
+class RecordingDatabase:
+    def __init__(self):
+        self.writes = []
+
+    async def bulk_upsert_documents(self, collection_name, operations, batch_size=None):
+        self.writes.append((collection_name, operations))
+
+
+def operation(name, **update_values):
+    filter_query = {'name': name, 'dob': '1950-01-01', 'country': 'Yemen'}
+    return {'filter_query': filter_query, 'update_values': {**filter_query, **update_values}}
+
+
+def test_upserts_of_the_same_triple_are_merged():
+    async def run():
+        db_client = RecordingDatabase()
+        buffer = WriteBehindBuffer(db_client, flush_size=10, flush_interval=60)
+        await buffer.put('person', [operation('a', name_match=False), operation('b')])
+        await buffer.put('person', [operation('a', name_match=True)])
+        assert len(buffer) == 2
+
+        await buffer.close()
+        return db_client.writes, buffer.stats()
+
+    writes, stats = asyncio.run(run())
+    assert len(writes) == 1
+    collection_name, operations = writes[0]
+    assert collection_name == 'person'
+    assert [op['update_values'].get('name_match') for op in operations] == [True, None]
+    assert stats['merged'] == 1
+    assert stats['flushed'] == 2
+    assert stats['depth'] == 0
+
+
+def test_buffer_is_flushed_at_flush_size():
+    async def run():
+        db_client = RecordingDatabase()
+        buffer = WriteBehindBuffer(db_client, flush_size=2, flush_interval=60, max_size=2)
+        await buffer.put('person', [operation(str(i)) for i in range(5)])
+        await asyncio.sleep(0.01)
+        stats = buffer.stats()
+        await buffer.close()
+        return db_client.writes, stats
+
+    writes, stats = asyncio.run(run())
+    assert stats['blocked'] > 0
+    assert sum(len(operations) for _, operations in writes) == 5
+
+
+def test_increments_of_the_same_triple_add_up():
+    async def run():
+        db_client = RecordingDatabase()
+        buffer = WriteBehindBuffer(db_client, flush_size=10, flush_interval=60)
+        filter_query = operation('a')['filter_query']
+        for request_count in (1, 2):
+            await buffer.put('person', [
+                {'filter_query': filter_query, 'increment_values': {'request_count': request_count}}
+            ])
+        await buffer.close()
+        return db_client.writes
+
+    writes = asyncio.run(run())
+    assert writes[0][1] == [
+        {'filter_query': operation('a')['filter_query'], 'increment_values': {'request_count': 3}}
+    ]
+
+
+class FailingDatabase(RecordingDatabase):
+    """
+    Fails the writes of the filter queries named in failing, and every write while down
+    """
+    def __init__(self, failing=()):
+        super().__init__()
+        self.failing = set(failing)
+        self.down = False
+
+    async def bulk_upsert_documents(self, collection_name, operations, batch_size=None):
+        if self.down:
+            raise ConnectionError('database unreachable')
+        failed = [index for index, op in enumerate(operations) if op['filter_query']['name'] in self.failing]
+        await super().bulk_upsert_documents(
+            collection_name,
+            [op for index, op in enumerate(operations) if index not in failed]
+        )
+        if failed:
+            raise BulkWriteError({'writeErrors': [{'index': index, 'code': 11000} for index in failed]})
+
+
+def count(name, request_count=1):
+    return {'filter_query': {'name': name}, 'increment_values': {'request_count': request_count}}
+
+
+def test_only_unwritten_operations_are_kept_after_a_failed_flush():
+    async def run():
+        db_client = FailingDatabase(failing={'c'})
+        buffer = WriteBehindBuffer(db_client, flush_size=10, flush_interval=60, batch_size=2)
+        await buffer.put('person', [count('a'), count('b'), count('c'), count('d')])
+        await buffer.put('request', [count('e')])
+        with pytest.raises(BulkWriteError):
+            await buffer.flush()
+        kept = len(buffer)
+
+        db_client.failing.clear()
+        await buffer.put('person', [count('c', 2)])
+        await buffer.close()
+        return db_client.writes, kept
+
+    writes, kept = asyncio.run(run())
+    # every other operation was written once, the failed one with the increments since
+    assert kept == 1
+    written = [op for _, operations in writes for op in operations]
+    assert sorted(op['filter_query']['name'] for op in written) == ['a', 'b', 'c', 'd', 'e']
+    assert written[-1] == count('c', 3)
+
+
+def test_batches_after_a_connection_error_are_kept():
+    async def run():
+        db_client = FailingDatabase()
+        db_client.down = True
+        buffer = WriteBehindBuffer(db_client, flush_size=10, flush_interval=60, batch_size=2)
+        await buffer.put('person', [count(name) for name in 'abc'])
+        with pytest.raises(ConnectionError):
+            await buffer.flush()
+        kept = len(buffer)
+
+        db_client.down = False
+        await buffer.close()
+        return db_client.writes, kept
+
+    writes, kept = asyncio.run(run())
+    assert kept == 3
+    assert sum(len(operations) for _, operations in writes) == 3
+
+
+def test_operations_are_dropped_rather_than_blocking_when_full():
+    async def run():
+        db_client = FailingDatabase()
+        db_client.down = True
+        buffer = WriteBehindBuffer(db_client, flush_size=2, flush_interval=60, max_size=2, drop_when_full=True)
+        # returns right away although nothing can be flushed
+        await asyncio.wait_for(buffer.put('person', [count(name) for name in 'abcd'] + [count('a')]), 1)
+        stats = buffer.stats()
+
+        db_client.down = False
+        await buffer.close()
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats['depth'] == 2
+    assert stats['dropped'] == 2
+    assert stats['blocked'] == 0
+
+
+class SlowDatabase(RecordingDatabase):
+    async def bulk_upsert_documents(self, collection_name, operations, batch_size=None):
+        await asyncio.sleep(0.05)
+        await super().bulk_upsert_documents(collection_name, operations)
+
+
+def test_close_waits_for_the_running_flush():
+    async def run():
+        db_client = SlowDatabase()
+        buffer = WriteBehindBuffer(db_client, flush_size=50, flush_interval=60)
+        await buffer.put('person', [count(str(i)) for i in range(50)])
+        # the background flush has swapped the operations out and is writing them
+        await asyncio.sleep(0.01)
+        assert len(buffer) == 0 and not db_client.writes
+
+        await buffer.close()
+        return db_client.writes, buffer.stats()
+
+    writes, stats = asyncio.run(run())
+    assert sorted(op['filter_query']['name'] for _, operations in writes for op in operations) == sorted(
+        str(i) for i in range(50)
+    )
+    assert stats['flushed'] == 50
+    assert stats['depth'] == 0